@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Login latency benchmark for the OAuth session-data call
+Runs a local stub of the Emergent session-data endpoint and fires a burst of sign-ins,
+comparing one ClientSession per login (previous behaviour) with the pooled app client
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent))
+
+import aiohttp
+from aiohttp import web
+
+async def start_stub_server(port: int, latency_ms: float) -> web.AppRunner:
+    """Local stand-in for the Emergent session-data endpoint"""
+    async def session_data(request):
+        await asyncio.sleep(latency_ms / 1000)
+        session_id = request.headers.get("X-Session-ID", "anonymous")
+        return web.json_response({
+            "id": session_id,
+            "email": f"{session_id}@bench.local",
+            "name": "Bench User",
+            "picture": None,
+            "session_token": f"token-{session_id}"
+        })
+
+    app = web.Application()
+    app.router.add_get("/auth/v1/env/oauth/session-data", session_data)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+async def login_per_call_session(url: str, session_id: str):
+    """Previous behaviour: new ClientSession (connector, DNS, handshake) for every login"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url, headers={"X-Session-ID": session_id}) as response:
+            return await response.json()
+
+async def run_burst(name: str, login, logins: int):
+    latencies = []
+
+    async def timed(i: int):
+        start = time.perf_counter()
+        await login(f"bench-{i}")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{name:<22} {logins} logins in {elapsed:.3f}s - "
+        f"p50 {statistics.median(latencies):.1f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms, "
+        f"max {latencies[-1]:.1f} ms"
+    )
+
+async def main(args):
+    runner = await start_stub_server(args.port, args.latency_ms)
+    url = f"http://127.0.0.1:{args.port}/auth/v1/env/oauth/session-data"
+
+    from server import OAuthSessionClient
+    client = OAuthSessionClient(url, max_connections=args.concurrency, max_concurrency=args.concurrency)
+    await client.start()
+    try:
+        # Warm up both paths once so the first burst does not pay import/setup costs
+        await login_per_call_session(url, "warmup")
+        await client.get_session_data("warmup")
+
+        for _ in range(args.rounds):
+            await run_burst("per-call ClientSession", lambda sid: login_per_call_session(url, sid), args.logins)
+            await run_burst("pooled client", client.get_session_data, args.logins)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=500, help="Sign-ins per burst")
+    parser.add_argument("--concurrency", type=int, default=32, help="Pool size / in-flight cap of the pooled client")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Stub server processing time")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
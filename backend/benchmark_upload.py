@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Document upload benchmark
+Fires concurrent uploads of large files through the previous implementation (whole file
+read into memory, blocking write on the event loop) and through save_upload (chunked,
+thread-offloaded, atomic rename), reporting throughput, peak Python memory and the
+longest event-loop stall seen by a 10 ms ticker
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent))
+
+from starlette.datastructures import Headers, UploadFile
+
+def make_upload(source: Path) -> UploadFile:
+    """UploadFile backed by a file on disk, like a multipart part spooled by Starlette"""
+    return UploadFile(
+        open(source, "rb"),
+        size=source.stat().st_size,
+        filename=source.name,
+        headers=Headers({"content-type": "application/pdf"})
+    )
+
+async def save_whole_file(upload: UploadFile, destination: Path):
+    """Previous behaviour: read everything, then write synchronously"""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    content = await upload.read()
+    with open(destination, "wb") as buffer:
+        buffer.write(content)
+
+async def measure_stall(stop: asyncio.Event) -> float:
+    """Longest delay beyond the 10 ms tick, i.e. how long other requests would have waited"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - start - 0.01)
+    return worst
+
+async def run_burst(name: str, save, source: Path, target_dir: Path, uploads: int):
+    uploads_files = [make_upload(source) for _ in range(uploads)]
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_stall(stop))
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        save(upload, target_dir / f"{name.replace(' ', '-')}-{i}.pdf")
+        for i, upload in enumerate(uploads_files)
+    ))
+    elapsed = time.perf_counter() - start
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stop.set()
+    stall = await ticker
+    for upload in uploads_files:
+        upload.file.close()
+
+    total_mb = uploads * source.stat().st_size / (1024 * 1024)
+    print(
+        f"{name:<18} {uploads} x {source.stat().st_size // (1024 * 1024)} MB in {elapsed:.2f}s - "
+        f"{total_mb / elapsed:.0f} MB/s, peak memory {peak / (1024 * 1024):.1f} MB, "
+        f"max loop stall {stall * 1000:.0f} ms"
+    )
+
+async def main(args):
+    from server import save_upload
+
+    workdir = Path(tempfile.mkdtemp(prefix="upload-bench-"))
+    try:
+        source = workdir / "source.pdf"
+        with open(source, "wb") as f:
+            for _ in range(args.size_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        for round_number in range(args.rounds):
+            target_dir = workdir / f"round-{round_number}"
+            await run_burst("whole file", save_whole_file, source, target_dir, args.uploads)
+            await run_burst("chunked save_upload", save_upload, source, target_dir, args.uploads)
+            shutil.rmtree(target_dir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uploads", type=int, default=8, help="Concurrent uploads per burst")
+    parser.add_argument("--size-mb", type=int, default=50, help="Size of each uploaded file")
+    parser.add_argument("--rounds", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
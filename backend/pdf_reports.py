@@ -0,0 +1,265 @@
+"""
+ReportLab renderers for the project dossiers (bank, notary)
+Kept free of the app (database, settings) so they can run in worker processes:
+inputs are plain dicts and the result is the PDF as bytes
+"""
+
+import io
+from datetime import datetime
+from typing import List, Optional
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+)
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+
+def _document(buffer: io.BytesIO) -> SimpleDocTemplate:
+    """A4 document with the dossier margins"""
+    return SimpleDocTemplate(
+        buffer, pagesize=A4,
+        rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72
+    )
+
+
+def _generated_at() -> str:
+    return f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+
+
+def render_bank_dossier(
+    project: dict,
+    estimate_data: Optional[dict],
+    documents: List[dict]
+) -> bytes:
+    """Bank dossier PDF of a project"""
+    # Generate PDF
+    buffer = io.BytesIO()
+
+    # Create PDF document
+    doc = _document(buffer)
+
+    # Get styles
+    styles = getSampleStyleSheet()
+    normal = styles['Normal']
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor='#d97706',
+        alignment=1  # Center
+    )
+
+    # Build PDF content
+    story = []
+
+    # Title
+    story.append(Paragraph("DOSSIER BANQUE", title_style))
+    story.append(Spacer(1, 20))
+
+    # Project info
+    story.append(Paragraph(
+        f"<b>Projet:</b> {project.get('label', 'N/A')}", normal
+    ))
+    address = project.get('address')
+    if address:
+        story.append(Paragraph(
+            f"<b>Localisation:</b> {address.get('line1', '')}, "
+            f"{address.get('city', '')}",
+            normal
+        ))
+    story.append(Paragraph(
+        f"<b>Statut:</b> {project.get('status', 'N/A')}", normal
+    ))
+    story.append(Spacer(1, 20))
+
+    # Financial analysis
+    story.append(Paragraph("ANALYSE FINANCIÈRE", styles['Heading2']))
+    story.append(Spacer(1, 12))
+
+    # Create financial table
+    financial_data = [
+        ['Poste', 'Montant TTC'],
+        ['Prix d\'achat', f"{project.get('prix_achat_ttc', 0):,.2f} €"],
+        ['Travaux estimés', f"{project.get('travaux_ttc', 0):,.2f} €"],
+        ['Frais agence', f"{project.get('frais_agence_ttc', 0):,.2f} €"],
+        ['Prix de vente cible', f"{project.get('prix_vente_ttc', 0):,.2f} €"],
+        ['Marge nette estimée', f"{project.get('marge_estimee', 0):,.2f} €"]
+    ]
+
+    t = Table(financial_data, colWidths=[3*inch, 2*inch])
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), '#f59e0b'),
+        ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), '#fffbeb'),
+        ('GRID', (0, 0), (-1, -1), 1, '#d97706')
+    ]))
+
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Estimate details if available
+    if estimate_data:
+        story.append(Paragraph("CALCULS FISCAUX", styles['Heading2']))
+        story.append(Spacer(1, 12))
+
+        def amount(key: str) -> str:
+            return f"{estimate_data.get(key, 0):,.2f} €"
+
+        fiscal_data = [
+            ['Taxe/Frais', 'Montant'],
+            ['DMTO', amount('dmto')],
+            ['Émoluments notaire', amount('emoluments')],
+            ['CSI', amount('csi')],
+            ['Débours', amount('debours')],
+            ['TVA collectée', amount('tva_collectee')],
+            ['TVA sur marge', amount('tva_marge')]
+        ]
+
+        t2 = Table(fiscal_data, colWidths=[3*inch, 2*inch])
+        t2.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), '#10b981'),
+            ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), '#f0fdf4'),
+            ('GRID', (0, 0), (-1, -1), 1, '#10b981')
+        ]))
+
+        story.append(t2)
+
+    # Documents list
+    story.append(Spacer(1, 20))
+    story.append(Paragraph("DOCUMENTS FOURNIS", styles['Heading2']))
+    story.append(Spacer(1, 12))
+
+    if documents:
+        for document in documents:
+            story.append(Paragraph(
+                f"• {document.get('filename', 'N/A')} "
+                f"({document.get('category', 'N/A')})",
+                normal
+            ))
+    else:
+        story.append(Paragraph("Aucun document fourni", normal))
+
+    # Footer
+    story.append(Spacer(1, 40))
+    story.append(Paragraph(
+        "Document généré automatiquement par MarchndsBiens", normal
+    ))
+    story.append(Paragraph(_generated_at(), normal))
+
+    # Build PDF
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_notary_dossier(project: dict) -> bytes:
+    """Notary dossier PDF of a project"""
+    buffer = io.BytesIO()
+    doc = _document(buffer)
+
+    styles = getSampleStyleSheet()
+    normal = styles['Normal']
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor='#059669',
+        alignment=1
+    )
+
+    story = []
+
+    # Title
+    story.append(Paragraph("DOSSIER NOTAIRE", title_style))
+    story.append(Spacer(1, 20))
+
+    # Project details
+    story.append(Paragraph(
+        f"<b>Projet:</b> {project.get('label', 'N/A')}", normal
+    ))
+    address = project.get('address')
+    if address:
+        story.append(Paragraph(
+            f"<b>Adresse:</b> {address.get('line1', '')}", normal
+        ))
+        story.append(Paragraph(
+            f"<b>Ville:</b> {address.get('city', '')}", normal
+        ))
+        story.append(Paragraph(
+            f"<b>Département:</b> {address.get('dept', '')}", normal
+        ))
+
+    story.append(Paragraph(
+        f"<b>Régime TVA:</b> {project.get('regime_tva', 'N/A')}", normal
+    ))
+    story.append(Spacer(1, 20))
+
+    # Legal information
+    story.append(Paragraph("INFORMATIONS JURIDIQUES", styles['Heading2']))
+    story.append(Spacer(1, 12))
+
+    created_at = project.get('created_at')
+    md_b_ok = project.get('flags', {}).get('md_b_0715_ok')
+    legal_data = [
+        ['Élément', 'Valeur'],
+        [
+            'Prix d\'acquisition TTC',
+            f"{project.get('prix_achat_ttc', 0):,.2f} €"
+        ],
+        ['Régime fiscal', project.get('regime_tva', 'Non spécifié')],
+        ['Marchand de biens', 'Oui' if md_b_ok else 'Non'],
+        [
+            'Date création',
+            created_at.strftime('%Y-%m-%d') if created_at else 'N/A'
+        ]
+    ]
+
+    t = Table(legal_data, colWidths=[3*inch, 2*inch])
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), '#059669'),
+        ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), '#f0fdfa'),
+        ('GRID', (0, 0), (-1, -1), 1, '#059669')
+    ]))
+
+    story.append(t)
+    story.append(Spacer(1, 20))
+
+    # Documents checklist
+    story.append(Paragraph("DOCUMENTS REQUIS", styles['Heading2']))
+    story.append(Spacer(1, 12))
+
+    required_docs = [
+        "Compromis de vente signé",
+        "Diagnostics techniques",
+        "Plan de financement",
+        "Justificatifs d'identité",
+        "Justificatifs de domicile",
+        "Attestation d'assurance"
+    ]
+
+    for required_doc in required_docs:
+        story.append(Paragraph(f"☐ {required_doc}", normal))
+
+    story.append(Spacer(1, 40))
+    story.append(Paragraph("Document généré par MarchndsBiens", normal))
+    story.append(Paragraph(_generated_at(), normal))
+
+    doc.build(story)
+    return buffer.getvalue()
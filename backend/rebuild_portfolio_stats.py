@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized portfolio KPIs (portfolio_stats) from the projects collection
+Use after a bulk import, a manual database edit, or whenever the dashboard drifts from
+GET /api/analytics/portfolio?live=true
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).parent))
+
+async def main():
+    from server import portfolio_stats
+    scopes = await portfolio_stats.rebuild()
+    print(f"Rebuilt portfolio stats for {scopes} scopes")
+
+if __name__ == "__main__":
+    asyncio.run(main())
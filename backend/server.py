@@ -1,33 +1,49 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends, Cookie, Response, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Depends, Cookie, Query, Response, Request
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from fastapi.security import HTTPBearer
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from pdf_reports import render_bank_dossier, render_notary_dossier
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 import io
 import traceback
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import base64
+import bisect
+import calendar
+import functools
 import json
+import random
+import threading
+import time
+import unicodedata
+from types import MappingProxyType
+from urllib.parse import quote
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
-from pymongo import DESCENDING
+from pymongo import DESCENDING, ReplaceOne, ReturnDocument, UpdateOne
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import uuid
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 from enum import Enum
+from collections import defaultdict
 import aiohttp
+import hashlib
+import jwt
+import numpy as np
+from cachetools import TTLCache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -51,6 +67,7 @@ async def create_database_indexes():
         await db.projects.create_index([("owner_id", 1), ("status", 1)], background=True)
         await db.projects.create_index([("created_at", -1)], background=True)
         await db.projects.create_index([("updated_at", -1)], background=True)
+        await db.projects.create_index([("updated_at", -1), ("id", -1)], background=True)
         await db.projects.create_index([("address.dept", 1)], background=True)
         await db.projects.create_index([("regime_tva", 1)], background=True)
         
@@ -63,6 +80,25 @@ async def create_database_indexes():
         await db.user_sessions.create_index("session_token", unique=True, background=True)
         await db.user_sessions.create_index("user_id", background=True)
         await db.user_sessions.create_index("expires_at", background=True)
+        await db.revoked_sessions.create_index("sid", unique=True, background=True)
+        await db.revoked_sessions.create_index("expires_at", expireAfterSeconds=0, background=True)
+        
+        # Project records collections indexes
+        await db.project_events.create_index([("project_id", 1), ("timestamp", -1), ("id", -1)], background=True)
+        await db.project_events.create_index([("project_id", 1), ("id", 1)], unique=True, background=True)
+        await db.project_documents.create_index([("project_id", 1), ("uploaded_at", -1), ("id", -1)], background=True)
+        await db.project_documents.create_index([("project_id", 1), ("id", 1)], unique=True, background=True)
+        await db.project_tasks.create_index([("project_id", 1), ("created_at", -1), ("id", -1)], background=True)
+        await db.project_tasks.create_index([("project_id", 1), ("id", 1)], unique=True, background=True)
+        
+        # Content-addressed file store reference counts
+        await db.blobs.create_index("sha256", unique=True, background=True)
+        
+        # Live project diffs relayed between app instances, kept one hour
+        await db.project_changes.create_index("created_at", expireAfterSeconds=3600, background=True)
+        
+        # Materialized portfolio KPIs, one document per visibility scope
+        await db.portfolio_stats.create_index("scope", unique=True, background=True)
         
         # Estimates collection indexes (if you plan to store estimates)
         await db.estimates.create_index([("project_id", 1), ("created_at", -1)], background=True)
@@ -71,6 +107,47 @@ async def create_database_indexes():
     except Exception as e:
         logging.error(f"Failed to create database indexes: {e}")
 
+def parse_timestamp(value) -> Optional[datetime]:
+    """datetime from a BSON date or an ISO string, None when it cannot be read"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+# Sorts after every real timestamp in (updated_at, id) descending order
+TIMESTAMP_FLOOR = datetime.min.replace(tzinfo=timezone.utc)
+
+async def normalize_project_timestamps():
+    """Convert ISO-string created_at/updated_at left by older writes into BSON dates.
+
+    Keyset pagination on updated_at needs a single BSON type: Mongo orders every string
+    before every date, so mixed values would break the cursor order. A missing or unreadable
+    updated_at falls back to created_at, then to TIMESTAMP_FLOOR, so every project stays reachable.
+    """
+    try:
+        converted = 0
+        async for project in db.projects.find(
+            {"$or": [{"updated_at": {"$not": {"$type": "date"}}}, {"created_at": {"$type": "string"}}]},
+            {"_id": 1, "created_at": 1, "updated_at": 1}
+        ):
+            fields = {}
+            created_at = parse_timestamp(project.get("created_at"))
+            if isinstance(project.get("created_at"), str) and created_at:
+                fields["created_at"] = created_at
+            if not isinstance(project.get("updated_at"), datetime):
+                fields["updated_at"] = parse_timestamp(project.get("updated_at")) or created_at or TIMESTAMP_FLOOR
+            if fields:
+                await db.projects.update_one({"_id": project["_id"]}, {"$set": fields})
+                converted += 1
+        if converted:
+            logging.info(f"Normalized timestamps of {converted} projects")
+    except Exception as e:
+        logging.error(f"Failed to normalize project timestamps: {e}")
+
 # Call index creation on startup
 import asyncio
 asyncio.create_task(create_database_indexes())
@@ -262,7 +339,8 @@ class KYCDocument(BaseModel):
     original_filename: str
     file_size: int
     content_type: str
-    gridfs_id: str
+    gridfs_id: Optional[str] = None  # KYC files uploaded before the blob store
+    sha256: Optional[str] = None
     status: KYCStatus = KYCStatus.EN_ATTENTE
     validation_notes: Optional[str] = None
     validated_by: Optional[str] = None
@@ -333,6 +411,16 @@ class EstimateInput(BaseModel):
     travaux_ttc: float = Field(0, description="Montant travaux TTC")
     frais_agence_ttc: float = Field(0, description="Frais agence TTC")
     hypotheses: Dict[str, Any] = Field(default_factory=dict, description="Hypothèses spécifiques")
+    date_transaction: Optional[str] = Field(None, description="Date de l'acte (ISO) - sélectionne le barème en vigueur")
+
+    @validator('date_transaction')
+    def validate_date_transaction(cls, v):
+        if v is None:
+            return v
+        try:
+            return datetime.fromisoformat(str(v).replace("Z", "+00:00")).date().isoformat()
+        except ValueError:
+            raise ValueError('date_transaction doit être une date ISO (AAAA-MM-JJ)')
 
 class EstimateOutput(BaseModel):
     dmto: float = Field(..., description="Droits de mutation à titre onéreux")
@@ -344,7 +432,85 @@ class EstimateOutput(BaseModel):
     marge_brute: float = Field(..., description="Marge brute")
     marge_nette: float = Field(..., description="Marge nette")
     tri: float = Field(..., description="Taux de rentabilité interne")
-    explain: str = Field(..., description="Détail des calculs")
+    explain: Optional[str] = Field(None, description="Détail des calculs (sur demande)")
+    steps: Optional[List[Dict[str, Any]]] = Field(None, description="Étapes de calcul structurées")
+    id: Optional[str] = Field(None, description="Identifiant de l'estimation enregistrée")
+
+class EstimateBatchInput(BaseModel):
+    rows: List[EstimateInput] = Field(..., min_length=1, max_length=20000, description="Lignes à estimer")
+    include_explain: bool = Field(False, description="Générer le détail des calculs pour chaque ligne")
+
+class EstimateBatchOutput(BaseModel):
+    count: int
+    results: List[EstimateOutput]
+
+class SensitivityVariable(str, Enum):
+    PRIX_ACHAT = "prix_achat_ttc"
+    PRIX_VENTE = "prix_vente_ttc"
+    TRAVAUX = "travaux_ttc"
+    FRAIS_AGENCE = "frais_agence_ttc"
+    DUREE = "duree_mois"
+
+class SensitivityAxis(BaseModel):
+    variable: SensitivityVariable
+    values: Optional[List[float]] = Field(None, min_length=1, max_length=200, description="Valeurs explicites de l'axe")
+    min: Optional[float] = Field(None, description="Début de la plage (si values absent)")
+    max: Optional[float] = Field(None, description="Fin de la plage (si values absent)")
+    steps: int = Field(11, ge=2, le=200, description="Nombre de points entre min et max")
+
+class SensitivityInput(BaseModel):
+    base: EstimateInput
+    duree_mois: float = Field(12, gt=0, le=120, description="Durée de détention de référence en mois")
+    x_axis: SensitivityAxis
+    y_axis: Optional[SensitivityAxis] = None
+    tornado_variation: float = Field(0.10, gt=0, lt=1, description="Variation relative (±) pour l'analyse tornado")
+    persist: bool = Field(False, description="Enregistrer l'analyse")
+
+class GoalSeekTarget(str, Enum):
+    MARGE_NETTE = "marge_nette"
+    TRI = "tri"
+
+class GoalSeekInput(BaseModel):
+    dept: str = Field(..., description="Code département (ex: 75)")
+    regime_tva: RegimeTVA = Field(..., description="Régime TVA applicable")
+    prix_vente_ttc: float = Field(..., gt=0, description="Prix de vente cible TTC")
+    travaux_ttc: float = Field(0, ge=0, description="Montant travaux TTC")
+    frais_agence_ttc: float = Field(0, ge=0, description="Frais agence TTC")
+    hypotheses: Dict[str, Any] = Field(default_factory=dict, description="Hypothèses spécifiques")
+    target: GoalSeekTarget = Field(..., description="Indicateur à atteindre")
+    target_value: float = Field(..., description="Marge nette en € ou TRI (0.15 = 15%)")
+    duree_mois: Optional[float] = Field(None, gt=0, le=120, description="Si renseigné, le TRI visé est annualisé sur cette durée")
+
+class DistributionType(str, Enum):
+    FIXED = "FIXED"
+    UNIFORM = "UNIFORM"
+    NORMAL = "NORMAL"
+    TRIANGULAR = "TRIANGULAR"
+    LOGNORMAL = "LOGNORMAL"
+
+class DistributionSpec(BaseModel):
+    distribution: DistributionType = DistributionType.NORMAL
+    mean: Optional[float] = Field(None, description="Moyenne (NORMAL, LOGNORMAL) ou valeur (FIXED)")
+    std: Optional[float] = Field(None, ge=0, description="Écart-type (NORMAL, LOGNORMAL)")
+    low: Optional[float] = Field(None, description="Borne basse (UNIFORM, TRIANGULAR)")
+    mode: Optional[float] = Field(None, description="Valeur la plus probable (TRIANGULAR)")
+    high: Optional[float] = Field(None, description="Borne haute (UNIFORM, TRIANGULAR)")
+
+class SimulationInput(BaseModel):
+    draws: int = Field(100000, ge=1000, le=1000000, description="Nombre de scénarios")
+    seed: Optional[int] = Field(None, description="Graine pour des tirages reproductibles")
+    prix_vente_factor: DistributionSpec = Field(
+        default_factory=lambda: DistributionSpec(distribution=DistributionType.NORMAL, mean=1.0, std=0.07),
+        description="Multiplicateur du prix de vente cible"
+    )
+    travaux_factor: DistributionSpec = Field(
+        default_factory=lambda: DistributionSpec(distribution=DistributionType.TRIANGULAR, low=0.95, mode=1.05, high=1.4),
+        description="Multiplicateur du budget travaux (dépassement)"
+    )
+    duree_mois: DistributionSpec = Field(
+        default_factory=lambda: DistributionSpec(distribution=DistributionType.TRIANGULAR, low=8, mode=12, high=20),
+        description="Durée de détention en mois"
+    )
 
 class Task(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -468,7 +634,9 @@ class ProjectUpdate(BaseModel):
 class ProjectStatusUpdate(BaseModel):
     status: ProjectStatus
 
-class ProjectResponse(BaseModel):
+class ProjectListItem(BaseModel):
+    """Project row of the full list view: documents, tasks and events live in their own
+    collections and are only attached to a single project (ProjectResponse)"""
     id: str
     label: str
     address: Dict[str, str] = Field(default_factory=dict)
@@ -480,15 +648,44 @@ class ProjectResponse(BaseModel):
     frais_agence_ttc: float = 0
     marge_estimee: float = 0
     tri_estime: float = 0
+    tri_cashflow: Optional[float] = None
     flags: Dict[str, bool] = Field(default_factory=dict)
     milestones: Dict[str, Optional[str]] = Field(default_factory=dict)
     financing: Dict[str, Any] = Field(default_factory=dict)
     owner_id: Optional[str] = None
     team_members: List[str] = Field(default_factory=list)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ProjectResponse(ProjectListItem):
     documents: List[Dict[str, Any]] = Field(default_factory=list)
     tasks: List[Dict[str, Any]] = Field(default_factory=list)
     events: List[Dict[str, Any]] = Field(default_factory=list)
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class ProjectView(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
+
+class ProjectSummary(BaseModel):
+    """Slim project row for the pipeline and grid views"""
+    id: str
+    label: str
+    address: Dict[str, str] = Field(default_factory=dict)
+    dept: Optional[str] = None
+    status: ProjectStatus = ProjectStatus.DETECTE
+    regime_tva: RegimeTVA = RegimeTVA.MARGE
+    prix_achat_ttc: float = 0
+    prix_vente_ttc: float = 0
+    travaux_ttc: float = 0
+    frais_agence_ttc: float = 0
+    marge_estimee: float = 0
+    tri_estime: float = 0
+    tri_cashflow: Optional[float] = None
+    owner_id: Optional[str] = None
+    team_members: List[str] = Field(default_factory=list)
+    documents_count: int = 0
+    open_tasks_count: int = 0
+    created_at: Optional[datetime] = None
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 # Risk Assessment Service
@@ -580,6 +777,7 @@ class RiskAssessmentService:
                 {"id": user.id},
                 {"$set": {"risk_level": risk_level.value}}
             )
+            session_cache.invalidate_user(user.id)
         
         return assessment
 
@@ -627,27 +825,286 @@ class TracfinService:
         
         return [TracfinEvent(**event) for event in events]
 
+# Session cache: session_token -> User, so authenticated requests skip the two Mongo lookups
+class SessionCache:
+    """Bounded TTL cache of resolved sessions.
+
+    Entries never outlive the session expiry. Logout drops the token; any write to a user
+    document that affects authorization (role, KYC status, risk level) must call
+    invalidate_user. Each worker holds its own cache, so the TTL bounds how long a change
+    made through another worker can go unnoticed. Cached users are shared: treat them as read-only.
+    """
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _as_aware(expires_at):
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at)
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at
+
+    def get(self, session_token: str) -> Optional[User]:
+        entry = self._cache.get(session_token)
+        if entry is not None:
+            user, expires_at = entry
+            if expires_at is None or expires_at > datetime.now(timezone.utc):
+                self.hits += 1
+                return user
+            self._cache.pop(session_token, None)
+        self.misses += 1
+        return None
+
+    def set(self, session_token: str, user: User, expires_at=None):
+        self._cache[session_token] = (user, self._as_aware(expires_at))
+
+    def invalidate_token(self, session_token: str):
+        if self._cache.pop(session_token, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached session of a user"""
+        tokens = [token for token, (user, _) in list(self._cache.items()) if user.id == user_id]
+        for token in tokens:
+            self._cache.pop(token, None)
+        self.invalidations += len(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "size": self._cache.currsize,
+            "maxsize": self._cache.maxsize,
+            "ttl_seconds": self._cache.ttl
+        }
+
+session_cache = SessionCache(
+    maxsize=int(os.environ.get('SESSION_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('SESSION_CACHE_TTL', 60))
+)
+
+# Signed session tokens: optional stateless mode (SESSION_TOKEN_MODE=signed + SESSION_SIGNING_KEY)
+class SessionRevocationList:
+    """Revoked session ids, stored in Mongo and mirrored in each worker's memory.
+
+    A worker pulls the entries added since its last sync at most every `sync_interval`
+    seconds, so revocations reach every worker without shared memory or a per-request query.
+    Entries only need to outlive the signed token lifetime: past that, renewal goes
+    through db.user_sessions, where the logged-out session no longer exists.
+    """
+    def __init__(self, sync_interval: float = 5.0):
+        self.sync_interval = sync_interval
+        self._revoked = {}
+        self._last_sync = None
+        self._synced_until = None
+
+    async def sync(self):
+        now = time.monotonic()
+        if self._last_sync is not None and now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        query = {"expires_at": {"$gt": datetime.now(timezone.utc)}}
+        if self._synced_until:
+            query["revoked_at"] = {"$gte": self._synced_until}
+        try:
+            async for entry in db.revoked_sessions.find(query, {"_id": 0, "sid": 1, "expires_at": 1, "revoked_at": 1}):
+                self._revoked[entry["sid"]] = SessionCache._as_aware(entry["expires_at"])
+                revoked_at = SessionCache._as_aware(entry["revoked_at"])
+                if self._synced_until is None or revoked_at > self._synced_until:
+                    self._synced_until = revoked_at
+        except Exception as e:
+            logging.error(f"Session revocation sync failed: {e}")
+        cutoff = datetime.now(timezone.utc)
+        self._revoked = {sid: expires_at for sid, expires_at in self._revoked.items() if expires_at > cutoff}
+
+    async def revoke(self, sid: str, expires_at: datetime):
+        self._revoked[sid] = expires_at
+        await db.revoked_sessions.update_one(
+            {"sid": sid},
+            {"$set": {"sid": sid, "expires_at": expires_at, "revoked_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    def is_revoked(self, sid: str) -> bool:
+        return sid in self._revoked
+
+class SessionTokenSigner:
+    """Issues and verifies HS256 session tokens carrying the user id, role and expiry.
+
+    The token wraps the opaque session token (`sid`) stored in db.user_sessions. While it is
+    valid, authentication needs no Mongo query; once expired it is renewed through the
+    session lookup, which also refreshes the embedded user claims. All workers share the
+    key through the environment.
+    """
+    ALGORITHM = "HS256"
+    USER_CLAIMS = ("id", "email", "name", "picture", "role", "kyc_status", "risk_level", "is_active")
+
+    def __init__(self, secret: Optional[str], ttl: int = 900):
+        self.secret = secret
+        self.ttl = ttl
+        self.revocations = SessionRevocationList()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    @staticmethod
+    def is_signed(token: str) -> bool:
+        return token.count(".") == 2
+
+    def issue(self, user: User, sid: str, session_expires: datetime) -> str:
+        now = datetime.now(timezone.utc)
+        expires_at = min(now + timedelta(seconds=self.ttl), SessionCache._as_aware(session_expires))
+        claims = {
+            "sub": user.id,
+            "role": user.role.value,
+            "sid": sid,
+            "usr": json.loads(user.json(include=set(self.USER_CLAIMS))),
+            "iat": now,
+            "exp": expires_at
+        }
+        return jwt.encode(claims, self.secret, algorithm=self.ALGORITHM)
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        return jwt.decode(token, self.secret, algorithms=[self.ALGORITHM], options={"verify_exp": verify_exp})
+
+    async def authenticate(self, token: str, response: Optional[Response] = None) -> Optional[User]:
+        """User from a signed token; expired tokens are renewed from the session store"""
+        expired = False
+        try:
+            claims = self.decode(token)
+        except jwt.ExpiredSignatureError:
+            claims = self.decode(token, verify_exp=False)
+            expired = True
+        except jwt.InvalidTokenError:
+            return None
+        
+        await self.revocations.sync()
+        if self.revocations.is_revoked(claims["sid"]):
+            return None
+        if not expired:
+            return User(**claims["usr"])
+        
+        session = await db.user_sessions.find_one({"session_token": claims["sid"]})
+        if not session or SessionCache._as_aware(session["expires_at"]) < datetime.now(timezone.utc):
+            return None
+        user_data = await db.users.find_one({"id": session["user_id"]})
+        if not user_data:
+            return None
+        user = User(**user_data)
+        if response is not None:
+            set_session_cookie(response, self.issue(user, claims["sid"], session["expires_at"]))
+        return user
+
+    async def revoke(self, token: str) -> Optional[str]:
+        """Revoke the session behind a signed token and return its sid"""
+        try:
+            claims = self.decode(token, verify_exp=False)
+        except jwt.InvalidTokenError:
+            return None
+        await self.revocations.revoke(claims["sid"], datetime.now(timezone.utc) + timedelta(seconds=self.ttl))
+        return claims["sid"]
+
+def set_session_cookie(response: Response, value: str):
+    response.set_cookie(
+        key="session_token",
+        value=value,
+        max_age=7*24*60*60,
+        httponly=True,
+        secure=False,  # Set to False for development
+        samesite="lax",  # Changed from "none" to "lax" for better compatibility
+        path="/"
+    )
+
+if os.environ.get('SESSION_TOKEN_MODE', 'opaque') == 'signed' and not os.environ.get('SESSION_SIGNING_KEY'):
+    logging.error("SESSION_TOKEN_MODE=signed requires SESSION_SIGNING_KEY - falling back to opaque session tokens")
+
+session_signer = SessionTokenSigner(
+    os.environ.get('SESSION_SIGNING_KEY') if os.environ.get('SESSION_TOKEN_MODE', 'opaque') == 'signed' else None,
+    ttl=int(os.environ.get('SESSION_TOKEN_TTL', 900))
+)
+
+# OAuth session-data client: one pooled aiohttp session for the whole app
+class OAuthSessionClient:
+    """App-scoped HTTP client for the Emergent session-data endpoint.
+
+    Keeps a single connection pool (keep-alive, cached DNS) opened at startup and closed at
+    shutdown, caps in-flight calls with a semaphore, and retries connection errors, timeouts
+    and 429/5xx answers with exponential backoff and full jitter.
+    """
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, url: str, max_connections: int = 32, max_concurrency: int = 32,
+                 timeout: float = 5.0, retries: int = 2, backoff: float = 0.2):
+        self.url = url
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=min(timeout, 2.0))
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _sleep_before_retry(self, attempt: int):
+        await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    async def get_session_data(self, session_id: str) -> Optional[dict]:
+        await self.start()  # No-op once started; covers use outside the app lifecycle
+        headers = {"X-Session-ID": session_id}
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    async with self._session.get(self.url, headers=headers) as response:
+                        if response.status == 200:
+                            return await response.json()
+                        response_text = await response.text()
+                        if response.status not in self.RETRY_STATUSES or attempt == self.retries:
+                            logging.warning(f"Session validation failed. Status: {response.status}, Response: {response_text[:200]}")
+                            return None
+                        logging.info(f"Emergent returned {response.status}, retrying ({attempt + 1}/{self.retries})")
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt == self.retries:
+                        logging.error(f"Error getting session data after {attempt + 1} attempts: {e!r}")
+                        return None
+                    logging.info(f"Emergent call failed ({e!r}), retrying ({attempt + 1}/{self.retries})")
+                await self._sleep_before_retry(attempt)
+        return None
+
+oauth_client = OAuthSessionClient(
+    os.environ.get('EMERGENT_AUTH_URL', "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"),
+    max_connections=int(os.environ.get('OAUTH_HTTP_MAX_CONNECTIONS', 32)),
+    max_concurrency=int(os.environ.get('OAUTH_HTTP_MAX_CONCURRENCY', 32)),
+    timeout=float(os.environ.get('OAUTH_HTTP_TIMEOUT', 5.0)),
+    retries=int(os.environ.get('OAUTH_HTTP_RETRIES', 2))
+)
+
 # Authentication Service (unchanged)
 class AuthenticationService:
     @staticmethod
     async def get_session_data_from_emergent(session_id: str) -> Optional[SessionData]:
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {"X-Session-ID": session_id}
-                url = "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"
-                
-                logging.info(f"Validating session with Emergent: {url}")
-                async with session.get(url, headers=headers) as response:
-                    response_text = await response.text()
-                    logging.info(f"Emergent response status: {response.status}")
-                    
-                    if response.status == 200:
-                        data = await response.json()
-                        logging.info(f"Session validated successfully for: {data.get('email', 'unknown')}")
-                        return SessionData(**data)
-                    else:
-                        logging.warning(f"Session validation failed. Status: {response.status}, Response: {response_text[:200]}")
-                        return None
+            logging.info(f"Validating session with Emergent: {oauth_client.url}")
+            data = await oauth_client.get_session_data(session_id)
+            if data is None:
+                return None
+            logging.info(f"Session validated successfully for: {data.get('email', 'unknown')}")
+            return SessionData(**data)
         except Exception as e:
             logging.error(f"Error getting session data: {e}")
             return None
@@ -683,6 +1140,10 @@ class AuthenticationService:
         if not session_token:
             return None
         
+        cached = session_cache.get(session_token)
+        if cached:
+            return cached
+        
         session = await db.user_sessions.find_one({
             "session_token": session_token,
             "expires_at": {"$gt": datetime.now(timezone.utc)}
@@ -695,16 +1156,20 @@ class AuthenticationService:
         if not user:
             return None
         
-        return User(**user)
+        user = User(**user)
+        session_cache.set(session_token, user, session.get("expires_at"))
+        return user
 
     @staticmethod
     async def logout_user(session_token: str) -> bool:
+        session_cache.invalidate_token(session_token)
         result = await db.user_sessions.delete_one({"session_token": session_token})
         return result.deleted_count > 0
 
 # Authentication dependencies (unchanged)
 async def get_current_user(
     request: Request,
+    response: Response,
     session_token: Optional[str] = Cookie(None, alias="session_token")
 ) -> Optional[User]:
     if not session_token:
@@ -715,6 +1180,9 @@ async def get_current_user(
     if not session_token:
         return None
     
+    if session_signer.enabled and session_signer.is_signed(session_token):
+        return await session_signer.authenticate(session_token, response)
+    
     return await AuthenticationService.get_user_from_session_token(session_token)
 
 async def require_auth(current_user: User = Depends(get_current_user)) -> User:
@@ -729,23 +1197,165 @@ async def require_role(required_roles: List[UserRole]):
         return current_user
     return role_checker
 
-# Tax calculation service (unchanged - keeping existing implementation)
-class TaxCalculationService:
-    def __init__(self):
-        self.dmto_rates = self._load_dmto_rates()
-        self.notaire_baremes = self._load_notaire_baremes()
-    
+# Barème registry: DMTO and notary tables loaded once, reloaded when the JSON files change
+def _freeze(value):
+    """Recursively turn dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+class EmolumentSchedule:
+    """Emoluments tranche table compiled into sorted boundaries and cumulative prefix sums.
+
+    emoluments(base) = cumulative[i] + (min(base, upper[i]) - lower[i]) * rate[i]
+    where i is the last tranche whose lower bound is strictly below base.
+    """
+    def __init__(self, tranches):
+        ordered = sorted(tranches, key=lambda t: t["min"])
+        self.lower = tuple(float(t["min"]) for t in ordered)
+        self.upper = tuple(float("inf") if t.get("max") is None else float(t["max"]) for t in ordered)
+        self.rates = tuple(float(t["taux"]) for t in ordered)
+        cumulative = [0.0]
+        for lower, upper, rate in zip(self.lower, self.upper, self.rates):
+            cumulative.append(cumulative[-1] + (upper - lower) * rate)
+        self.cumulative = tuple(cumulative)
+        # Array copies for the vectorized path
+        self._lower = np.array(self.lower)
+        self._upper = np.array(self.upper)
+        self._rates = np.array(self.rates)
+        self._cumulative = np.array(self.cumulative[:-1])
+
+    def emoluments(self, base: float) -> float:
+        i = bisect.bisect_left(self.lower, base) - 1
+        if i < 0:
+            return 0.0
+        return self.cumulative[i] + (min(base, self.upper[i]) - self.lower[i]) * self.rates[i]
+
+    def emoluments_array(self, base: np.ndarray) -> np.ndarray:
+        i = np.searchsorted(self._lower, base, side="left") - 1
+        j = np.maximum(i, 0)
+        partial = self._cumulative[j] + (np.minimum(base, self._upper[j]) - self._lower[j]) * self._rates[j]
+        return np.where(i >= 0, partial, 0.0)
+
+    def breakdown(self, base: float) -> List[tuple]:
+        """(lower, upper, applicable amount, rate) for every tranche reached by base"""
+        last = bisect.bisect_left(self.lower, base)
+        return [
+            (self.lower[k], self.upper[k], min(base, self.upper[k]) - self.lower[k], self.rates[k])
+            for k in range(last)
+        ]
+
+class BaremeSnapshot:
+    """Immutable view of the barème tables at one point in time"""
+    __slots__ = ("dmto_rates", "notaire_baremes", "emoluments_schedule", "version", "generation", "mtimes", "loaded_at")
+
+    def __init__(self, dmto_rates: dict, notaire_baremes: dict, generation: int, mtimes: tuple):
+        object.__setattr__(self, "dmto_rates", _freeze(dmto_rates))
+        object.__setattr__(self, "notaire_baremes", _freeze(notaire_baremes))
+        object.__setattr__(self, "emoluments_schedule", EmolumentSchedule(notaire_baremes["emoluments_tranches"]))
+        object.__setattr__(self, "version", f"dmto:{dmto_rates.get('version', 'fallback')}|notaire:{notaire_baremes.get('version', 'fallback')}|gen:{generation}")
+        object.__setattr__(self, "generation", generation)
+        object.__setattr__(self, "mtimes", mtimes)
+        object.__setattr__(self, "loaded_at", datetime.now(timezone.utc))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BaremeSnapshot is immutable")
+
+class BaremeRegistry:
+    """Single shared source of barème tables.
+
+    Files are stat'ed at most every `check_interval` seconds; when an mtime changes the
+    tables are parsed into a new snapshot which replaces the current one in a single
+    reference assignment, so readers always see a complete, consistent snapshot.
+    """
+    def __init__(self, data_dir: Path, check_interval: float = 2.0):
+        self.dmto_path = data_dir / 'dmto.json'
+        self.notary_path = data_dir / 'notary_fees.json'
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._failed_mtimes = None
+        self._listeners = []
+        self._snapshot = BaremeSnapshot(
+            self._load_dmto_rates(), self._load_notaire_baremes(), generation=1, mtimes=self._current_mtimes()
+        )
+
+    def _current_mtimes(self) -> tuple:
+        mtimes = []
+        for path in (self.dmto_path, self.notary_path):
+            try:
+                mtimes.append(path.stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def add_listener(self, callback):
+        """Register a callable invoked with the new snapshot after each reload"""
+        self._listeners.append(callback)
+
+    def current(self) -> BaremeSnapshot:
+        """Return the current snapshot, reloading first if the files changed on disk"""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            mtimes = self._current_mtimes()
+            if mtimes != self._snapshot.mtimes and mtimes != self._failed_mtimes:
+                self.reload()
+        return self._snapshot
+
+    def reload(self) -> BaremeSnapshot:
+        """Re-read both files and atomically swap in the new snapshot"""
+        with self._lock:
+            mtimes = self._current_mtimes()
+            if mtimes == self._snapshot.mtimes:
+                return self._snapshot
+            try:
+                snapshot = BaremeSnapshot(
+                    self._read_json(self.dmto_path) if mtimes[0] is not None else dict(self._snapshot.dmto_rates),
+                    self._restructure_notary(self._read_json(self.notary_path)) if mtimes[1] is not None else dict(self._snapshot.notaire_baremes),
+                    generation=self._snapshot.generation + 1,
+                    mtimes=mtimes
+                )
+            except Exception as e:
+                # Keep serving the last good tables; retry on the next change
+                logging.error(f"Barème reload failed, keeping version {self._snapshot.version}: {e}")
+                self._failed_mtimes = mtimes
+                return self._snapshot
+            self._snapshot = snapshot
+            logging.info(f"Barème tables reloaded - {snapshot.version}")
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.error(f"Barème reload listener failed: {e}")
+        return snapshot
+
+    @staticmethod
+    def _read_json(path: Path) -> dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _restructure_notary(notary_data: dict) -> dict:
+        # Restructure for compatibility with existing code
+        return {
+            "version": notary_data.get("version", "2025-01-01"),
+            "emoluments_tranches": notary_data.get("emoluments_tranches", []),
+            "csi_rate": notary_data.get("additional_fees", {}).get("csi", {}).get("rate", 0.001),
+            "debours_forfait": notary_data.get("additional_fees", {}).get("debours_forfait", {}).get("amount", 800.0)
+        }
+
     def _load_dmto_rates(self):
         """Load DMTO rates from JSON file with fallback to hardcoded values"""
         try:
-            dmto_file_path = ROOT_DIR / 'data' / 'dmto.json'
-            if dmto_file_path.exists():
-                with open(dmto_file_path, 'r', encoding='utf-8') as f:
-                    dmto_data = json.load(f)
-                    logging.info(f"Loaded DMTO rates from JSON - Version: {dmto_data.get('version', 'unknown')}")
-                    return dmto_data
+            if self.dmto_path.exists():
+                dmto_data = self._read_json(self.dmto_path)
+                logging.info(f"Loaded DMTO rates from JSON - Version: {dmto_data.get('version', 'unknown')}")
+                return dmto_data
             else:
-                logging.warning(f"DMTO JSON file not found at {dmto_file_path}, using fallback values")
+                logging.warning(f"DMTO JSON file not found at {self.dmto_path}, using fallback values")
         except Exception as e:
             logging.error(f"Error loading DMTO JSON file: {e}, using fallback values")
         
@@ -763,21 +1373,12 @@ class TaxCalculationService:
     def _load_notaire_baremes(self):
         """Load notary fee scales from JSON file with fallback to hardcoded values"""
         try:
-            notary_file_path = ROOT_DIR / 'data' / 'notary_fees.json'
-            if notary_file_path.exists():
-                with open(notary_file_path, 'r', encoding='utf-8') as f:
-                    notary_data = json.load(f)
-                    logging.info(f"Loaded notary fees from JSON - Version: {notary_data.get('version', 'unknown')}")
-                    
-                    # Restructure for compatibility with existing code
-                    return {
-                        "version": notary_data.get("version", "2025-01-01"),
-                        "emoluments_tranches": notary_data.get("emoluments_tranches", []),
-                        "csi_rate": notary_data.get("additional_fees", {}).get("csi", {}).get("rate", 0.001),
-                        "debours_forfait": notary_data.get("additional_fees", {}).get("debours_forfait", {}).get("amount", 800.0)
-                    }
+            if self.notary_path.exists():
+                notary_data = self._read_json(self.notary_path)
+                logging.info(f"Loaded notary fees from JSON - Version: {notary_data.get('version', 'unknown')}")
+                return self._restructure_notary(notary_data)
             else:
-                logging.warning(f"Notary fees JSON file not found at {notary_file_path}, using fallback values")
+                logging.warning(f"Notary fees JSON file not found at {self.notary_path}, using fallback values")
         except Exception as e:
             logging.error(f"Error loading notary fees JSON file: {e}, using fallback values")
         
@@ -793,6 +1394,97 @@ class TaxCalculationService:
             "csi_rate": 0.001,
             "debours_forfait": 800.0
         }
+
+bareme_registry = BaremeRegistry(ROOT_DIR / 'data')
+
+# Estimate memoization: identical inputs under the same barème version reuse the previous result
+class EstimateCache:
+    def __init__(self, registry: BaremeRegistry, maxsize: int = 4096, ttl: float = 900):
+        self.registry = registry
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._records = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        registry.add_listener(self.invalidate)
+
+    def make_key(self, inputs: EstimateInput, snapshot: BaremeSnapshot = None) -> str:
+        """Canonical content hash of the inputs plus the barème version they are computed against"""
+        payload = json.dumps(inputs.dict(), sort_keys=True, separators=(",", ":"), default=str)
+        version = (snapshot or self.registry.current()).version
+        return hashlib.sha256(f"{version}\n{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[EstimateOutput]:
+        result = self._cache.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, key: str, result: EstimateOutput):
+        self._cache[key] = result
+
+    def get_record_id(self, key: str, user_id: Optional[str]) -> Optional[str]:
+        """Id of the estimate already stored for this caller and input set"""
+        return self._records.get((key, user_id))
+
+    def set_record_id(self, key: str, user_id: Optional[str], estimate_id: str):
+        self._records[(key, user_id)] = estimate_id
+
+    def invalidate(self, snapshot: BaremeSnapshot = None):
+        self._cache.clear()
+        self._records.clear()
+        logging.info("Estimate cache invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": self._cache.currsize,
+            "maxsize": self._cache.maxsize,
+            "ttl_seconds": self._cache.ttl,
+            "bareme_version": self.registry.current().version
+        }
+
+estimate_cache = EstimateCache(
+    bareme_registry,
+    maxsize=int(os.environ.get('ESTIMATE_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('ESTIMATE_CACHE_TTL', 900))
+)
+
+# Tax calculation service (unchanged - keeping existing implementation)
+class TaxCalculationService:
+    def __init__(self, registry: BaremeRegistry = None):
+        self.registry = registry or bareme_registry
+        self._pinned: Optional["TaxCalculationService"] = None
+    
+    def pinned(self) -> "TaxCalculationService":
+        """This service bound to the barème snapshot in force now.
+
+        The table properties below ask the registry each time and the registry may reload
+        between two reads, so a calculation reading them more than once runs on a pinned service.
+        """
+        if isinstance(self.registry, PinnedBaremes):
+            return self
+        snapshot = self.registry.current()
+        pinned = self._pinned
+        if pinned is None or pinned.registry.current() is not snapshot:
+            pinned = self._pinned = TaxCalculationService(PinnedBaremes(snapshot))
+        return pinned
+    
+    @property
+    def dmto_rates(self):
+        return self.registry.current().dmto_rates
+    
+    @property
+    def notaire_baremes(self):
+        return self.registry.current().notaire_baremes
+    
+    @property
+    def emoluments_schedule(self) -> EmolumentSchedule:
+        return self.registry.current().emoluments_schedule
     
     def _decimal_round(self, value: float, places: int = 2) -> float:
         if value is None:
@@ -801,37 +1493,27 @@ class TaxCalculationService:
         rounded = decimal_value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
         return float(rounded)
     
+    def dmto_step(self, prix_achat_ttc: float, dept: str, md_b_eligible: bool = False) -> Dict[str, Any]:
+        rate = self.dmto_rate(dept, md_b_eligible)
+        return {
+            "section": "dmto", "dept": dept, "md_b": bool(md_b_eligible),
+            "base": prix_achat_ttc, "rate": rate, "amount": self._decimal_round(prix_achat_ttc * rate)
+        }
+    
+    @staticmethod
+    def _render_dmto(step: Dict[str, Any]) -> str:
+        if step["md_b"]:
+            return f"DMTO Marchand de Biens: {step['base']:,.2f} € × {step['rate']:.3%} = {step['amount']:,.2f} €"
+        return f"DMTO départemental ({step['dept']}): {step['base']:,.2f} € × {step['rate']:.3%} = {step['amount']:,.2f} €"
+    
     def calculate_dmto(self, prix_achat_ttc: float, dept: str, md_b_eligible: bool = False) -> tuple[float, str]:
-        dept_config = self.dmto_rates["departments"].get(dept, self.dmto_rates["defaults"])
-        
-        if md_b_eligible:
-            rate = self.dmto_rates["defaults"]["dmto_mdb_rate"]
-            dmto = self._decimal_round(prix_achat_ttc * rate)
-            explain = f"DMTO Marchand de Biens: {prix_achat_ttc:,.2f} € × {rate:.3%} = {dmto:,.2f} €"
-        else:
-            rate = dept_config["dmto_rate"]
-            dmto = self._decimal_round(prix_achat_ttc * rate)
-            explain = f"DMTO départemental ({dept}): {prix_achat_ttc:,.2f} € × {rate:.3%} = {dmto:,.2f} €"
-        
-        return dmto, explain
+        step = self.dmto_step(prix_achat_ttc, dept, md_b_eligible)
+        return step["amount"], self._render_dmto(step)
     
     def calculate_emoluments(self, prix_achat_ttc: float) -> float:
         """Calculate notary emoluments based on purchase price with advanced logic"""
-        emoluments = 0.0
         prix_ht = prix_achat_ttc / 1.20  # Convert to HT for calculation base
-        
-        for tranche in self.notaire_baremes["emoluments_tranches"]:
-            min_val = tranche["min"]
-            max_val = tranche["max"]
-            taux = tranche["taux"]
-            
-            if max_val is None:  # Last tranche
-                if prix_ht > min_val:
-                    emoluments += (prix_ht - min_val) * taux
-            else:
-                if prix_ht > min_val:
-                    applicable_amount = min(prix_ht, max_val) - min_val
-                    emoluments += applicable_amount * taux
+        emoluments = self.emoluments_schedule.emoluments(prix_ht)
         
         # Apply complexity factor for high-value transactions
         if prix_ht > 1000000:  # > 1M€
@@ -976,77 +1658,114 @@ class TaxCalculationService:
             
         return max(1, min(10, base_score))
 
-    def calculate_notaire_fees(self, prix_achat_ttc: float) -> tuple[float, float, float, str]:
-        emoluments = self.calculate_emoluments(prix_achat_ttc)
-        reste = prix_achat_ttc
+    def notaire_step(self, prix_achat_ttc: float) -> Dict[str, Any]:
+        if not isinstance(self.registry, PinnedBaremes):
+            return self.pinned().notaire_step(prix_achat_ttc)
+        csi_rate = self.notaire_baremes["csi_rate"]
+        return {
+            "section": "notaire",
+            "base": prix_achat_ttc,
+            "emoluments": self.calculate_emoluments(prix_achat_ttc),
+            "tranches": [
+                [min_val, None if max_val == float("inf") else max_val, montant_applicable, taux]
+                for min_val, max_val, montant_applicable, taux in self.emoluments_schedule.breakdown(prix_achat_ttc)
+            ],
+            "csi_rate": csi_rate,
+            "csi": self._decimal_round(prix_achat_ttc * csi_rate),
+            "debours": self.notaire_baremes["debours_forfait"]
+        }
+    
+    @staticmethod
+    def _render_notaire(step: Dict[str, Any]) -> str:
         explain_parts = []
-        
-        for tranche in self.notaire_baremes["emoluments_tranches"]:
-            if reste <= 0:
-                break
-                
-            min_val = tranche["min"]
-            max_val = tranche.get("max")
-            taux = tranche["taux"]
-            
+        for min_val, max_val, montant_applicable, taux in step["tranches"]:
+            montant_tranche = montant_applicable * taux
             if max_val is None:
-                montant_tranche = reste * taux
-                explain_parts.append(f"Au-delà de {min_val:,.0f} €: {reste:,.2f} € × {taux:.3%} = {montant_tranche:,.2f} €")
-                reste = 0
+                explain_parts.append(f"Au-delà de {min_val:,.0f} €: {montant_applicable:,.2f} € × {taux:.3%} = {montant_tranche:,.2f} €")
             else:
-                montant_applicable = min(reste, max_val - min_val)
-                montant_tranche = montant_applicable * taux
                 explain_parts.append(f"De {min_val:,.0f} € à {max_val:,.0f} €: {montant_applicable:,.2f} € × {taux:.3%} = {montant_tranche:,.2f} €")
-                reste -= montant_applicable
-        
-        csi = self._decimal_round(prix_achat_ttc * self.notaire_baremes["csi_rate"])
-        debours = self.notaire_baremes["debours_forfait"]
         
         explain = "Émoluments notaire:\n" + "\n".join(explain_parts)
-        explain += f"\nCSI (0,1%): {prix_achat_ttc:,.2f} € × 0,1% = {csi:,.2f} €"
-        explain += f"\nDébours forfaitaires: {debours:,.2f} €"
-        
-        return emoluments, csi, debours, explain
+        explain += f"\nCSI (0,1%): {step['base']:,.2f} € × 0,1% = {step['csi']:,.2f} €"
+        explain += f"\nDébours forfaitaires: {step['debours']:,.2f} €"
+        return explain
     
-    def calculate_tva(self, inputs: EstimateInput) -> tuple[float, float, str]:
-        tva_collectee = 0.0
-        tva_marge = 0.0
-        explain = ""
+    def calculate_notaire_fees(self, prix_achat_ttc: float) -> tuple[float, float, float, str]:
+        step = self.notaire_step(prix_achat_ttc)
+        return step["emoluments"], step["csi"], step["debours"], self._render_notaire(step)
+    
+    def tva_step(self, inputs: EstimateInput) -> Dict[str, Any]:
+        step = {"section": "tva", "regime": inputs.regime_tva.value, "tva_collectee": 0.0, "tva_marge": 0.0}
         
         if inputs.regime_tva == RegimeTVA.NORMAL:
             prix_vente_ht = inputs.prix_vente_ttc / 1.20
             tva_collectee = inputs.prix_vente_ttc - prix_vente_ht
-            explain = f"TVA normale: {inputs.prix_vente_ttc:,.2f} € TTC → {prix_vente_ht:,.2f} € HT\nTVA collectée: {tva_collectee:,.2f} €"
+            step.update(prix_vente_ttc=inputs.prix_vente_ttc, prix_vente_ht=prix_vente_ht,
+                        tva_collectee_brute=tva_collectee, tva_collectee=self._decimal_round(tva_collectee))
             
         elif inputs.regime_tva == RegimeTVA.MARGE:
             total_couts = inputs.prix_achat_ttc + inputs.travaux_ttc + inputs.frais_agence_ttc
+            step.update(prix_vente_ttc=inputs.prix_vente_ttc, total_couts=total_couts, marge_ttc=None)
             if inputs.prix_vente_ttc > total_couts:
                 marge_ttc = inputs.prix_vente_ttc - total_couts
                 marge_ht = marge_ttc / 1.20
                 tva_marge = marge_ttc - marge_ht
-                explain = f"TVA sur marge:\nCoûts totaux: {total_couts:,.2f} € TTC\n"
-                explain += f"Marge TTC: {inputs.prix_vente_ttc:,.2f} € - {total_couts:,.2f} € = {marge_ttc:,.2f} €\n"
-                explain += f"Marge HT: {marge_ht:,.2f} €\nTVA sur marge: {tva_marge:,.2f} €"
-            else:
-                explain = "Marge négative ou nulle → pas de TVA sur marge"
-                
-        else:  # EXO
-            explain = "Exonération de TVA → pas de TVA collectée"
+                step.update(marge_ttc=marge_ttc, marge_ht=marge_ht,
+                            tva_marge_brute=tva_marge, tva_marge=self._decimal_round(tva_marge))
         
-        return self._decimal_round(tva_collectee), self._decimal_round(tva_marge), explain
+        return step
+    
+    @staticmethod
+    def _render_tva(step: Dict[str, Any]) -> str:
+        if step["regime"] == RegimeTVA.NORMAL.value:
+            return f"TVA normale: {step['prix_vente_ttc']:,.2f} € TTC → {step['prix_vente_ht']:,.2f} € HT\nTVA collectée: {step['tva_collectee_brute']:,.2f} €"
+        if step["regime"] == RegimeTVA.MARGE.value:
+            if step["marge_ttc"] is None:
+                return "Marge négative ou nulle → pas de TVA sur marge"
+            explain = f"TVA sur marge:\nCoûts totaux: {step['total_couts']:,.2f} € TTC\n"
+            explain += f"Marge TTC: {step['prix_vente_ttc']:,.2f} € - {step['total_couts']:,.2f} € = {step['marge_ttc']:,.2f} €\n"
+            explain += f"Marge HT: {step['marge_ht']:,.2f} €\nTVA sur marge: {step['tva_marge_brute']:,.2f} €"
+            return explain
+        return "Exonération de TVA → pas de TVA collectée"
+    
+    def calculate_tva(self, inputs: EstimateInput) -> tuple[float, float, str]:
+        step = self.tva_step(inputs)
+        return step["tva_collectee"], step["tva_marge"], self._render_tva(step)
     
-    def calculate_estimate(self, inputs: EstimateInput) -> EstimateOutput:
-        explains = []
+    def render_explain(self, steps: List[Dict[str, Any]]) -> str:
+        """French calculation detail, rendered from the structured steps only when asked for"""
+        sections = {step["section"]: step for step in steps}
+        explains = [
+            f"1. DROITS DE MUTATION:\n{self._render_dmto(sections['dmto'])}",
+            f"\n2. FRAIS NOTAIRE:\n{self._render_notaire(sections['notaire'])}",
+            f"\n3. TVA:\n{self._render_tva(sections['tva'])}"
+        ]
         
-        md_b_eligible = inputs.hypotheses.get("md_b_0715_ok", False)
-        dmto, dmto_explain = self.calculate_dmto(inputs.prix_achat_ttc, inputs.dept, md_b_eligible)
-        explains.append(f"1. DROITS DE MUTATION:\n{dmto_explain}")
+        marges = sections["marges"]
+        marge_explain = "\n4. CALCUL MARGES:\n"
+        marge_explain += f"Coûts acquisition: {marges['total_couts_acquisition']:,.2f} €\n"
+        marge_explain += f"Coûts totaux: {marges['total_couts']:,.2f} €\n"
+        marge_explain += f"Marge brute: {marges['prix_vente_ttc']:,.2f} € - {marges['total_couts']:,.2f} € = {marges['marge_brute']:,.2f} €\n"
+        marge_explain += f"Marge nette: {marges['marge_brute']:,.2f} € - {marges['tva_total']:,.2f} € TVA = {marges['marge_nette']:,.2f} €\n"
+        marge_explain += f"TRI estimé (12 mois): {marges['tri']:.1%}"
+        explains.append(marge_explain)
+        
+        if "alertes" in sections:
+            explains.append("\n5. ALERTES:\n" + "\n".join(sections["alertes"]["warnings"]))
         
-        emoluments, csi, debours, notaire_explain = self.calculate_notaire_fees(inputs.prix_achat_ttc)
-        explains.append(f"\n2. FRAIS NOTAIRE:\n{notaire_explain}")
+        return "\n".join(explains)
+    
+    def calculate_estimate(self, inputs: EstimateInput, include_explain: bool = False) -> EstimateOutput:
+        if not isinstance(self.registry, PinnedBaremes):
+            return self.pinned().calculate_estimate(inputs, include_explain)
+        md_b_eligible = inputs.hypotheses.get("md_b_0715_ok", False)
+        dmto_step = self.dmto_step(inputs.prix_achat_ttc, inputs.dept, md_b_eligible)
+        notaire_step = self.notaire_step(inputs.prix_achat_ttc)
+        tva_step = self.tva_step(inputs)
         
-        tva_collectee, tva_marge, tva_explain = self.calculate_tva(inputs)
-        explains.append(f"\n3. TVA:\n{tva_explain}")
+        dmto = dmto_step["amount"]
+        emoluments, csi, debours = notaire_step["emoluments"], notaire_step["csi"], notaire_step["debours"]
+        tva_collectee, tva_marge = tva_step["tva_collectee"], tva_step["tva_marge"]
         
         total_couts_acquisition = inputs.prix_achat_ttc + dmto + emoluments + csi + debours
         total_couts = total_couts_acquisition + inputs.travaux_ttc + inputs.frais_agence_ttc
@@ -1058,13 +1777,16 @@ class TaxCalculationService:
         else:
             tri = 0.0
         
-        marge_explain = "\n4. CALCUL MARGES:\n"
-        marge_explain += f"Coûts acquisition: {total_couts_acquisition:,.2f} €\n"
-        marge_explain += f"Coûts totaux: {total_couts:,.2f} €\n"
-        marge_explain += f"Marge brute: {inputs.prix_vente_ttc:,.2f} € - {total_couts:,.2f} € = {marge_brute:,.2f} €\n"
-        marge_explain += f"Marge nette: {marge_brute:,.2f} € - {tva_collectee + tva_marge:,.2f} € TVA = {marge_nette:,.2f} €\n"
-        marge_explain += f"TRI estimé (12 mois): {tri:.1%}"
-        explains.append(marge_explain)
+        steps = [dmto_step, notaire_step, tva_step, {
+            "section": "marges",
+            "total_couts_acquisition": total_couts_acquisition,
+            "total_couts": total_couts,
+            "prix_vente_ttc": inputs.prix_vente_ttc,
+            "marge_brute": marge_brute,
+            "tva_total": tva_collectee + tva_marge,
+            "marge_nette": marge_nette,
+            "tri": tri
+        }]
         
         warnings = []
         if inputs.hypotheses.get("travaux_structurants", False):
@@ -1073,7 +1795,7 @@ class TaxCalculationService:
             warnings.append("⚠️ TVA sur marge sans statut MdB → Vérifier conditions art. 268 CGI")
         
         if warnings:
-            explains.append("\n5. ALERTES:\n" + "\n".join(warnings))
+            steps.append({"section": "alertes", "warnings": warnings})
         
         return EstimateOutput(
             dmto=dmto, emoluments=emoluments, csi=csi, debours=debours,
@@ -1081,169 +1803,812 @@ class TaxCalculationService:
             marge_brute=self._decimal_round(marge_brute),
             marge_nette=self._decimal_round(marge_nette),
             tri=self._decimal_round(tri, 4),
-            explain="\n".join(explains)
+            explain=self.render_explain(steps) if include_explain else None,
+            steps=steps
         )
 
-# PDF Generation Service (unchanged)
-class PDFGenerationService:
-    @staticmethod
-    def generate_bank_dossier(project: Project, estimate: EstimateOutput) -> io.BytesIO:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], 
-                                   fontSize=24, spaceAfter=30, textColor=colors.HexColor('#d97706'))
-        story.append(Paragraph("DOSSIER BANQUE", title_style))
-        story.append(Spacer(1, 20))
-        
-        story.append(Paragraph("RÉSUMÉ DU PROJET", styles['Heading2']))
-        project_data = [
-            ["Nom du projet", project.label],
-            ["Adresse", f"{project.address.get('line1', '')}, {project.address.get('city', '')}"],
-            ["Statut", project.status.value],
-            ["Régime TVA", project.regime_tva.value],
-        ]
-        project_table = Table(project_data, colWidths=[2*inch, 4*inch])
-        project_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(project_table)
-        story.append(Spacer(1, 30))
-        
-        story.append(Paragraph("ANALYSE FINANCIÈRE", styles['Heading2']))
-        financial_data = [
-            ["Prix d'achat TTC", f"{project.prix_achat_ttc:,.2f} €"],
-            ["Travaux TTC", f"{project.travaux_ttc:,.2f} €"],
-            ["Prix de vente cible TTC", f"{project.prix_vente_ttc:,.2f} €"],
-            ["Marge nette estimée", f"{estimate.marge_nette:,.2f} €"],
-            ["TRI estimé", f"{estimate.tri:.1%}"],
-        ]
-        financial_table = Table(financial_data, colWidths=[3*inch, 2*inch])
-        financial_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(financial_table)
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+    def _decimal_round_array(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized _decimal_round (ROUND_HALF_UP to the cent)"""
+        scaled = np.abs(values) * 100
+        rounded = np.sign(values) * np.floor(scaled + 0.5) / 100
+        # Values sitting on a half-cent boundary are settled with Decimal, exactly like the scalar path
+        ties = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+        for i in ties:
+            rounded[i] = self._decimal_round(float(values[i]))
+        return rounded + 0.0
 
-    @staticmethod
-    def generate_notaire_dossier(project: Project, estimate: EstimateOutput) -> io.BytesIO:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], 
-                                   fontSize=24, spaceAfter=30, textColor=colors.HexColor('#059669'))
-        story.append(Paragraph("DOSSIER NOTAIRE", title_style))
-        story.append(Spacer(1, 20))
-        
-        story.append(Paragraph("INFORMATIONS JURIDIQUES", styles['Heading2']))
-        legal_data = [
-            ["Nom du projet", project.label],
-            ["Adresse complète", f"{project.address.get('line1', '')}, {project.address.get('city', '')}"],
-            ["Département", project.address.get('dept', '')],
-            ["Régime TVA", project.regime_tva.value],
-        ]
-        legal_table = Table(legal_data, colWidths=[2*inch, 4*inch])
-        legal_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(legal_table)
-        story.append(Spacer(1, 30))
-        
-        story.append(Paragraph("CALCULS FISCAUX", styles['Heading2']))
-        tax_data = [
-            ["DMTO", f"{estimate.dmto:,.2f} €"],
-            ["Émoluments", f"{estimate.emoluments:,.2f} €"],
-            ["CSI", f"{estimate.csi:,.2f} €"],
-            ["Débours", f"{estimate.debours:,.2f} €"],
-            ["TVA collectée", f"{estimate.tva_collectee:,.2f} €"],
-            ["TVA sur marge", f"{estimate.tva_marge:,.2f} €"],
-        ]
-        tax_table = Table(tax_data, colWidths=[3*inch, 2*inch])
-        tax_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(tax_table)
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+    def _round_cents_array(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized built-in round(value, 2)"""
+        scaled = values * 100
+        rounded = np.rint(scaled) / 100
+        ties = np.flatnonzero(np.abs(np.abs(scaled) - np.floor(np.abs(scaled)) - 0.5) < 1e-6)
+        for i in ties:
+            rounded[i] = round(float(values[i]), 2)
+        return rounded + 0.0
 
-# Initialize services
-tax_service = TaxCalculationService()
-pdf_service = PDFGenerationService()
-auth_service = AuthenticationService()
-risk_service = RiskAssessmentService()
-tracfin_service = TracfinService()
+    def calculate_emoluments_batch(self, prix_achat_ttc: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_emoluments over an array of purchase prices"""
+        prix_ht = prix_achat_ttc / 1.20
+        emoluments = self.emoluments_schedule.emoluments_array(prix_ht)
+        emoluments = np.where(prix_ht > 1000000, emoluments * 1.05, emoluments)
+        return self._round_cents_array(emoluments)
 
-# API Routes
-@api_router.get("/")
-async def root():
-    return {"message": "Marchands de Biens API", "version": "1.0.0"}
+    def dmto_rate(self, dept: str, md_b_eligible: bool = False) -> float:
+        """DMTO rate applied by calculate_dmto"""
+        if md_b_eligible:
+            return self.dmto_rates["defaults"]["dmto_mdb_rate"]
+        return self.dmto_rates["departments"].get(dept, self.dmto_rates["defaults"])["dmto_rate"]
 
-# Authentication endpoints (unchanged)
-@api_router.post("/auth/session")
-async def create_session(response: Response, session_id: str = Form(...)):
-    try:
-        logging.info(f"Attempting session creation with session_id: {session_id[:20]}...")
-        session_data = await auth_service.get_session_data_from_emergent(session_id)
-        
-        if not session_data:
-            logging.warning(f"No session data returned for session_id: {session_id[:20]}...")
-            raise HTTPException(status_code=400, detail="Invalid session ID")
-        
-        logging.info(f"Session data received for user: {session_data.email}")
-        user = await auth_service.create_or_get_user(session_data)
-        user_session = await auth_service.create_user_session(user.id, session_data.session_token)
-        
-        response.set_cookie(
-            key="session_token",
-            value=session_data.session_token,
-            max_age=7*24*60*60,
-            httponly=True,
-            secure=False,  # Set to False for development
-            samesite="lax",  # Changed from "none" to "lax" for better compatibility
-            path="/"
+    def calculate_estimate_arrays(self, prix_achat, prix_vente, travaux, frais_agence,
+                                  dmto_rate, regime_normal, regime_marge) -> Dict[str, np.ndarray]:
+        """calculate_estimate steps 1-4 on arrays (scalars are broadcast)"""
+        if not isinstance(self.registry, PinnedBaremes):
+            return self.pinned().calculate_estimate_arrays(
+                prix_achat, prix_vente, travaux, frais_agence, dmto_rate, regime_normal, regime_marge
+            )
+        prix_achat, prix_vente, travaux, frais_agence, dmto_rate, regime_normal, regime_marge = (
+            np.atleast_1d(arr) for arr in np.broadcast_arrays(
+                np.asarray(prix_achat, dtype=float), np.asarray(prix_vente, dtype=float),
+                np.asarray(travaux, dtype=float), np.asarray(frais_agence, dtype=float),
+                np.asarray(dmto_rate, dtype=float), np.asarray(regime_normal, dtype=bool),
+                np.asarray(regime_marge, dtype=bool)
+            )
         )
-        
-        logging.info(f"Session created successfully for user: {user.email}")
+
+        # 1. DMTO
+        dmto = self._decimal_round_array(prix_achat * dmto_rate)
+
+        # 2. Frais notaire
+        emoluments = self.calculate_emoluments_batch(prix_achat)
+        csi = self._decimal_round_array(prix_achat * self.notaire_baremes["csi_rate"])
+        debours = float(self.notaire_baremes["debours_forfait"])
+
+        # 3. TVA
+        tva_collectee = np.where(regime_normal, prix_vente - prix_vente / 1.20, 0.0)
+        couts_tva = prix_achat + travaux + frais_agence
+        marge_ttc = prix_vente - couts_tva
+        tva_marge = np.where(regime_marge & (prix_vente > couts_tva), marge_ttc - marge_ttc / 1.20, 0.0)
+        tva_collectee = self._decimal_round_array(tva_collectee)
+        tva_marge = self._decimal_round_array(tva_marge)
+
+        # 4. Marges
+        total_couts_acquisition = prix_achat + dmto + emoluments + csi + debours
+        total_couts = total_couts_acquisition + travaux + frais_agence
+        marge_brute = prix_vente - total_couts
+        marge_nette = marge_brute - tva_collectee - tva_marge
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tri = np.where(total_couts > 0, marge_nette / total_couts, 0.0)
+
         return {
-            "user": user.dict(),
-            "session_expires": user_session.expires_at.isoformat()
+            "dmto": dmto, "emoluments": emoluments, "csi": csi, "debours": debours,
+            "tva_collectee": tva_collectee, "tva_marge": tva_marge,
+            "total_couts": total_couts,
+            "marge_brute": self._decimal_round_array(marge_brute),
+            "marge_nette": self._decimal_round_array(marge_nette),
+            "tri": self._decimal_round_array(tri)
+        }
+
+    @staticmethod
+    def annualized_tri_array(marge_nette, total_couts, duree_mois) -> np.ndarray:
+        """Annualized TRI of one outflow (total costs) returning costs + margin after duree_mois"""
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            multiple = np.where(total_couts > 0, 1 + marge_nette / total_couts, 1.0)
+            return np.where(multiple > 0, np.power(np.maximum(multiple, 1e-12), 12 / duree_mois) - 1, -1.0)
+
+    def calculate_estimate_batch(self, inputs: List[EstimateInput], include_explain: bool = False) -> List[EstimateOutput]:
+        """Compute many estimates in one pass with NumPy arrays.
+
+        Mirrors calculate_estimate operation by operation so results match the scalar path to the cent.
+        """
+        if not isinstance(self.registry, PinnedBaremes):
+            return self.pinned().calculate_estimate_batch(inputs, include_explain)
+        n = len(inputs)
+        prix_achat = np.fromiter((row.prix_achat_ttc for row in inputs), dtype=float, count=n)
+        prix_vente = np.fromiter((row.prix_vente_ttc for row in inputs), dtype=float, count=n)
+        travaux = np.fromiter((row.travaux_ttc for row in inputs), dtype=float, count=n)
+        frais_agence = np.fromiter((row.frais_agence_ttc for row in inputs), dtype=float, count=n)
+        md_b_eligible = np.fromiter((bool(row.hypotheses.get("md_b_0715_ok", False)) for row in inputs), dtype=bool, count=n)
+        regime_normal = np.fromiter((row.regime_tva == RegimeTVA.NORMAL for row in inputs), dtype=bool, count=n)
+        regime_marge = np.fromiter((row.regime_tva == RegimeTVA.MARGE for row in inputs), dtype=bool, count=n)
+
+        dept_rate = np.fromiter((self.dmto_rate(row.dept) for row in inputs), dtype=float, count=n)
+        dmto_rate = np.where(md_b_eligible, self.dmto_rates["defaults"]["dmto_mdb_rate"], dept_rate)
+
+        arrays = self.calculate_estimate_arrays(
+            prix_achat, prix_vente, travaux, frais_agence, dmto_rate, regime_normal, regime_marge
+        )
+        dmto, emoluments, csi, debours = arrays["dmto"], arrays["emoluments"], arrays["csi"], arrays["debours"]
+        tva_collectee, tva_marge = arrays["tva_collectee"], arrays["tva_marge"]
+        marge_brute, marge_nette, tri = arrays["marge_brute"], arrays["marge_nette"], arrays["tri"]
+
+        explains = [self.calculate_estimate(row, include_explain=True).explain for row in inputs] if include_explain else [None] * n
+
+        return [
+            EstimateOutput(
+                dmto=row[0], emoluments=row[1], csi=row[2], debours=debours,
+                tva_collectee=row[3], tva_marge=row[4],
+                marge_brute=row[5], marge_nette=row[6],
+                tri=row[7], explain=explain
+            )
+            for row, explain in zip(
+                np.column_stack((dmto, emoluments, csi, tva_collectee, tva_marge, marge_brute, marge_nette, tri)).tolist(),
+                explains
+            )
+        ]
+
+# Barème version store: every dated barème version, indexed by effective date
+class PinnedBaremes:
+    """Registry stand-in that always serves the same snapshot"""
+    def __init__(self, snapshot: BaremeSnapshot):
+        self._snapshot = snapshot
+
+    def current(self) -> BaremeSnapshot:
+        return self._snapshot
+
+    def add_listener(self, callback):
+        pass
+
+class BaremeVersionStore:
+    """In-memory index of every DMTO / notary barème version keyed by effective date.
+
+    Each file contributes its current tables plus every `historical_versions` entry carrying
+    tables of its own (missing sections are inherited from the current file; entries that only
+    describe a change are not indexed). Both timelines are merged into one sorted list of
+    effective dates, each pointing to a prebuilt snapshot and calculation service, so resolving
+    a transaction date is a bisect and bulk re-estimation never re-reads the files.
+    The index is rebuilt whenever the registry reloads.
+    """
+    DMTO_TABLE_KEYS = ("defaults", "departments")
+    NOTARY_TABLE_KEYS = ("emoluments_tranches", "additional_fees")
+
+    def __init__(self, registry: BaremeRegistry):
+        self.registry = registry
+        self._current_service = TaxCalculationService(registry)
+        self._index = self._build(registry.current())
+        registry.add_listener(self.rebuild)
+
+    def rebuild(self, snapshot: BaremeSnapshot = None):
+        self._index = self._build(snapshot or self.registry.current())
+        logging.info(f"Barème version store rebuilt - {len(self._index['dates'])} versions")
+
+    @staticmethod
+    def _effective_date(data) -> date:
+        for key in ("effective_date", "version"):
+            try:
+                return date.fromisoformat(str(data.get(key))[:10])
+            except ValueError:
+                continue
+        return date.min
+
+    def _versions(self, path: Path, current_tables, table_keys: tuple, restructure) -> List[tuple]:
+        """Sorted (effective_date, tables) pairs for one barème file"""
+        try:
+            raw = BaremeRegistry._read_json(path) if path.exists() else {}
+        except Exception as e:
+            logging.error(f"Cannot read barème history from {path}: {e}")
+            raw = {}
+        base = {k: v for k, v in raw.items() if k != "historical_versions"}
+        versions = {}
+        for entry in raw.get("historical_versions", []):
+            if any(key in entry for key in table_keys):
+                versions[self._effective_date(entry)] = restructure({**base, **entry})
+        # The tables currently served by the registry win over a history entry with the same date
+        versions[self._effective_date(raw or current_tables)] = current_tables
+        return sorted(versions.items(), key=lambda item: item[0])
+
+    def _build(self, snapshot: BaremeSnapshot) -> dict:
+        dmto_versions = self._versions(self.registry.dmto_path, snapshot.dmto_rates, self.DMTO_TABLE_KEYS, dict)
+        notary_versions = self._versions(
+            self.registry.notary_path, snapshot.notaire_baremes, self.NOTARY_TABLE_KEYS, BaremeRegistry._restructure_notary
+        )
+        dmto_dates = [effective for effective, _ in dmto_versions]
+        notary_dates = [effective for effective, _ in notary_versions]
+
+        dates, snapshots, previous = [], [], None
+        for effective in sorted(set(dmto_dates) | set(notary_dates)):
+            # Dates before a file's first version use its earliest known tables
+            dmto = dmto_versions[max(bisect.bisect_right(dmto_dates, effective) - 1, 0)][1]
+            notary = notary_versions[max(bisect.bisect_right(notary_dates, effective) - 1, 0)][1]
+            if previous == (id(dmto), id(notary)):
+                continue
+            previous = (id(dmto), id(notary))
+            dates.append(effective)
+            if dmto is snapshot.dmto_rates and notary is snapshot.notaire_baremes:
+                snapshots.append(snapshot)
+            else:
+                snapshots.append(BaremeSnapshot(dmto, notary, generation=snapshot.generation, mtimes=snapshot.mtimes))
+
+        return {
+            "dates": tuple(dates),
+            "ordinals": np.array([effective.toordinal() for effective in dates], dtype=np.int64),
+            "snapshots": tuple(snapshots),
+            "services": tuple(TaxCalculationService(PinnedBaremes(s)) for s in snapshots)
+        }
+
+    @staticmethod
+    def _as_date(value) -> Optional[date]:
+        if value is None or isinstance(value, date) and not isinstance(value, datetime):
+            return value
+        if isinstance(value, datetime):
+            return value.date()
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+
+    def _position(self, index: dict, on_date: date) -> int:
+        return max(bisect.bisect_right(index["dates"], on_date) - 1, 0)
+
+    def service_for(self, on_date=None) -> TaxCalculationService:
+        """Calculation service bound to the barème in force on `on_date` (current tables if None)"""
+        self.registry.current()  # Picks up file changes, which rebuild the index
+        on_date = self._as_date(on_date)
+        if on_date is None:
+            return self._current_service.pinned()
+        index = self._index
+        return index["services"][self._position(index, on_date)]
+
+    def resolve(self, on_date=None) -> BaremeSnapshot:
+        """Barème snapshot in force on `on_date`"""
+        return self.service_for(on_date).registry.current()
+
+    def versions(self) -> List[Dict[str, Any]]:
+        index = self._index
+        return [
+            {
+                "effective_date": None if effective == date.min else effective.isoformat(),
+                "version": snapshot.version,
+                "dmto_version": snapshot.dmto_rates.get("version"),
+                "notaire_version": snapshot.notaire_baremes.get("version")
+            }
+            for effective, snapshot in zip(index["dates"], index["snapshots"])
+        ]
+
+    def calculate_estimate_batch(self, inputs: List[EstimateInput], include_explain: bool = False) -> List[EstimateOutput]:
+        """Batch estimate pricing each row with the barème in force on its date_transaction.
+
+        Rows are grouped by resolved version with one searchsorted, then each group goes
+        through the vectorized batch path of its version.
+        """
+        current_service = self._current_service.pinned()
+        index = self._index
+        n = len(inputs)
+        ordinals = np.fromiter(
+            (self._as_date(row.date_transaction).toordinal() if row.date_transaction else 0 for row in inputs),
+            dtype=np.int64, count=n
+        )
+        positions = np.maximum(np.searchsorted(index["ordinals"], ordinals, side="right") - 1, 0)
+        positions[ordinals == 0] = -1  # Undated rows use the current tables
+
+        results = [None] * n
+        for position in np.unique(positions).tolist():
+            rows = np.flatnonzero(positions == position).tolist()
+            service = current_service if position < 0 else index["services"][position]
+            for i, result in zip(rows, service.calculate_estimate_batch([inputs[i] for i in rows], include_explain)):
+                results[i] = result
+        return results
+
+# Cash-flow / IRR service
+class CashFlowService:
+    """Dated cash-flow schedules built from project milestones and financing, solved for XIRR.
+
+    Milestones (ISO dates): acquisition `acte` (falls back to `compromis`, `offre`, then created_at),
+    works `travaux_debut` / `travaux_fin`, sale `vente`. Financing: `montant_pret` drawn at acquisition
+    and repaid in fine at sale, `taux_pret` annual interest paid monthly, `frais_pret` paid at
+    acquisition, `duree_mois` holding period used when no sale date is set (default 12).
+    """
+    ACQUISITION_MILESTONES = ("acte", "acte_signe", "compromis", "offre")
+    WORKS_START_MILESTONES = ("travaux_debut", "debut_travaux")
+    WORKS_END_MILESTONES = ("travaux_fin", "fin_travaux")
+    SALE_MILESTONES = ("vente", "revente", "acte_vente")
+    DEFAULT_HOLDING_MONTHS = 12
+
+    @staticmethod
+    def _parse_date(value) -> Optional[datetime]:
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            try:
+                parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            except ValueError:
+                return None
+        return parsed.replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+
+    def _milestone(self, milestones: dict, keys: tuple) -> Optional[datetime]:
+        for key in keys:
+            parsed = self._parse_date(milestones.get(key))
+            if parsed:
+                return parsed
+        return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=65536)
+    def _add_months(value: datetime, months: int) -> datetime:
+        # Cached: portfolio schedules share the same handful of milestone dates
+        month_index = value.month - 1 + months
+        year = value.year + month_index // 12
+        month = month_index % 12 + 1
+        day = min(value.day, calendar.monthrange(year, month)[1])
+        return datetime(year, month, day)
+
+    @staticmethod
+    def _months_between(start: datetime, end: datetime) -> int:
+        return max(1, (end.year - start.year) * 12 + end.month - start.month)
+
+    def build_schedule(self, project: dict, estimate: EstimateOutput) -> List[Dict[str, Any]]:
+        """Dated equity cash flows (negative = outflow) for one project"""
+        milestones = project.get("milestones") or {}
+        financing = project.get("financing") or {}
+
+        acquisition = (
+            self._milestone(milestones, self.ACQUISITION_MILESTONES)
+            or self._parse_date(project.get("created_at"))
+            or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        )
+        sale = self._milestone(milestones, self.SALE_MILESTONES)
+        if not sale or sale <= acquisition:
+            holding_months = int(financing.get("duree_mois") or self.DEFAULT_HOLDING_MONTHS)
+            sale = self._add_months(acquisition, max(1, holding_months))
+
+        works_start = self._milestone(milestones, self.WORKS_START_MILESTONES) or acquisition
+        works_end = self._milestone(milestones, self.WORKS_END_MILESTONES)
+        if not works_end or works_end <= works_start:
+            works_end = works_start + (sale - works_start) * 0.6
+
+        loan = float(financing.get("montant_pret") or 0)
+        loan_rate = float(financing.get("taux_pret") or 0)
+        loan_fees = float(financing.get("frais_pret") or 0)
+
+        flows = []
+        acquisition_costs = (
+            project.get("prix_achat_ttc", 0) + estimate.dmto + estimate.emoluments + estimate.csi
+            + estimate.debours + project.get("frais_agence_ttc", 0)
+        )
+        flows.append({"date": acquisition, "amount": -acquisition_costs, "label": "acquisition"})
+        if loan:
+            flows.append({"date": acquisition, "amount": loan - loan_fees, "label": "deblocage_pret"})
+
+        travaux = project.get("travaux_ttc", 0)
+        if travaux:
+            draws = self._months_between(works_start, works_end)
+            for month in range(draws):
+                flows.append({
+                    "date": self._add_months(works_start, month),
+                    "amount": -travaux / draws,
+                    "label": "travaux"
+                })
+
+        if loan and loan_rate:
+            months = self._months_between(acquisition, sale)
+            for month in range(1, months + 1):
+                flows.append({
+                    "date": min(self._add_months(acquisition, month), sale),
+                    "amount": -loan * loan_rate / 12,
+                    "label": "interets_pret"
+                })
+
+        sale_proceeds = project.get("prix_vente_ttc", 0) - estimate.tva_collectee - estimate.tva_marge
+        flows.append({"date": sale, "amount": sale_proceeds - loan, "label": "vente"})
+
+        flows.sort(key=lambda flow: flow["date"])
+        return flows
+
+    @staticmethod
+    def xirr_batch(schedules: List[List[Dict[str, Any]]], tol: float = 1e-9, max_iter: int = 100) -> np.ndarray:
+        """Annualized IRR (actual/365) for many schedules at once.
+
+        Schedules are padded into a (projects × flows) matrix and solved together with a
+        safeguarded Newton iteration: Newton steps that leave the sign-change bracket fall
+        back to bisection. Schedules without a sign change give NaN.
+        """
+        count = len(schedules)
+        width = max((len(schedule) for schedule in schedules), default=0)
+        if count == 0 or width == 0:
+            return np.full(count, np.nan)
+
+        amounts = np.zeros((count, width))
+        years = np.zeros((count, width))
+        for i, schedule in enumerate(schedules):
+            if not schedule:
+                continue
+            origin = schedule[0]["date"]
+            for k, flow in enumerate(schedule):
+                amounts[i, k] = flow["amount"]
+                years[i, k] = (flow["date"] - origin).days / 365.0
+
+        def npv(rate):
+            discount = (1.0 + rate)[:, None] ** -years
+            value = (amounts * discount).sum(axis=1)
+            derivative = (-years * amounts * discount).sum(axis=1) / (1.0 + rate)
+            return value, derivative
+
+        low = np.full(count, -0.99)
+        high = np.full(count, 10.0)
+        f_low, _ = npv(low)
+        f_high, _ = npv(high)
+        solvable = np.sign(f_low) * np.sign(f_high) < 0
+
+        # Orient the bracket so that npv(neg_side) < 0 < npv(pos_side)
+        neg_side = np.where(f_low < 0, low, high)
+        pos_side = np.where(f_low < 0, high, low)
+        rate = np.full(count, 0.1)
+
+        with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+            for _ in range(max_iter):
+                value, derivative = npv(rate)
+                negative = value < 0
+                neg_side = np.where(negative, rate, neg_side)
+                pos_side = np.where(negative, pos_side, rate)
+
+                newton = rate - value / derivative
+                outside = ~np.isfinite(newton) | ((newton - neg_side) * (newton - pos_side) > 0)
+                next_rate = np.where(outside, (neg_side + pos_side) / 2, newton)
+
+                converged = np.abs(next_rate - rate) < tol
+                rate = next_rate
+                if np.all(converged | ~solvable):
+                    break
+
+        return np.where(solvable, rate, np.nan)
+
+    def xirr(self, schedule: List[Dict[str, Any]]) -> Optional[float]:
+        result = self.xirr_batch([schedule])[0]
+        return None if np.isnan(result) else round(float(result), 4)
+
+    def projects_xirr(self, projects: List[dict]) -> List[Optional[float]]:
+        """XIRR for a list of project documents in one vectorized pass"""
+        results = [None] * len(projects)
+        valid, inputs = [], []
+        for i, project in enumerate(projects):
+            try:
+                inputs.append(build_estimate_input(project))
+                valid.append(i)
+            except Exception as e:
+                logging.warning(f"Cannot build cash flows for project {project.get('id')}: {e}")
+        if not valid:
+            return results
+
+        estimates = bareme_store.calculate_estimate_batch(inputs)
+        schedules = [self.build_schedule(projects[i], estimate) for i, estimate in zip(valid, estimates)]
+        for i, value in zip(valid, self.xirr_batch(schedules)):
+            results[i] = None if np.isnan(value) else round(float(value), 4)
+        return results
+
+# Goal seek: maximum purchase price for a target margin or TRI
+class GoalSeekService:
+    """Inverts the estimate in purchase price.
+
+    Every cost is piecewise linear in the purchase price P: DMTO and CSI are proportional,
+    emoluments follow the tranche schedule on P / 1.20 (with the 5% complexity supplement
+    above 1M€ HT) and TVA sur marge is linear on either side of P = vente - travaux - frais.
+    Net margin is therefore piecewise linear and decreasing in P; each linear piece is solved
+    exactly and the answer is then checked to the cent against calculate_estimate.
+    """
+    COMPLEXITY_THRESHOLD_HT = 1000000
+
+    def _objective(self, service: TaxCalculationService, prix_achat: np.ndarray, params: GoalSeekInput, ratio: float) -> np.ndarray:
+        """Unrounded distance to target; >= 0 means the target is met"""
+        md_b_eligible = params.hypotheses.get("md_b_0715_ok", False)
+        prix_ht = prix_achat / 1.20
+        emoluments = service.emoluments_schedule.emoluments_array(prix_ht)
+        emoluments = np.where(prix_ht > self.COMPLEXITY_THRESHOLD_HT, emoluments * 1.05, emoluments)
+        total_couts = (
+            prix_achat + prix_achat * service.dmto_rate(params.dept, md_b_eligible) + emoluments
+            + prix_achat * service.notaire_baremes["csi_rate"] + service.notaire_baremes["debours_forfait"]
+            + params.travaux_ttc + params.frais_agence_ttc
+        )
+        vente = params.prix_vente_ttc
+        if params.regime_tva == RegimeTVA.NORMAL:
+            tva = vente - vente / 1.20
+        elif params.regime_tva == RegimeTVA.MARGE:
+            marge_ttc = vente - (prix_achat + params.travaux_ttc + params.frais_agence_ttc)
+            tva = np.where(marge_ttc > 0, marge_ttc - marge_ttc / 1.20, 0.0)
+        else:
+            tva = 0.0
+        marge_nette = vente - total_couts - tva
+        if params.target == GoalSeekTarget.TRI:
+            return marge_nette - ratio * total_couts
+        return marge_nette - params.target_value
+
+    def _meets_target(self, estimate: EstimateOutput, params: GoalSeekInput, ratio: float) -> bool:
+        if params.target == GoalSeekTarget.TRI:
+            total_couts = params.prix_vente_ttc - estimate.marge_brute
+            return total_couts > 0 and estimate.marge_nette / total_couts >= ratio - 1e-9
+        return estimate.marge_nette >= params.target_value
+
+    def max_purchase_price(self, params: GoalSeekInput) -> Dict[str, Any]:
+        # An annualized TRI target over duree_mois is the simple ratio (1 + tri)^(duree/12) - 1
+        ratio = params.target_value
+        if params.target == GoalSeekTarget.TRI:
+            if params.target_value <= -1:
+                raise ValidationError("Le TRI visé doit être supérieur à -100%", "target_value")
+            if params.duree_mois:
+                ratio = (1 + params.target_value) ** (params.duree_mois / 12) - 1
+
+        # One barème snapshot for the whole search
+        service = tax_service.pinned()
+        schedule = service.emoluments_schedule
+        upper_bound = 10 * (params.prix_vente_ttc + abs(params.target_value if params.target == GoalSeekTarget.MARGE_NETTE else 0))
+        breakpoints = [1.20 * bound for bound in schedule.lower + schedule.upper if np.isfinite(bound)]
+        breakpoints.append(1.20 * self.COMPLEXITY_THRESHOLD_HT)
+        if params.regime_tva == RegimeTVA.MARGE:
+            breakpoints.append(params.prix_vente_ttc - params.travaux_ttc - params.frais_agence_ttc)
+        edges = np.unique(np.clip(np.array([0.0, upper_bound] + breakpoints), 0.0, upper_bound))
+
+        # Each piece is linear: two interior samples give its exact line, all pieces at once
+        left, right = edges[:-1], edges[1:]
+        x1 = left + (right - left) / 3
+        x2 = left + 2 * (right - left) / 3
+        g1 = self._objective(service, x1, params, ratio)
+        g2 = self._objective(service, x2, params, ratio)
+        slope = (g2 - g1) / (x2 - x1)
+        g_left = g1 + slope * (left - x1)
+        g_right = g1 + slope * (right - x1)
+
+        if g_left[0] < 0:
+            raise BusinessLogicError("Objectif inatteignable, même pour un prix d'achat nul", "GOAL_UNREACHABLE")
+        failing = np.flatnonzero(g_right < 0)
+        if failing.size == 0:
+            raise BusinessLogicError("Objectif atteint quel que soit le prix d'achat testé", "GOAL_UNBOUNDED")
+        k = failing[0]
+        if g_left[k] >= 0 and slope[k] != 0:
+            prix_achat = float(x1[k] - g1[k] / slope[k])
+        else:
+            # Target crossed by a jump (complexity supplement): the breakpoint itself is the last feasible price
+            prix_achat = float(left[k])
+        prix_achat = float(np.floor(min(max(prix_achat, left[k]), right[k]) * 100) / 100)
+
+        estimate_input = EstimateInput(
+            dept=params.dept, regime_tva=params.regime_tva, prix_achat_ttc=prix_achat,
+            prix_vente_ttc=params.prix_vente_ttc, travaux_ttc=params.travaux_ttc,
+            frais_agence_ttc=params.frais_agence_ttc, hypotheses=params.hypotheses
+        )
+        estimate = service.calculate_estimate(estimate_input)
+        # Each fee is rounded to the cent, so the rounded estimate can cross the target a few cents
+        # either side of the exact root: walk down until it is met, then up while it still is
+        for _ in range(100):
+            if self._meets_target(estimate, params, ratio) or estimate_input.prix_achat_ttc <= 0:
+                break
+            estimate_input.prix_achat_ttc = round(estimate_input.prix_achat_ttc - 0.01, 2)
+            estimate = service.calculate_estimate(estimate_input)
+        for _ in range(100):
+            candidate_input = estimate_input.copy(update={"prix_achat_ttc": round(estimate_input.prix_achat_ttc + 0.01, 2)})
+            candidate = service.calculate_estimate(candidate_input)
+            if not self._meets_target(candidate, params, ratio):
+                break
+            estimate_input, estimate = candidate_input, candidate
+
+        return {
+            "prix_achat_max": estimate_input.prix_achat_ttc,
+            "target": params.target.value,
+            "target_value": params.target_value,
+            "tri_simple_cible": round(ratio, 6) if params.target == GoalSeekTarget.TRI else None,
+            "estimate": estimate.dict()
+        }
+
+# Sensitivity grid and tornado analysis
+class SensitivityService:
+    MAX_GRID_POINTS = 40000
+
+    @staticmethod
+    def _axis_values(axis: SensitivityAxis) -> np.ndarray:
+        if axis.values:
+            return np.asarray(axis.values, dtype=float)
+        if axis.min is None or axis.max is None:
+            raise ValidationError(f"Axe {axis.variable.value}: fournir values ou min/max", axis.variable.value)
+        return np.linspace(axis.min, axis.max, axis.steps)
+
+    @staticmethod
+    def _evaluate(params: SensitivityInput, overrides: Dict[SensitivityVariable, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Run the estimate rules once over every scenario; variables not overridden keep their base value"""
+        base = params.base
+        values = {
+            SensitivityVariable.PRIX_ACHAT: base.prix_achat_ttc,
+            SensitivityVariable.PRIX_VENTE: base.prix_vente_ttc,
+            SensitivityVariable.TRAVAUX: base.travaux_ttc,
+            SensitivityVariable.FRAIS_AGENCE: base.frais_agence_ttc,
+            SensitivityVariable.DUREE: params.duree_mois,
+        }
+        values.update(overrides)
+        service = tax_service.pinned()
+        arrays = service.calculate_estimate_arrays(
+            values[SensitivityVariable.PRIX_ACHAT], values[SensitivityVariable.PRIX_VENTE],
+            values[SensitivityVariable.TRAVAUX], values[SensitivityVariable.FRAIS_AGENCE],
+            service.dmto_rate(base.dept, base.hypotheses.get("md_b_0715_ok", False)),
+            base.regime_tva == RegimeTVA.NORMAL, base.regime_tva == RegimeTVA.MARGE
+        )
+        marge_nette, total_couts, duree = np.broadcast_arrays(
+            arrays["marge_nette"], arrays["total_couts"],
+            np.maximum(np.asarray(values[SensitivityVariable.DUREE], dtype=float), 0.5)
+        )
+        return {
+            "marge_nette": marge_nette,
+            "tri": tax_service.annualized_tri_array(marge_nette, total_couts, duree)
+        }
+
+    def grid(self, params: SensitivityInput) -> Dict[str, Any]:
+        x_values = self._axis_values(params.x_axis)
+        y_values = self._axis_values(params.y_axis) if params.y_axis else np.array([np.nan])
+        if params.y_axis and params.y_axis.variable == params.x_axis.variable:
+            raise ValidationError("Les deux axes doivent porter sur des variables différentes", "y_axis")
+        if x_values.size * y_values.size > self.MAX_GRID_POINTS:
+            raise ValidationError(f"Grille trop grande (max {self.MAX_GRID_POINTS} points)", "x_axis")
+
+        # Rows follow y, columns follow x
+        xx, yy = np.meshgrid(x_values, y_values)
+        overrides = {params.x_axis.variable: xx.ravel()}
+        if params.y_axis:
+            overrides[params.y_axis.variable] = yy.ravel()
+        results = self._evaluate(params, overrides)
+        shape = xx.shape
+
+        return {
+            "x_axis": {"variable": params.x_axis.variable.value, "values": x_values.tolist()},
+            "y_axis": {"variable": params.y_axis.variable.value, "values": y_values.tolist()} if params.y_axis else None,
+            "marge_nette": np.round(results["marge_nette"].reshape(shape), 2).tolist(),
+            "tri": np.round(results["tri"].reshape(shape), 4).tolist()
+        }
+
+    def tornado(self, params: SensitivityInput) -> Dict[str, Any]:
+        """One-at-a-time ±variation on each variable, ranked by net margin swing"""
+        variables = list(SensitivityVariable)
+        base = self._evaluate(params, {})
+        base_values = {
+            SensitivityVariable.PRIX_ACHAT: params.base.prix_achat_ttc,
+            SensitivityVariable.PRIX_VENTE: params.base.prix_vente_ttc,
+            SensitivityVariable.TRAVAUX: params.base.travaux_ttc,
+            SensitivityVariable.FRAIS_AGENCE: params.base.frais_agence_ttc,
+            SensitivityVariable.DUREE: params.duree_mois,
+        }
+
+        # Scenario 2k is variable k at -variation, 2k+1 at +variation: all evaluated together
+        factors = np.tile([1 - params.tornado_variation, 1 + params.tornado_variation], len(variables))
+        overrides = {}
+        for k, variable in enumerate(variables):
+            column = np.full(factors.size, float(base_values[variable]))
+            column[2 * k:2 * k + 2] *= factors[2 * k:2 * k + 2]
+            overrides[variable] = column
+        results = self._evaluate(params, overrides)
+
+        bars = []
+        for k, variable in enumerate(variables):
+            low_marge, high_marge = results["marge_nette"][2 * k:2 * k + 2]
+            low_tri, high_tri = results["tri"][2 * k:2 * k + 2]
+            bars.append({
+                "variable": variable.value,
+                "low_value": round(float(base_values[variable] * (1 - params.tornado_variation)), 2),
+                "high_value": round(float(base_values[variable] * (1 + params.tornado_variation)), 2),
+                "marge_nette_low": round(float(low_marge), 2),
+                "marge_nette_high": round(float(high_marge), 2),
+                "tri_low": round(float(low_tri), 4),
+                "tri_high": round(float(high_tri), 4),
+                "swing": round(float(abs(high_marge - low_marge)), 2)
+            })
+        bars.sort(key=lambda bar: bar["swing"], reverse=True)
+        return {
+            "base_marge_nette": round(float(base["marge_nette"][0]), 2),
+            "base_tri": round(float(base["tri"][0]), 4),
+            "variation": params.tornado_variation,
+            "bars": bars
+        }
+
+# Monte Carlo risk simulation
+class MonteCarloService:
+    PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+    @staticmethod
+    def _sample(spec: DistributionSpec, rng: np.random.Generator, size: int, name: str) -> np.ndarray:
+        def required(*fields):
+            missing = [field for field in fields if getattr(spec, field) is None]
+            if missing:
+                raise ValidationError(f"{name}: paramètres manquants pour {spec.distribution.value}: {', '.join(missing)}", name)
+            return [getattr(spec, field) for field in fields]
+
+        if spec.distribution == DistributionType.FIXED:
+            (mean,) = required("mean")
+            return np.full(size, mean)
+        if spec.distribution == DistributionType.UNIFORM:
+            low, high = required("low", "high")
+            return rng.uniform(low, high, size)
+        if spec.distribution == DistributionType.TRIANGULAR:
+            low, mode, high = required("low", "mode", "high")
+            if not low <= mode <= high or low == high:
+                raise ValidationError(f"{name}: il faut low <= mode <= high et low < high", name)
+            return rng.triangular(low, mode, high, size)
+        if spec.distribution == DistributionType.LOGNORMAL:
+            mean, std = required("mean", "std")
+            if mean <= 0:
+                raise ValidationError(f"{name}: la moyenne doit être positive", name)
+            # Parameterised by the mean and standard deviation of the variable itself
+            sigma2 = np.log1p((std / mean) ** 2)
+            return rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+        mean, std = required("mean", "std")
+        return rng.normal(mean, std, size)
+
+    def simulate(self, project: dict, params: SimulationInput) -> Dict[str, Any]:
+        """Draw scenarios and push them through the estimate rules as arrays"""
+        started = time.perf_counter()
+        seed = params.seed if params.seed is not None else int(np.random.SeedSequence().entropy % (2 ** 63))
+        rng = np.random.default_rng(seed)
+        estimate_input = build_estimate_input(project)
+        financing = project.get("financing") or {}
+
+        prix_vente = estimate_input.prix_vente_ttc * np.maximum(self._sample(params.prix_vente_factor, rng, params.draws, "prix_vente_factor"), 0.0)
+        travaux = estimate_input.travaux_ttc * np.maximum(self._sample(params.travaux_factor, rng, params.draws, "travaux_factor"), 0.0)
+        duree_mois = np.maximum(self._sample(params.duree_mois, rng, params.draws, "duree_mois"), 0.5)
+
+        service = tax_service.pinned()
+        arrays = service.calculate_estimate_arrays(
+            estimate_input.prix_achat_ttc, prix_vente, travaux, estimate_input.frais_agence_ttc,
+            service.dmto_rate(estimate_input.dept, estimate_input.hypotheses.get("md_b_0715_ok", False)),
+            estimate_input.regime_tva == RegimeTVA.NORMAL, estimate_input.regime_tva == RegimeTVA.MARGE
+        )
+
+        # Carrying cost of the loan over the drawn holding period
+        interets = float(financing.get("montant_pret") or 0) * float(financing.get("taux_pret") or 0) * duree_mois / 12
+        marge_nette = arrays["marge_nette"] - interets
+        total_couts = arrays["total_couts"] + interets
+
+        tri = tax_service.annualized_tri_array(marge_nette, total_couts, duree_mois)
+
+        def summary(values: np.ndarray) -> Dict[str, float]:
+            percentiles = np.percentile(values, self.PERCENTILES)
+            return {
+                "mean": round(float(values.mean()), 4),
+                "std": round(float(values.std()), 4),
+                **{f"p{p}": round(float(v), 4) for p, v in zip(self.PERCENTILES, percentiles)}
+            }
+
+        return {
+            "project_id": project.get("id"),
+            "draws": params.draws,
+            "seed": seed,
+            "marge_nette": summary(marge_nette),
+            "tri": summary(tri),
+            "probability_of_loss": round(float((marge_nette < 0).mean()), 4),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+# Initialize services
+tax_service = TaxCalculationService()
+bareme_store = BaremeVersionStore(bareme_registry)
+auth_service = AuthenticationService()
+risk_service = RiskAssessmentService()
+tracfin_service = TracfinService()
+cashflow_service = CashFlowService()
+monte_carlo_service = MonteCarloService()
+sensitivity_service = SensitivityService()
+goal_seek_service = GoalSeekService()
+
+# API Routes
+@api_router.get("/")
+async def root():
+    return {"message": "Marchands de Biens API", "version": "1.0.0"}
+
+# Authentication endpoints (unchanged)
+@api_router.post("/auth/session")
+async def create_session(response: Response, session_id: str = Form(...)):
+    try:
+        logging.info(f"Attempting session creation with session_id: {session_id[:20]}...")
+        session_data = await auth_service.get_session_data_from_emergent(session_id)
+        
+        if not session_data:
+            logging.warning(f"No session data returned for session_id: {session_id[:20]}...")
+            raise HTTPException(status_code=400, detail="Invalid session ID")
+        
+        logging.info(f"Session data received for user: {session_data.email}")
+        user = await auth_service.create_or_get_user(session_data)
+        user_session = await auth_service.create_user_session(user.id, session_data.session_token)
+        
+        if session_signer.enabled:
+            cookie_value = session_signer.issue(user, session_data.session_token, user_session.expires_at)
+        else:
+            cookie_value = session_data.session_token
+        set_session_cookie(response, cookie_value)
+        
+        logging.info(f"Session created successfully for user: {user.email}")
+        return {
+            "user": user.dict(),
+            "session_expires": user_session.expires_at.isoformat()
         }
         
     except HTTPException:
@@ -1261,7 +2626,11 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 @api_router.post("/auth/logout")
 async def logout(response: Response, session_token: Optional[str] = Cookie(None, alias="session_token")):
     if session_token:
-        await auth_service.logout_user(session_token)
+        if session_signer.enabled and session_signer.is_signed(session_token):
+            session_cache.invalidate_token(session_token)
+            session_token = await session_signer.revoke(session_token)
+        if session_token:
+            await auth_service.logout_user(session_token)
     
     response.delete_cookie(
         key="session_token",
@@ -1271,6 +2640,11 @@ async def logout(response: Response, session_token: Optional[str] = Cookie(None,
     )
     return {"message": "Logged out successfully"}
 
+@api_router.get("/auth/session-cache/stats")
+async def get_session_cache_stats(current_user: User = Depends(require_auth)):
+    """Hit/miss counters of the session cache (per worker)"""
+    return session_cache.stats()
+
 @api_router.post("/auth/dev-session")
 async def create_dev_session(response: Response):
     """Temporary endpoint for development authentication bypass"""
@@ -1324,18 +2698,8 @@ async def upload_kyc_document(
         if file.content_type not in allowed_types:
             raise HTTPException(status_code=400, detail="Type de fichier non autorisé")
         
-        # Store file in GridFS
-        file_content = await file.read()
-        gridfs_id = await fs.upload_from_stream(
-            file.filename,
-            io.BytesIO(file_content),
-            metadata={
-                "user_id": current_user.id,
-                "document_type": document_type.value,
-                "content_type": file.content_type,
-                "original_filename": file.filename
-            }
-        )
+        # Store file in the blob store, shared with identical project documents
+        blob = await blob_store.put(file, file.content_type)
         
         # Create KYC document record
         kyc_doc = KYCDocument(
@@ -1343,11 +2707,16 @@ async def upload_kyc_document(
             document_type=document_type,
             filename=file.filename,
             original_filename=file.filename,
-            file_size=len(file_content),
+            file_size=blob["size"],
             content_type=file.content_type,
-            gridfs_id=str(gridfs_id)
+            sha256=blob["sha256"]
         )
-        await db.kyc_documents.insert_one(kyc_doc.dict())
+        try:
+            await db.kyc_documents.insert_one(kyc_doc.dict())
+        except Exception:
+            # No record points at the blob: drop the reference put() just took
+            await blob_store.release(blob["sha256"])
+            raise
         
         # Create TRACFIN event for document upload
         await tracfin_service.create_event(TracfinEventCreate(
@@ -1359,6 +2728,8 @@ async def upload_kyc_document(
         
         return {"message": "Document KYC uploadé avec succès", "document_id": kyc_doc.id}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload: {str(e)}")
 
@@ -1401,6 +2772,7 @@ async def validate_kyc_document(
             {"id": current_user.id},
             {"$set": {"kyc_status": KYCStatus.VALIDE.value}}
         )
+        session_cache.invalidate_user(current_user.id)
     
     return {"message": "Document validé avec succès"}
 
@@ -1494,18 +2866,44 @@ async def create_risk_assessment(
 
 # Estimator endpoints (unchanged but now with TRACFIN integration)
 @api_router.post("/estimate/run", response_model=EstimateOutput)
-async def run_estimate(inputs: EstimateInput, current_user: Optional[User] = Depends(get_current_user)):
+async def run_estimate(
+    inputs: EstimateInput,
+    explain: bool = False,
+    current_user: Optional[User] = Depends(get_current_user)
+):
     try:
-        result = tax_service.calculate_estimate(inputs)
+        # One barème snapshot for the key, the calculation and the stored version
+        service = bareme_store.service_for(inputs.date_transaction)
+        snapshot = service.registry.current()
+        cache_key = estimate_cache.make_key(inputs, snapshot)
+        result = estimate_cache.get(cache_key)
+        if result is None:
+            result = service.calculate_estimate(inputs)
+            estimate_cache.set(cache_key, result)
         
-        estimate_record = {
-            "id": str(uuid.uuid4()),
-            "inputs": inputs.dict(),
-            "outputs": result.dict(),
-            "user_id": current_user.id if current_user else None,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.estimates.insert_one(estimate_record)
+        # The computation is shared between callers, the stored estimate belongs to each of them;
+        # it is persisted once per caller and input set, with the figures only: the calculation
+        # steps are rebuilt from the inputs when the explain endpoint asks for them
+        user_id = current_user.id if current_user else None
+        estimate_id = estimate_cache.get_record_id(cache_key, user_id)
+        if estimate_id is None:
+            estimate_record = {
+                "id": str(uuid.uuid4()),
+                "inputs": inputs.dict(),
+                "outputs": result.dict(exclude={"explain", "id", "steps"}),
+                "input_hash": cache_key,
+                "bareme_version": snapshot.version,
+                "user_id": user_id,
+                "created_at": datetime.now(timezone.utc).isoformat()
+            }
+            await db.estimates.insert_one(estimate_record)
+            estimate_id = estimate_record["id"]
+            estimate_cache.set_record_id(cache_key, user_id, estimate_id)
+        
+        update = {"id": estimate_id}
+        if explain:
+            update["explain"] = tax_service.render_explain(result.steps)
+        result = result.copy(update=update)
         
         # Create TRACFIN event for high-value estimates
         if current_user and inputs.prix_achat_ttc > 150000:
@@ -1521,6 +2919,111 @@ async def run_estimate(inputs: EstimateInput, current_user: Optional[User] = Dep
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erreur de calcul: {str(e)}")
 
+# Figures a replayed estimate must reproduce for its steps to describe the stored one
+ESTIMATE_FIGURES = ("dmto", "emoluments", "csi", "debours", "tva_collectee", "tva_marge", "marge_brute", "marge_nette", "tri")
+
+@api_router.get("/estimate/{estimate_id}/explain")
+async def get_estimate_explain(estimate_id: str, current_user: User = Depends(require_auth)):
+    """Render the calculation detail of a stored estimate on demand"""
+    record = await db.estimates.find_one({"id": estimate_id}, {"_id": 0, "user_id": 1, "inputs": 1, "outputs": 1})
+    # Estimates are private to whoever ran them; the owner can read every one
+    if not record or (current_user.role != UserRole.OWNER and record.get("user_id") != current_user.id):
+        raise HTTPException(status_code=404, detail="Estimate not found")
+    
+    outputs = record.get("outputs", {})
+    # Estimates stored with their steps, or before structured steps with their explain text
+    if outputs.get("steps"):
+        return {"id": estimate_id, "explain": tax_service.render_explain(outputs["steps"])}
+    if outputs.get("explain"):
+        return {"id": estimate_id, "explain": outputs["explain"]}
+    
+    # Replay the calculation on the barème in force for the transaction date
+    inputs = EstimateInput(**record["inputs"])
+    result = bareme_store.service_for(inputs.date_transaction).calculate_estimate(inputs)
+    if any(getattr(result, field) != outputs.get(field) for field in ESTIMATE_FIGURES):
+        raise HTTPException(
+            status_code=409,
+            detail="Le barème a changé depuis cette estimation : relancez le calcul pour obtenir son détail"
+        )
+    return {"id": estimate_id, "explain": tax_service.render_explain(result.steps)}
+
+@api_router.post("/estimate/batch", response_model=EstimateBatchOutput)
+async def run_estimate_batch(batch: EstimateBatchInput, current_user: Optional[User] = Depends(get_current_user)):
+    """Screen a deal list in one vectorized pass per barème version (nothing is persisted)"""
+    try:
+        results = bareme_store.calculate_estimate_batch(batch.rows, include_explain=batch.include_explain)
+        logging.info(f"Batch estimate: {len(results)} rows for {current_user.email if current_user else 'anonymous'}")
+        return EstimateBatchOutput(count=len(results), results=results)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erreur de calcul: {str(e)}")
+
+@api_router.post("/estimate/sensitivity")
+async def run_sensitivity(params: SensitivityInput, current_user: Optional[User] = Depends(get_current_user)):
+    """Sensitivity grid and tornado ranking in one vectorized pass (persisted only on request)"""
+    result = {
+        "grid": sensitivity_service.grid(params),
+        "tornado": sensitivity_service.tornado(params)
+    }
+    
+    if params.persist:
+        analysis_record = {
+            "id": str(uuid.uuid4()),
+            "inputs": params.dict(),
+            "outputs": result,
+            "user_id": current_user.id if current_user else None,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await db.sensitivity_analyses.insert_one(analysis_record)
+        result["id"] = analysis_record["id"]
+        
+        if current_user and params.base.prix_achat_ttc > 150000:
+            await tracfin_service.create_event(TracfinEventCreate(
+                user_id=current_user.id,
+                event_type=TracfinEventType.OPERATION_IMPORTANTE,
+                description=f"Analyse de sensibilité - {params.base.prix_achat_ttc:,.0f} €",
+                amount=params.base.prix_achat_ttc,
+                metadata={"dept": params.base.dept, "regime_tva": params.base.regime_tva.value}
+            ))
+    
+    return result
+
+@api_router.post("/estimate/goal-seek")
+async def run_goal_seek(params: GoalSeekInput, current_user: Optional[User] = Depends(get_current_user)):
+    """Maximum purchase price that still reaches a target net margin or TRI"""
+    return goal_seek_service.max_purchase_price(params)
+
+@api_router.get("/baremes/versions")
+async def list_bareme_versions():
+    """Every indexed barème version with its effective date"""
+    return {"current": bareme_registry.current().version, "versions": bareme_store.versions()}
+
+@api_router.get("/baremes/resolve")
+async def resolve_bareme(date_transaction: str):
+    """Barème tables in force on a transaction date"""
+    try:
+        snapshot = bareme_store.resolve(date_transaction)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date_transaction doit être une date ISO (AAAA-MM-JJ)")
+    return {
+        "date_transaction": date_transaction,
+        "version": snapshot.version,
+        "dmto": {
+            "version": snapshot.dmto_rates.get("version"),
+            "defaults": dict(snapshot.dmto_rates.get("defaults", {}))
+        },
+        "notaire": {
+            "version": snapshot.notaire_baremes.get("version"),
+            "emoluments_tranches": [dict(t) for t in snapshot.notaire_baremes["emoluments_tranches"]],
+            "csi_rate": snapshot.notaire_baremes["csi_rate"],
+            "debours_forfait": snapshot.notaire_baremes["debours_forfait"]
+        }
+    }
+
+@api_router.get("/estimate/cache/stats")
+async def get_estimate_cache_stats(current_user: User = Depends(require_auth)):
+    """Estimate memoization cache metrics"""
+    return estimate_cache.stats()
+
 # Project endpoints (unchanged structure but with enhanced logging)
 async def get_accessible_projects(user: User) -> List[str]:
     if user.role == UserRole.OWNER:
@@ -1539,11 +3042,22 @@ async def get_accessible_projects(user: User) -> List[str]:
         ).to_list(1000)
         return [p["id"] for p in projects]
 
-async def require_auth(session_token: Optional[str] = Cookie(None, alias="session_token")):
+async def require_auth(response: Response, session_token: Optional[str] = Cookie(None, alias="session_token")):
     """Require authentication - simplified version"""
     if not session_token:
         raise HTTPException(status_code=401, detail="Authentication required")
     
+    # Signed tokens are verified locally, without touching Mongo
+    if session_signer.enabled and session_signer.is_signed(session_token):
+        user = await session_signer.authenticate(session_token, response)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid session")
+        return user
+    
+    cached = session_cache.get(session_token)
+    if cached:
+        return cached
+    
     # Get user from session
     user_session = await db.user_sessions.find_one({"session_token": session_token})
     if not user_session:
@@ -1566,14 +3080,12 @@ async def require_auth(session_token: Optional[str] = Cookie(None, alias="sessio
     if not user_data:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return User(**user_data)
+    user = User(**user_data)
+    session_cache.set(session_token, user, expires_at)
+    return user
 
-async def check_project_access(project_id: str, user: User, access_type: str = "read"):
-    """Check if user has access to project"""
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
+def authorize_project_access(project: dict, user: User, access_type: str = "read"):
+    """Check if user has access to an already loaded project"""
     # Check access based on user role and project ownership
     if user.role == UserRole.OWNER:
         return True  # Owner has access to all projects
@@ -1584,105 +3096,778 @@ async def check_project_access(project_id: str, user: User, access_type: str = "
     else:
         raise HTTPException(status_code=403, detail="Access denied")
 
-# Projects API endpoints
-@api_router.get("/projects", response_model=List[ProjectResponse])
-async def get_projects(current_user: User = Depends(require_auth)):
-    """Get projects based on user role"""
-    if current_user.role == UserRole.OWNER:
-        projects = await db.projects.find().to_list(length=None)
-    elif current_user.role in [UserRole.PM, UserRole.ANALYSTE]:
-        projects = await db.projects.find({
-            "$or": [
-                {"owner_id": current_user.id},
-                {"team_members": current_user.id}
-            ]
-        }).to_list(length=None)
+def project_loader(access_type: str = "read"):
+    """Dependency loading the path's project once and checking access on that document.
+
+    FastAPI caches a dependency's result for the duration of a request, so the project is
+    fetched a single time however many dependencies of the route ask for it.
+    """
+    async def load_project(project_id: str, current_user: User = Depends(require_auth)) -> dict:
+        project = await db.projects.find_one({"id": project_id})
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        authorize_project_access(project, current_user, access_type)
+        return project
+    return load_project
+
+load_project_for_read = project_loader("read")
+load_project_for_write = project_loader("write")
+
+def project_visibility_filter(user: User) -> dict:
+    """Mongo filter for the projects a user may list, based on role"""
+    if user.role == UserRole.OWNER:
+        return {}
+    elif user.role in [UserRole.PM, UserRole.ANALYSTE]:
+        return {"$or": [{"owner_id": user.id}, {"team_members": user.id}]}
     else:  # INVITE
-        projects = await db.projects.find({"team_members": current_user.id}).to_list(length=None)
-    
-    return [ProjectResponse(**project) for project in projects]
+        return {"team_members": user.id}
 
-# Original create_project endpoint removed - replaced with new implementation below
+def encode_keyset_cursor(timestamp, item_id: str) -> str:
+    """Opaque keyset cursor pointing after an item in (timestamp, id) descending order"""
+    if isinstance(timestamp, datetime) and timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    payload = json.dumps({"u": timestamp.isoformat(), "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
 
-@api_router.post("/projects", response_model=ProjectResponse)
-@limiter.limit("5/minute")  # Limit project creation
-async def create_project(
-    request: Request,
-    project: ProjectCreate,
-    current_user: User = Depends(require_auth)
-):
-    """Create a new project"""
-    if current_user.role not in [UserRole.OWNER, UserRole.PM]:
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
-    # Create new project
-    new_project = {
-        "id": str(uuid.uuid4()),
-        "label": project.label,
-        "address": project.address,
-        "status": "DETECTE",
-        "regime_tva": project.regime_tva,
-        "prix_achat_ttc": project.prix_achat_ttc,
-        "prix_vente_ttc": project.prix_vente_ttc,
-        "travaux_ttc": project.travaux_ttc,
-        "frais_agence_ttc": project.frais_agence_ttc,
-        "marge_estimee": project.prix_vente_ttc - project.prix_achat_ttc - project.travaux_ttc - project.frais_agence_ttc,
-        "tri_estime": 0.15,
-        "owner_id": current_user.id,
-        "team_members": [],
-        "documents": [],
-        "tasks": [],
-        "events": [
-            {
-                "id": str(uuid.uuid4()),
-                "type": "project_created",
-                "description": "Projet créé",
-                "user": current_user.name,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            }
+def decode_keyset_cursor(cursor: str, field: str) -> dict:
+    """Mongo condition selecting the items after a cursor, for a (field, id) descending sort"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        timestamp = datetime.fromisoformat(payload["u"])
+        item_id = str(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return {"$or": [
+        {field: {"$lt": timestamp}},
+        {field: timestamp, "id": {"$lt": item_id}}
+    ]}
+
+def encode_project_cursor(project: dict) -> str:
+    # Same fallback as normalize_project_timestamps for a project written without updated_at
+    timestamp = parse_timestamp(project.get("updated_at")) or parse_timestamp(project.get("created_at")) or TIMESTAMP_FLOOR
+    return encode_keyset_cursor(timestamp, project["id"])
+
+def decode_project_cursor(cursor: str) -> dict:
+    return decode_keyset_cursor(cursor, "updated_at")
+
+CLOSED_TASK_STATUSES = (TaskStatus.TERMINE.value, "completed", "done")
+
+# Project records: events, documents and tasks live in their own collections, keyed by project_id
+class ProjectRecordsService:
+    """Events, documents and tasks of a project, stored outside the project document.
+
+    Each collection is indexed on (project_id, <time field>) and paginated with the same
+    keyset cursors as the project list. get_project still returns documents, tasks and the
+    most recent events so existing clients keep their shape.
+    """
+    EMBEDDED_EVENTS_LIMIT = 50
+    # collection name -> time field used for ordering
+    TIME_FIELDS = {"project_events": "timestamp", "project_documents": "uploaded_at", "project_tasks": "created_at"}
+
+    @staticmethod
+    async def log_event(project_id: str, event_type: str, description: str, user: Optional[str] = None,
+                        metadata: Optional[Dict[str, Any]] = None) -> ProjectEvent:
+        event = ProjectEvent(
+            project_id=project_id,
+            event_type=event_type,
+            description=description,
+            user=user,
+            metadata=metadata or {}
+        )
+        await db.project_events.insert_one(event.dict())
+        return event
+
+    @staticmethod
+    async def add_document(project_id: str, document: dict) -> dict:
+        document = {**document, "project_id": project_id}
+        await db.project_documents.insert_one(dict(document))
+        return document
+
+    @staticmethod
+    async def get_document(project_id: str, document_id: str) -> Optional[dict]:
+        return await db.project_documents.find_one({"project_id": project_id, "id": document_id}, {"_id": 0})
+
+    @staticmethod
+    async def remove_document(project_id: str, document_id: str) -> bool:
+        result = await db.project_documents.delete_one({"project_id": project_id, "id": document_id})
+        return result.deleted_count > 0
+
+    @staticmethod
+    async def add_task(project_id: str, task: dict) -> dict:
+        task = {**task, "project_id": project_id}
+        await db.project_tasks.insert_one(dict(task))
+        return task
+
+    @staticmethod
+    async def update_task_status(project_id: str, task_id: str, status: str) -> bool:
+        result = await db.project_tasks.update_one(
+            {"project_id": project_id, "id": task_id},
+            {"$set": {"status": status}}
+        )
+        return result.matched_count > 0
+
+    async def page(self, collection: str, project_id: str, limit: int, cursor: Optional[str] = None,
+                   filters: Optional[dict] = None) -> tuple:
+        """One page of a project's records, newest first, plus the cursor of the next page"""
+        field = self.TIME_FIELDS[collection]
+        query = {"project_id": project_id, **(filters or {})}
+        if cursor:
+            query = {"$and": [query, decode_keyset_cursor(cursor, field)]}
+        items = await db[collection].find(query, {"_id": 0}).sort(
+            [(field, DESCENDING), ("id", DESCENDING)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_keyset_cursor(items[-1][field], items[-1]["id"])
+        return items, next_cursor
+
+    async def attach(self, project: dict) -> dict:
+        """Project document with its documents, tasks and most recent events, oldest first"""
+        documents, tasks, events = await asyncio.gather(
+            db.project_documents.find({"project_id": project["id"]}, {"_id": 0}).sort("uploaded_at", 1).to_list(length=None),
+            db.project_tasks.find({"project_id": project["id"]}, {"_id": 0}).sort("created_at", 1).to_list(length=None),
+            db.project_events.find({"project_id": project["id"]}, {"_id": 0}).sort("timestamp", DESCENDING).limit(
+                self.EMBEDDED_EVENTS_LIMIT
+            ).to_list(length=self.EMBEDDED_EVENTS_LIMIT)
+        )
+        return {**project, "documents": documents, "tasks": tasks, "events": events[::-1]}
+
+    @staticmethod
+    async def counts(project_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Document and open task counts per project, grouped in Mongo"""
+        documents, open_tasks = await asyncio.gather(
+            db.project_documents.aggregate([
+                {"$match": {"project_id": {"$in": project_ids}}},
+                {"$group": {"_id": "$project_id", "count": {"$sum": 1}}}
+            ]).to_list(length=None),
+            db.project_tasks.aggregate([
+                {"$match": {"project_id": {"$in": project_ids}, "status": {"$nin": list(CLOSED_TASK_STATUSES)}}},
+                {"$group": {"_id": "$project_id", "count": {"$sum": 1}}}
+            ]).to_list(length=None)
+        )
+        counts = {project_id: {"documents_count": 0, "open_tasks_count": 0} for project_id in project_ids}
+        for row in documents:
+            counts[row["_id"]]["documents_count"] = row["count"]
+        for row in open_tasks:
+            counts[row["_id"]]["open_tasks_count"] = row["count"]
+        return counts
+
+    @staticmethod
+    async def delete_for_project(project_id: str):
+        async for document in db.project_documents.find(
+            {"project_id": project_id, "sha256": {"$exists": True}}, {"sha256": 1, "file_path": 1}
+        ):
+            if blob_store.owns(document["file_path"]):
+                await blob_store.release(document["sha256"])
+        await asyncio.gather(
+            db.project_events.delete_many({"project_id": project_id}),
+            db.project_documents.delete_many({"project_id": project_id}),
+            db.project_tasks.delete_many({"project_id": project_id})
+        )
+
+    @staticmethod
+    def _parse_timestamp(value) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return datetime.now(timezone.utc)
+
+    async def migrate_embedded(self) -> int:
+        """One-shot move of embedded events/documents/tasks arrays into their collections.
+
+        Records are upserted by (project_id, id) before the arrays are unset, so an
+        interrupted run is simply resumed on the next start.
+        """
+        migrated = 0
+        async for project in db.projects.find(
+            {"$or": [{"events": {"$exists": True}}, {"documents": {"$exists": True}}, {"tasks": {"$exists": True}}]},
+            {"_id": 1, "id": 1, "events": 1, "documents": 1, "tasks": 1}
+        ):
+            project_id = project["id"]
+            records = {"project_events": [], "project_documents": [], "project_tasks": []}
+            for event in project.get("events") or []:
+                records["project_events"].append(ProjectEvent(
+                    id=event.get("id") or str(uuid.uuid4()),
+                    project_id=project_id,
+                    event_type=event.get("type") or event.get("event_type") or "event",
+                    description=event.get("description", ""),
+                    user=event.get("user"),
+                    metadata=event.get("details") or event.get("metadata") or {},
+                    timestamp=self._parse_timestamp(event.get("timestamp"))
+                ).dict())
+            for document in project.get("documents") or []:
+                records["project_documents"].append({
+                    **document,
+                    "project_id": project_id,
+                    "uploaded_at": self._parse_timestamp(document.get("uploaded_at"))
+                })
+            for task in project.get("tasks") or []:
+                records["project_tasks"].append({
+                    **task,
+                    "id": task.get("id") or str(uuid.uuid4()),
+                    "project_id": project_id,
+                    "created_at": self._parse_timestamp(task.get("created_at"))
+                })
+            for collection, items in records.items():
+                if items:
+                    await db[collection].bulk_write([
+                        UpdateOne({"project_id": project_id, "id": item["id"]}, {"$setOnInsert": item}, upsert=True)
+                        for item in items
+                    ], ordered=False)
+            await db.projects.update_one({"_id": project["_id"]}, {"$unset": {"events": "", "documents": "", "tasks": ""}})
+            migrated += 1
+        if migrated:
+            logging.info(f"Migrated embedded events/documents/tasks of {migrated} projects")
+        return migrated
+
+project_records = ProjectRecordsService()
+
+class ProjectChangeFeed:
+    """Fan-out of project-level diffs to live subscribers (GET /api/projects/live).
+
+    Mutation endpoints publish each change once. When the database supports change
+    streams (replica set), changes go through the project_changes collection so that
+    subscribers connected to any app instance receive them; otherwise they are
+    broadcast in-process, which covers single-node deployments.
+    """
+
+    QUEUE_SIZE = 100
+    HEARTBEAT_SECONDS = 15
+    RETRY_SECONDS = 30
+
+    def __init__(self):
+        self.subscribers: Dict[asyncio.Queue, User] = {}
+        self.distributed = False
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, user: User) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.subscribers[queue] = user
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.pop(queue, None)
+
+    async def refresh(self, queue: asyncio.Queue, session_token: str) -> bool:
+        """Re-resolve a subscriber's session so logouts, revocations and role changes
+        reach open streams; returns False (and unsubscribes) once the session is gone"""
+        if session_signer.enabled and session_signer.is_signed(session_token):
+            user = await session_signer.authenticate(session_token)
+        else:
+            user = await AuthenticationService.get_user_from_session_token(session_token)
+        if not user:
+            self.unsubscribe(queue)
+            return False
+        self.subscribers[queue] = user
+        return True
+
+    @staticmethod
+    def _can_read(access: dict, user: User) -> bool:
+        try:
+            return authorize_project_access(access, user, "read")
+        except HTTPException:
+            return False
+
+    def _deliver(self, change: dict):
+        access = change["access"]
+        message = {key: value for key, value in change.items() if key not in ("_id", "access", "created_at")}
+        for queue, user in list(self.subscribers.items()):
+            if not self._can_read(access, user):
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and let it reload the projects instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    async def publish(self, project: dict, change_type: str, /, **payload):
+        """Push a diff of `project` to every subscriber allowed to read it"""
+        change = jsonable_encoder({
+            "type": change_type,
+            "project_id": project["id"],
+            "timestamp": datetime.now(timezone.utc),
+            **payload
+        })
+        change["access"] = {"owner_id": project.get("owner_id"), "team_members": project.get("team_members", [])}
+        if self.distributed:
+            try:
+                await db.project_changes.insert_one({**change, "created_at": datetime.now(timezone.utc)})
+                return
+            except Exception as e:
+                logging.error(f"Failed to publish project change, delivering locally: {e}")
+        self._deliver(change)
+
+    async def _watch(self):
+        resume_after = None
+        while True:
+            try:
+                async with db.project_changes.watch(
+                    [{"$match": {"operationType": "insert"}}], resume_after=resume_after
+                ) as stream:
+                    while stream.alive:
+                        # try_next() opens the stream, so a standalone server fails here
+                        change = await stream.try_next()
+                        if not self.distributed:
+                            self.distributed = True
+                            logging.info("Project live updates distributed through change streams")
+                        if change:
+                            self._deliver(change["fullDocument"])
+                        resume_after = stream.resume_token
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.distributed:
+                    logging.warning(f"Project change stream interrupted, broadcasting in-process: {e}")
+                else:
+                    logging.info(f"Change streams unavailable, broadcasting project updates in-process: {e}")
+                self.distributed = False
+            await asyncio.sleep(self.RETRY_SECONDS)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+project_feed = ProjectChangeFeed()
+
+
+# Fields read by the summary view: displayed columns plus what the cash-flow TRI needs
+PROJECT_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "label": 1, "address": 1, "status": 1, "regime_tva": 1,
+    "prix_achat_ttc": 1, "prix_vente_ttc": 1, "travaux_ttc": 1, "frais_agence_ttc": 1,
+    "marge_estimee": 1, "tri_estime": 1, "owner_id": 1, "team_members": 1, "flags": 1, "milestones": 1, "financing": 1,
+    "created_at": 1, "updated_at": 1
+}
+
+# Projects API endpoints
+@api_router.get("/projects", response_model=List[Union[ProjectSummary, ProjectListItem]])
+async def get_projects(
+    response: Response,
+    view: ProjectView = Query(ProjectView.FULL, description="summary: colonnes du pipeline uniquement"),
+    status: Optional[List[ProjectStatus]] = Query(None, description="Filtrer par statut (répétable)"),
+    dept: Optional[str] = Query(None, description="Filtrer par département"),
+    regime_tva: Optional[RegimeTVA] = Query(None, description="Filtrer par régime TVA"),
+    limit: int = Query(100, ge=1, le=500, description="Nombre maximum de projets par page"),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    current_user: User = Depends(require_auth)
+):
+    """Get projects based on user role, most recently updated first.
+
+    Keyset-paginated on (updated_at, id): when more projects remain, the X-Next-Cursor
+    response header carries the cursor of the next page. `view=summary` returns slim rows
+    with document and open task counts. Neither view carries documents, tasks or events:
+    GET /projects/{id} and its /documents, /tasks and /events endpoints serve them.
+    """
+    conditions = [project_visibility_filter(current_user)]
+    if status:
+        conditions.append({"status": {"$in": [s.value for s in status]}})
+    if dept:
+        conditions.append({"address.dept": dept})
+    if regime_tva:
+        conditions.append({"regime_tva": regime_tva.value})
+    if cursor:
+        conditions.append(decode_project_cursor(cursor))
+    conditions = [condition for condition in conditions if condition]
+    query = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else {})
+    
+    sort = [("updated_at", DESCENDING), ("id", DESCENDING)]
+    projection = PROJECT_SUMMARY_PROJECTION if view == ProjectView.SUMMARY else None
+    projects = await db.projects.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+    
+    if len(projects) > limit:
+        projects = projects[:limit]
+        response.headers["X-Next-Cursor"] = encode_project_cursor(projects[-1])
+    
+    # Cash-flow TRI for the whole listing in one vectorized solve
+    tri_values = cashflow_service.projects_xirr(projects)
+    if view == ProjectView.SUMMARY:
+        # Document and open task counts grouped server-side for the whole page
+        counts = await project_records.counts([project["id"] for project in projects])
+        return [
+            ProjectSummary(**{
+                **project, **counts[project["id"]],
+                "dept": (project.get("address") or {}).get("dept"), "tri_cashflow": tri
+            })
+            for project, tri in zip(projects, tri_values)
+        ]
+    return [ProjectListItem(**{**project, "tri_cashflow": tri}) for project, tri in zip(projects, tri_values)]
+
+# Portfolio analytics
+def portfolio_pipeline(match: dict) -> List[dict]:
+    """KPIs of the visible projects in one pass: totals plus status, department and month breakdowns"""
+    def amount(field):
+        return {"$sum": {"$ifNull": [f"${field}", 0]}}
+    return [
+        {"$match": match},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "projects": {"$sum": 1},
+                "investment": amount("prix_achat_ttc"),
+                "revenue": amount("prix_vente_ttc"),
+                "margin": amount("marge_estimee"),
+                "tri_sum": amount("tri_estime")
+            }}],
+            "by_status": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}, "margin": amount("marge_estimee")}},
+                {"$sort": {"_id": 1}}
+            ],
+            "by_dept": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$address.dept", "Inconnu"]},
+                    "count": {"$sum": 1},
+                    "investment": amount("prix_achat_ttc"),
+                    "margin": amount("marge_estimee")
+                }},
+                {"$sort": {"count": -1, "_id": 1}}
+            ],
+            "by_month": [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_at", "onNull": "Inconnu"}},
+                    "count": {"$sum": 1},
+                    "margin": amount("marge_estimee")
+                }},
+                {"$sort": {"_id": 1}}
+            ]
+        }}
+    ]
+
+def format_portfolio(facets: dict) -> Dict[str, Any]:
+    totals = (facets.get("totals") or [{}])[0]
+    projects = totals.get("projects", 0)
+    investment = totals.get("investment", 0)
+    margin = totals.get("margin", 0)
+    return {
+        "totals": {
+            "projects": projects,
+            "investment": round(investment, 2),
+            "revenue": round(totals.get("revenue", 0), 2),
+            "margin": round(margin, 2),
+            "average_tri": round(totals.get("tri_sum", 0) / projects, 4) if projects else 0.0,
+            "average_margin": round(margin / projects, 2) if projects else 0.0,
+            "margin_rate": round(margin / investment, 4) if investment else 0.0
+        },
+        "by_status": [{"status": row["_id"], "count": row["count"], "margin": round(row["margin"], 2)} for row in facets.get("by_status", [])],
+        "by_dept": [
+            {"dept": row["_id"], "count": row["count"], "investment": round(row["investment"], 2), "margin": round(row["margin"], 2)}
+            for row in facets.get("by_dept", [])
         ],
+        "by_month": [{"month": row["_id"], "count": row["count"], "margin": round(row["margin"], 2)} for row in facets.get("by_month", [])]
+    }
+
+class PortfolioStatsService:
+    """Materialized portfolio KPIs per visibility scope, kept current with $inc deltas.
+
+    Scopes mirror project_visibility_filter: "all" for owners, "member:<id>" for the
+    owner and team members of a project (PM/analyst view) and "team:<id>" for team
+    members only (guest view). Every project write applies the difference between the
+    old and new contribution of the project; rebuild() recomputes all scopes from the
+    projects collection to correct any drift.
+    """
+
+    GLOBAL_SCOPE = "all"
+    PROJECTION = {
+        "_id": 0, "status": 1, "address": 1, "prix_achat_ttc": 1, "prix_vente_ttc": 1,
+        "marge_estimee": 1, "tri_estime": 1, "owner_id": 1, "team_members": 1, "created_at": 1
+    }
+
+    def scope_for(self, user: User) -> str:
+        if user.role == UserRole.OWNER:
+            return self.GLOBAL_SCOPE
+        elif user.role in [UserRole.PM, UserRole.ANALYSTE]:
+            return f"member:{user.id}"
+        return f"team:{user.id}"
+
+    @staticmethod
+    def _key(value) -> str:
+        """Bucket name usable as a Mongo field name"""
+        return str(getattr(value, "value", value)).replace(".", "_").replace("$", "_")
+
+    @staticmethod
+    def _month(created_at) -> str:
+        if isinstance(created_at, str):
+            try:
+                created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+            except ValueError:
+                return "Inconnu"
+        return created_at.strftime("%Y-%m") if isinstance(created_at, datetime) else "Inconnu"
+
+    def _scopes(self, project: dict) -> List[str]:
+        team = list(dict.fromkeys(project.get("team_members") or []))
+        members = list(dict.fromkeys(([project["owner_id"]] if project.get("owner_id") else []) + team))
+        return [self.GLOBAL_SCOPE] + [f"member:{m}" for m in members] + [f"team:{m}" for m in team]
+
+    def _contribution(self, project: dict) -> Dict[str, float]:
+        """$inc paths and amounts one project adds to each of its scopes"""
+        investment = project.get("prix_achat_ttc") or 0
+        margin = project.get("marge_estimee") or 0
+        status = self._key(project.get("status") or "DETECTE")
+        dept = self._key((project.get("address") or {}).get("dept") or "Inconnu")
+        month = self._month(project.get("created_at"))
+        return {
+            "projects": 1,
+            "investment": investment,
+            "revenue": project.get("prix_vente_ttc") or 0,
+            "margin": margin,
+            "tri_sum": project.get("tri_estime") or 0,
+            f"by_status.{status}.count": 1,
+            f"by_status.{status}.margin": margin,
+            f"by_dept.{dept}.count": 1,
+            f"by_dept.{dept}.investment": investment,
+            f"by_dept.{dept}.margin": margin,
+            f"by_month.{month}.count": 1,
+            f"by_month.{month}.margin": margin
+        }
+
+    @staticmethod
+    def _typed(path: str, amount: float):
+        """Counters stay integers so $inc never turns them into doubles"""
+        return int(amount) if path == "projects" or path.endswith(".count") else amount
+
+    def _deltas(self, before: Optional[dict], after: Optional[dict]) -> Dict[str, Dict[str, float]]:
+        deltas = defaultdict(lambda: defaultdict(float))
+        for project, sign in ((before, -1), (after, 1)):
+            if not project:
+                continue
+            contribution = self._contribution(project)
+            for scope in self._scopes(project):
+                for path, amount in contribution.items():
+                    deltas[scope][path] += sign * amount
+        return {
+            scope: {path: self._typed(path, amount) for path, amount in fields.items() if amount}
+            for scope, fields in deltas.items()
+            if any(fields.values())
+        }
+
+    async def apply(self, before: Optional[dict], after: Optional[dict]):
+        """Record a project write: None before for a creation, None after for a deletion"""
+        deltas = self._deltas(before, after)
+        if not deltas:
+            return
+        now = datetime.now(timezone.utc)
+        try:
+            await db.portfolio_stats.bulk_write([
+                UpdateOne({"scope": scope}, {"$inc": fields, "$set": {"updated_at": now}}, upsert=True)
+                for scope, fields in deltas.items()
+            ], ordered=False)
+        except Exception as e:
+            # The project write already succeeded; a rebuild will correct the rollups
+            logging.error(f"Failed to update portfolio stats: {e}")
+
+    async def read(self, user: User) -> Dict[str, Any]:
+        """KPIs of the caller's scope from a single document lookup"""
+        stats = await db.portfolio_stats.find_one({"scope": self.scope_for(user)}, {"_id": 0}) or {}
+
+        def rows(field, key=None):
+            items = [{"_id": name, **values} for name, values in (stats.get(field) or {}).items() if values.get("count")]
+            return sorted(items, key=key or (lambda row: row["_id"]))
+
+        return format_portfolio({
+            "totals": [stats] if stats.get("projects") else [],
+            "by_status": rows("by_status"),
+            "by_dept": rows("by_dept", key=lambda row: (-row["count"], row["_id"])),
+            "by_month": rows("by_month")
+        })
+
+    async def rebuild(self) -> int:
+        """Recompute every scope from the projects collection; returns the number of scopes.
+
+        Writes landing while the scan runs may be counted twice or missed, so run it
+        at a quiet time (or run it again).
+        """
+        totals = defaultdict(lambda: defaultdict(float))
+        async for project in db.projects.find({}, self.PROJECTION):
+            contribution = self._contribution(project)
+            for scope in self._scopes(project):
+                for path, amount in contribution.items():
+                    totals[scope][path] += amount
+
+        now = datetime.now(timezone.utc)
+        replacements = []
+        for scope, fields in totals.items():
+            document = {"scope": scope, "updated_at": now}
+            for path, amount in fields.items():
+                *parents, leaf = path.split(".")
+                node = document
+                for parent in parents:
+                    node = node.setdefault(parent, {})
+                node[leaf] = self._typed(path, amount)
+            replacements.append(ReplaceOne({"scope": scope}, document, upsert=True))
+        if replacements:
+            await db.portfolio_stats.bulk_write(replacements, ordered=False)
+        await db.portfolio_stats.delete_many({"scope": {"$nin": list(totals)}})
+        logging.info(f"Rebuilt portfolio stats for {len(totals)} scopes")
+        return len(totals)
+
+portfolio_stats = PortfolioStatsService()
+
+@api_router.get("/analytics/portfolio")
+async def get_portfolio_analytics(
+    live: bool = Query(False, description="Recalculer depuis les projets au lieu des agrégats matérialisés"),
+    current_user: User = Depends(require_auth)
+):
+    """Portfolio KPIs over the projects the caller can see"""
+    if not live:
+        return await portfolio_stats.read(current_user)
+    facets = await db.projects.aggregate(portfolio_pipeline(project_visibility_filter(current_user))).to_list(length=1)
+    return format_portfolio(facets[0] if facets else {})
+
+@api_router.post("/analytics/portfolio/rebuild")
+async def rebuild_portfolio_analytics(current_user: User = Depends(require_auth)):
+    """Recompute the materialized portfolio KPIs (owners only)"""
+    if current_user.role != UserRole.OWNER:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    return {"scopes": await portfolio_stats.rebuild()}
+
+@api_router.get("/projects/live")
+async def stream_project_changes(
+    request: Request,
+    current_user: User = Depends(require_auth),
+    session_token: Optional[str] = Cookie(None, alias="session_token")
+):
+    """Server-sent events carrying diffs of the projects the caller can see"""
+    queue = project_feed.subscribe(current_user)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            checked_at = time.monotonic()
+            while True:
+                try:
+                    change = await asyncio.wait_for(queue.get(), timeout=ProjectChangeFeed.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    change = None
+                # Checked every heartbeat interval, busy or not, and before anything is sent
+                if time.monotonic() - checked_at >= ProjectChangeFeed.HEARTBEAT_SECONDS:
+                    if await request.is_disconnected() or not await project_feed.refresh(queue, session_token):
+                        break
+                    checked_at = time.monotonic()
+                if change is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(change)}\n\n"
+        finally:
+            project_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Original create_project endpoint removed - replaced with new implementation below
+
+@api_router.post("/projects", response_model=ProjectResponse)
+@limiter.limit("5/minute")  # Limit project creation
+async def create_project(
+    request: Request,
+    project: ProjectCreate,
+    current_user: User = Depends(require_auth)
+):
+    """Create a new project"""
+    if current_user.role not in [UserRole.OWNER, UserRole.PM]:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    # Create new project
+    new_project = {
+        "id": str(uuid.uuid4()),
+        "label": project.label,
+        "address": project.address,
+        "status": "DETECTE",
+        "regime_tva": project.regime_tva,
+        "prix_achat_ttc": project.prix_achat_ttc,
+        "prix_vente_ttc": project.prix_vente_ttc,
+        "travaux_ttc": project.travaux_ttc,
+        "frais_agence_ttc": project.frais_agence_ttc,
+        "marge_estimee": project.prix_vente_ttc - project.prix_achat_ttc - project.travaux_ttc - project.frais_agence_ttc,
+        "tri_estime": 0.15,
+        "owner_id": current_user.id,
+        "team_members": [],
         "created_at": datetime.now(timezone.utc),
         "updated_at": datetime.now(timezone.utc)
     }
     
     result = await db.projects.insert_one(new_project)
     new_project["_id"] = str(result.inserted_id)
+    await portfolio_stats.apply(None, new_project)
+    event = await project_records.log_event(new_project["id"], "project_created", "Projet créé", current_user.name)
     
-    return ProjectResponse(**new_project)
+    created_project = ProjectResponse(**new_project, events=[event.dict()])
+    await project_feed.publish(new_project, "project_created", project=created_project.dict())
+    return created_project
 
 @api_router.get("/projects/{project_id}", response_model=ProjectResponse)
 async def get_project(
     project_id: str,
-    current_user: User = Depends(require_auth)
+    project: dict = Depends(load_project_for_read)
 ):
-    """Get project by ID"""
-    await check_project_access(project_id, current_user, "read")
-    
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    """Get project by ID, with its documents, tasks and most recent events"""
+    return ProjectResponse(**await project_records.attach(project))
+
+@api_router.get("/projects/{project_id}/events", response_model=List[ProjectEvent])
+async def list_project_events(
+    project_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    project: dict = Depends(load_project_for_read)
+):
+    """Project history, newest first (keyset-paginated)"""
+    events, next_cursor = await project_records.page("project_events", project_id, limit, cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return events
+
+@api_router.get("/projects/{project_id}/cashflows")
+async def get_project_cashflows(
+    project_id: str,
+    project: dict = Depends(load_project_for_read)
+):
+    """Dated cash-flow schedule and XIRR for a project"""
+    try:
+        estimate_input = build_estimate_input(project)
+        estimate = bareme_store.service_for(estimate_input.date_transaction).calculate_estimate(estimate_input)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erreur de calcul: {str(e)}")
     
-    return ProjectResponse(**project)
+    schedule = cashflow_service.build_schedule(project, estimate)
+    return {
+        "project_id": project_id,
+        "tri": cashflow_service.xirr(schedule),
+        "tri_simple": estimate.tri,
+        "cashflows": [
+            {"date": flow["date"].date().isoformat(), "amount": round(flow["amount"], 2), "label": flow["label"]}
+            for flow in schedule
+        ]
+    }
+
+@api_router.post("/projects/{project_id}/simulate")
+async def simulate_project(
+    project_id: str,
+    params: SimulationInput = SimulationInput(),
+    project: dict = Depends(load_project_for_read)
+):
+    """Monte Carlo simulation of net margin and TRI for a project"""
+    # Up to a million draws: run the array work off the event loop
+    return await asyncio.to_thread(monte_carlo_service.simulate, project, params)
 
 @api_router.patch("/projects/{project_id}")
 async def update_project(
     project_id: str,
     project: ProjectUpdate,
+    existing_project: dict = Depends(load_project_for_write),
     current_user: User = Depends(require_auth)
 ):
     """Update project details"""
-    # Check if project exists and user has access
-    existing_project = await db.projects.find_one({"id": project_id})
-    if not existing_project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Check permissions (allow if owner_id is null for dev/test data)
-    if (existing_project.get("owner_id") is not None and
-        existing_project["owner_id"] != current_user.id and 
-        current_user.id not in existing_project.get("team_members", []) and
-        current_user.role not in [UserRole.OWNER]):
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
     # Update project
     update_data = project.dict(exclude_unset=True)
     if "prix_achat_ttc" in update_data or "prix_vente_ttc" in update_data or "travaux_ttc" in update_data or "frais_agence_ttc" in update_data:
@@ -1696,71 +3881,57 @@ async def update_project(
     
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    # Add event
-    event = {
-        "id": str(uuid.uuid4()),
-        "type": "project_update",
-        "description": f"Projet modifié : {update_data.get('label', existing_project['label'])}",
-        "user": current_user.name,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.projects.update_one(
+    # The pre-image makes the portfolio stats delta exact even under concurrent writes
+    previous_project = await db.projects.find_one_and_update(
         {"id": project_id},
-        {
-            "$set": update_data,
-            "$push": {"events": event}
-        }
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
     )
+    if not previous_project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    updated_project = {**previous_project, **update_data}
+    await portfolio_stats.apply(previous_project, updated_project)
+    await project_feed.publish(updated_project, "project_updated", changes=update_data)
     
-    updated_project = await db.projects.find_one({"id": project_id})
+    # Add event
+    await project_records.log_event(
+        project_id, "project_update",
+        f"Projet modifié : {update_data.get('label', previous_project['label'])}",
+        current_user.name
+    )
     return ProjectResponse(**updated_project)
 
 @api_router.patch("/projects/{project_id}/status")
 async def update_project_status(
     project_id: str, 
     status_data: ProjectStatusUpdate, 
-    current_user=Depends(get_current_user)
+    project: dict = Depends(load_project_for_write),
+    current_user: User = Depends(require_auth)
 ):
     """Update project status with event logging"""
-    existing_project = await db.projects.find_one({"id": project_id})
-    if not existing_project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Check permissions (allow if owner_id is null for dev/test data)
-    if (existing_project.get("owner_id") is not None and
-        existing_project["owner_id"] != current_user.id and 
-        current_user.id not in existing_project.get("team_members", []) and
-        current_user.role not in [UserRole.OWNER, UserRole.PM]):
-        raise HTTPException(status_code=403, detail="Insufficient permissions")
-    
-    old_status = existing_project.get("status", "DETECTE")
     new_status = status_data.status
     
-    # Add status change event
-    status_event = {
-        "id": str(uuid.uuid4()),
-        "type": "status_change",
-        "description": f"Statut changé de {old_status} vers {new_status}",
-        "user": current_user.name,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "details": {"old_status": old_status, "new_status": new_status}
-    }
-    
-    # Update project
-    await db.projects.update_one(
+    # Update project, keeping the pre-image for the portfolio stats delta and the old status
+    changes = {"status": new_status, "updated_at": datetime.now(timezone.utc)}
+    previous_project = await db.projects.find_one_and_update(
         {"id": project_id},
-        {
-            "$set": {
-                "status": new_status,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            },
-            "$push": {"events": status_event}
-        }
+        {"$set": changes},
+        return_document=ReturnDocument.BEFORE
     )
+    if not previous_project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    old_status = previous_project.get("status", "DETECTE")
+    updated_project = {**previous_project, **changes}
+    await portfolio_stats.apply(previous_project, updated_project)
+    await project_feed.publish(updated_project, "status_change", changes=changes, old_status=old_status)
     
-    # Return updated project
-    updated_project = await db.projects.find_one({"id": project_id})
+    # Add status change event
+    await project_records.log_event(
+        project_id, "status_change",
+        f"Statut changé de {old_status} vers {new_status}",
+        current_user.name,
+        {"old_status": old_status, "new_status": new_status}
+    )
     return ProjectResponse(**updated_project)
 
 @api_router.delete("/projects/{project_id}")
@@ -1780,14 +3951,125 @@ async def delete_project(
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     # Delete project
-    result = await db.projects.delete_one({"id": project_id})
+    deleted_project = await db.projects.find_one_and_delete({"id": project_id})
     
-    if result.deleted_count == 0:
+    if not deleted_project:
         raise HTTPException(status_code=404, detail="Project not found")
+    await portfolio_stats.apply(deleted_project, None)
+    await project_records.delete_for_project(project_id)
+    await project_feed.publish(deleted_project, "project_deleted")
     
     return {"message": "Project deleted successfully", "id": project_id}
 
 # Documents API endpoints
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+async def save_upload(upload: UploadFile, destination: Path, max_size: int = MAX_DOCUMENT_SIZE) -> tuple:
+    """Stream an upload to `destination` in fixed-size chunks; returns (size, sha256 hex).
+
+    Each chunk is hashed and written to a temporary file next to the destination in a
+    worker thread, so memory stays at one chunk per upload and the event loop never
+    waits on the disk. The file only appears under its final name once complete.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    buffer = await asyncio.to_thread(open, temp_path, "wb")
+
+    def write_chunk(chunk: bytes):
+        digest.update(chunk)
+        buffer.write(chunk)
+
+    def finish():
+        buffer.flush()
+        os.fsync(buffer.fileno())
+        buffer.close()
+        os.replace(temp_path, destination)
+
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=413, detail=f"File too large (max {max_size // (1024 * 1024)}MB)")
+            await asyncio.to_thread(write_chunk, chunk)
+        await asyncio.to_thread(finish)
+    except BaseException:
+        buffer.close()
+        temp_path.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
+class BlobStore:
+    """Content-addressed file store shared by project documents and KYC files.
+
+    Files live at <root>/<2 first hex digits>/<sha256>; the blobs collection counts
+    the records pointing at each one, so identical uploads share a single file and
+    the file is removed when its last reference goes away.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def owns(self, file_path: str) -> bool:
+        # Records written before the root was anchored to ROOT_DIR hold relative paths
+        path = Path(file_path)
+        return (path if path.is_absolute() else ROOT_DIR / path).parent.parent == self.root
+
+    async def put(self, upload: UploadFile, content_type: Optional[str] = None,
+                  max_size: int = MAX_DOCUMENT_SIZE) -> dict:
+        """Store an upload (or add a reference to identical content); returns sha256, size, path"""
+        incoming = self.root / "incoming" / uuid.uuid4().hex
+        size, sha256 = await save_upload(upload, incoming, max_size)
+        final_path = self.path_for(sha256)
+        try:
+            # Reference first: a concurrent release() of the same content then keeps the file
+            await db.blobs.update_one(
+                {"sha256": sha256},
+                {
+                    "$inc": {"refcount": 1},
+                    "$set": {"updated_at": datetime.now(timezone.utc)},
+                    "$setOnInsert": {"size": size, "content_type": content_type, "created_at": datetime.now(timezone.utc)}
+                },
+                upsert=True
+            )
+            deduplicated = await asyncio.to_thread(final_path.exists)
+            if not deduplicated:
+                await asyncio.to_thread(final_path.parent.mkdir, parents=True, exist_ok=True)
+                await asyncio.to_thread(os.replace, incoming, final_path)
+        finally:
+            await asyncio.to_thread(incoming.unlink, missing_ok=True)
+        return {"sha256": sha256, "size": size, "path": str(final_path), "deduplicated": deduplicated}
+
+    async def release(self, sha256: str):
+        """Drop one reference; the file is deleted with the last one"""
+        blob = await db.blobs.find_one_and_update(
+            {"sha256": sha256}, {"$inc": {"refcount": -1}}, return_document=ReturnDocument.AFTER
+        )
+        if not blob or blob["refcount"] > 0:
+            return
+        # Move the file aside before forgetting the blob, so an upload of the same content
+        # racing with us either re-references it (and the file is put back) or re-creates it
+        final_path = self.path_for(sha256)
+        tombstone = final_path.with_name(f"{sha256}.{uuid.uuid4().hex}.deleted")
+        try:
+            await asyncio.to_thread(os.replace, final_path, tombstone)
+        except FileNotFoundError:
+            tombstone = None
+        result = await db.blobs.delete_one({"sha256": sha256, "refcount": {"$lte": 0}})
+        if tombstone is None:
+            return
+        if result.deleted_count or await asyncio.to_thread(final_path.exists):
+            await asyncio.to_thread(tombstone.unlink, missing_ok=True)
+        else:
+            await asyncio.to_thread(os.replace, tombstone, final_path)
+
+blob_store = BlobStore(ROOT_DIR / os.environ.get("BLOB_STORE_DIR", "uploads/blobs"))
+
 @api_router.post("/projects/{project_id}/documents")
 @limiter.limit("10/minute")  # Limit uploads to prevent abuse
 async def upload_document(
@@ -1795,13 +4077,13 @@ async def upload_document(
     project_id: str,
     file: UploadFile = File(...),
     category: str = Form(...),
-    current_user: User = Depends(require_auth)
+    current_user: User = Depends(require_auth),
+    project: dict = Depends(load_project_for_write)
 ):
     """Upload document to project"""
-    await check_project_access(project_id, current_user, "write")
     
-    # Validate file size (50MB max)
-    if file.size > 50 * 1024 * 1024:
+    # Validate file size (50MB max) when the client declared it; save_upload enforces it anyway
+    if file.size and file.size > MAX_DOCUMENT_SIZE:
         raise HTTPException(status_code=413, detail="File too large (max 50MB)")
     
     # Validate file type
@@ -1818,20 +4100,13 @@ async def upload_document(
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="File type not allowed")
     
-    # Create upload directory
-    upload_dir = Path("uploads") / project_id
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
     # Generate unique filename
     file_id = str(uuid.uuid4())
     file_extension = allowed_types.get(file.content_type, Path(file.filename).suffix)
     safe_filename = f"{file_id}{file_extension}"
-    file_path = upload_dir / safe_filename
     
-    # Save file
-    content = await file.read()
-    with open(file_path, "wb") as buffer:
-        buffer.write(content)
+    # Save file in the blob store (identical content already uploaded is only referenced)
+    blob = await blob_store.put(file, file.content_type)
     
     # Create document record
     document = {
@@ -1839,118 +4114,217 @@ async def upload_document(
         "filename": file.filename,
         "safe_filename": safe_filename,
         "category": category,
-        "file_path": str(file_path),
-        "size": len(content),
+        "file_path": blob["path"],
+        "size": blob["size"],
+        "sha256": blob["sha256"],
         "content_type": file.content_type,
         "uploaded_by": current_user.id,
-        "uploaded_at": datetime.now(timezone.utc).isoformat()
+        "uploaded_at": datetime.now(timezone.utc)
     }
     
-    # Add to project
-    await db.projects.update_one(
-        {"id": project_id},
-        {"$push": {"documents": document}}
-    )
-    
-    # Add event
-    event = {
-        "id": str(uuid.uuid4()),
-        "type": "document_upload",
-        "description": f"Document ajouté: {file.filename}",
-        "user": current_user.name,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.projects.update_one(
-        {"id": project_id},
-        {"$push": {"events": event}}
-    )
+    # Add to project and log the event
+    try:
+        document = await project_records.add_document(project_id, document)
+    except Exception:
+        # No record points at the blob: drop the reference put() just took
+        await blob_store.release(blob["sha256"])
+        raise
+    await project_records.log_event(project_id, "document_upload", f"Document ajouté: {file.filename}", current_user.name)
+    await project_feed.publish(project, "document_added", document=document)
     
     logging.info(f"Document uploaded: {file.filename} by {current_user.name}")
-    return {"message": "Document uploaded successfully", "document": document}
+    return {"message": "Document uploaded successfully", "document": document, "deduplicated": blob["deduplicated"]}
+
+@api_router.get("/projects/{project_id}/documents")
+async def list_project_documents(
+    project_id: str,
+    response: Response,
+    category: Optional[str] = Query(None, description="Filtrer par catégorie"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    project: dict = Depends(load_project_for_read)
+):
+    """Project documents, most recent first (keyset-paginated)"""
+    documents, next_cursor = await project_records.page(
+        "project_documents", project_id, limit, cursor, {"category": category} if category else None
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return documents
+
+class DocumentFileResponse(FileResponse):
+    """FileResponse that can serve a single byte range (206 Partial Content).
+
+    Whole files keep FileResponse's path: http.response.pathsend (zero-copy) when the
+    server offers it, thread-offloaded chunked reads otherwise. A range is sent with
+    http.response.zerocopysend (sendfile) when available, else read chunk by chunk.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: Path, byte_range: Optional[tuple] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        self.byte_range = byte_range
+        if byte_range:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.stat_result.st_size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        if not self.byte_range or scope["method"].upper() == "HEAD":
+            return await super().__call__(scope, receive, send)
+
+        start, end = self.byte_range
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        file = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": end - start + 1
+                })
+                return
+            await asyncio.to_thread(file.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(file.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank under us: close the body anyway
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await asyncio.to_thread(file.close)
+
+def parse_byte_range(header: str, size: int) -> Optional[tuple]:
+    """(start, end) of a single "bytes=" range; None when it cannot be honoured as such.
+
+    Multi-range requests are answered with the whole file, which RFC 9110 allows.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, _, last = ranges.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416, detail="Range Not Satisfiable", headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)"""
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return "*" in candidates or etag in candidates
 
 @api_router.get("/projects/{project_id}/documents/{document_id}/download")
 async def download_document(
+    request: Request,
     project_id: str,
     document_id: str,
-    current_user: User = Depends(require_auth)
+    inline: bool = Query(False, description="Afficher dans le navigateur plutôt que télécharger"),
+    project: dict = Depends(load_project_for_read)
 ):
-    """Download document from project"""
-    await check_project_access(project_id, current_user, "read")
-    
-    # Find project and document
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    document = next((doc for doc in project.get("documents", []) if doc["id"] == document_id), None)
+    """Download document from project, with Range and conditional GET support"""
+    document = await project_records.get_document(project_id, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     file_path = Path(document["file_path"])
-    if not file_path.exists():
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found on disk")
     
-    return StreamingResponse(
-        open(file_path, "rb"),
+    # Blob-stored files are named by content, so their hash is a strong validator
+    if document.get("sha256"):
+        etag = f'"{document["sha256"]}"'
+    else:
+        etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_byte_range(range_header, stat_result.st_size)
+    
+    return DocumentFileResponse(
+        file_path,
+        byte_range=byte_range,
+        headers=headers,
         media_type=document["content_type"],
-        headers={"Content-Disposition": f"attachment; filename={document['filename']}"}
+        filename=document["filename"],
+        stat_result=stat_result,
+        content_disposition_type="inline" if inline else "attachment"
     )
 
 @api_router.delete("/projects/{project_id}/documents/{document_id}")
 async def delete_document(
     project_id: str,
     document_id: str,
-    current_user: User = Depends(require_auth)
+    current_user: User = Depends(require_auth),
+    project: dict = Depends(load_project_for_write)
 ):
     """Delete document from project"""
-    await check_project_access(project_id, current_user, "write")
-    
-    # Find project and document
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    document = next((doc for doc in project.get("documents", []) if doc["id"] == document_id), None)
+    document = await project_records.get_document(project_id, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Delete file from disk
-    file_path = Path(document["file_path"])
-    if file_path.exists():
-        file_path.unlink()
-    
-    # Remove from project
-    await db.projects.update_one(
-        {"id": project_id},
-        {"$pull": {"documents": {"id": document_id}}}
-    )
-    
-    # Add event
-    event = {
-        "id": str(uuid.uuid4()),
-        "type": "document_delete",
-        "description": f"Document supprimé: {document['filename']}",
-        "user": current_user.name,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
+    # Release the blob, or delete a file stored before the blob store
+    if document.get("sha256") and blob_store.owns(document["file_path"]):
+        await blob_store.release(document["sha256"])
+    else:
+        await asyncio.to_thread(Path(document["file_path"]).unlink, missing_ok=True)
     
-    await db.projects.update_one(
-        {"id": project_id},
-        {"$push": {"events": event}}
-    )
+    # Remove from project and log the event
+    await project_records.remove_document(project_id, document_id)
+    await project_records.log_event(project_id, "document_delete", f"Document supprimé: {document['filename']}", current_user.name)
+    await project_feed.publish(project, "document_removed", document_id=document_id)
     
     return {"message": "Document deleted successfully"}
 
 # Tasks API endpoints
+@api_router.get("/projects/{project_id}/tasks")
+async def list_project_tasks(
+    project_id: str,
+    response: Response,
+    status: Optional[str] = Query(None, description="Filtrer par statut"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé dans l'en-tête X-Next-Cursor"),
+    project: dict = Depends(load_project_for_read)
+):
+    """Project tasks, most recent first (keyset-paginated)"""
+    tasks, next_cursor = await project_records.page(
+        "project_tasks", project_id, limit, cursor, {"status": status} if status else None
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
+
 @api_router.post("/projects/{project_id}/tasks")
 async def create_task(
     project_id: str,
     task_data: dict,
-    current_user: User = Depends(require_auth)
+    current_user: User = Depends(require_auth),
+    project: dict = Depends(load_project_for_write)
 ):
     """Create new task for project"""
-    await check_project_access(project_id, current_user, "write")
     
     task = {
         "id": str(uuid.uuid4()),
@@ -1958,13 +4332,11 @@ async def create_task(
         "status": task_data.get("status", "pending"),
         "due_date": task_data.get("due_date"),
         "created_by": current_user.id,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
     
-    await db.projects.update_one(
-        {"id": project_id},
-        {"$push": {"tasks": task}}
-    )
+    task = await project_records.add_task(project_id, task)
+    await project_feed.publish(project, "task_added", task=task)
     
     return {"message": "Task created successfully", "task": task}
 
@@ -1973,269 +4345,336 @@ async def update_task(
     project_id: str,
     task_id: str, 
     task_data: dict,
-    current_user: User = Depends(require_auth)
+    project: dict = Depends(load_project_for_write)
 ):
     """Update task status"""
-    await check_project_access(project_id, current_user, "write")
-    
-    await db.projects.update_one(
-        {"id": project_id, "tasks.id": task_id},
-        {"$set": {"tasks.$.status": task_data["status"]}}
-    )
+    await project_records.update_task_status(project_id, task_id, task_data["status"])
+    await project_feed.publish(project, "task_updated", task_id=task_id, status=task_data["status"])
     
     return {"message": "Task updated successfully"}
 
 # PDF Export endpoints
+class PDFRenderPool:
+    """Bounded process pool for ReportLab renders, keeping them off the event loop.
+
+    At most `concurrency` renders run at once (one per worker by default); further
+    requests wait their turn without blocking anything, and beyond `queue_limit`
+    waiting requests are refused with a 503. stats() exposes the queue depth.
+    Workers are spawned, not forked, and only import pdf_reports.
+    """
+
+    def __init__(self, workers: int, concurrency: Optional[int] = None, queue_limit: int = 100):
+        self.workers = workers
+        self.concurrency = concurrency or workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.render_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def render(self, function, *args) -> bytes:
+        """Run a pdf_reports renderer in a worker process; arguments must be plain data"""
+        if self.queued >= self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Trop de dossiers en cours de génération, réessayez dans un instant",
+                headers={"Retry-After": "5"}
+            )
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), function, *args)
+            self.rendered += 1
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory): start a fresh pool for the next renders
+            self.failed += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.render_seconds += time.perf_counter() - start
+            self.running -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "queue_limit": self.queue_limit,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "average_render_ms": round(self.render_seconds / (self.rendered + self.failed) * 1000, 1)
+            if self.rendered + self.failed else 0.0
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+pdf_render_pool = PDFRenderPool(
+    workers=int(os.environ.get("PDF_RENDER_WORKERS", min(4, os.cpu_count() or 1))),
+    concurrency=int(os.environ["PDF_RENDER_CONCURRENCY"]) if os.environ.get("PDF_RENDER_CONCURRENCY") else None,
+    queue_limit=int(os.environ.get("PDF_RENDER_QUEUE_LIMIT", 100))
+)
+
+# Project fields read by the dossier renderers
+PDF_PROJECT_FIELDS = (
+    "id", "label", "address", "status", "regime_tva", "prix_achat_ttc", "prix_vente_ttc",
+    "travaux_ttc", "frais_agence_ttc", "marge_estimee", "flags", "created_at"
+)
+
+def plain_data(value):
+    """Copy made of builtin types only (enums become their values), so that worker
+    processes can unpickle it without importing the app"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {key: plain_data(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain_data(item) for item in value]
+    return value
+
+def dossier_inputs(project: dict, documents: Optional[List[dict]] = None) -> tuple:
+    """Plain-dict project (and document list) for the dossier renderers"""
+    project_input = plain_data({field: project[field] for field in PDF_PROJECT_FIELDS if field in project})
+    if documents is None:
+        return project_input, None
+    return project_input, [{"filename": d.get("filename"), "category": d.get("category")} for d in documents]
+
+@api_router.get("/exports/pdf/stats")
+async def get_pdf_render_stats(current_user: User = Depends(require_auth)):
+    """Queue depth and throughput of the PDF render pool (per worker)"""
+    return pdf_render_pool.stats()
+
+def dossier_filename(kind: str, project: dict) -> str:
+    return f"dossier_{kind}_{project.get('label', 'projet').replace(' ', '_')}.pdf"
+
+def content_disposition(filename: str, disposition_type: str = "attachment") -> str:
+    """Content-Disposition for any project label: an ASCII filename for old clients plus the
+    UTF-8 name in filename* (RFC 5987), like FileResponse does for document downloads"""
+    ascii_name = "".join(
+        char if char.isascii() and char.isprintable() and char not in '"\\;/' else "_"
+        for char in unicodedata.normalize("NFKD", filename) if not unicodedata.combining(char)
+    )
+    return f"{disposition_type}; filename=\"{ascii_name}\"; filename*=utf-8''{quote(filename, safe='')}"
+
+async def project_documents_for_export(project_id: str) -> List[dict]:
+    return await db.project_documents.find({"project_id": project_id}, {"_id": 0}).sort("uploaded_at", 1).to_list(length=None)
+
 @api_router.get("/projects/{project_id}/export/bank")
 async def export_bank_dossier(
     project_id: str,
-    current_user: User = Depends(require_auth)
+    project: dict = Depends(load_project_for_read)
 ):
     """Generate bank dossier PDF"""
-    await check_project_access(project_id, current_user, "read")
-    
-    # Get project data
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    # Get estimate for this project
+    # Get estimate and documents for this project
     estimate_data = await get_project_estimate(project)
-    
-    # Generate PDF
-    buffer = io.BytesIO()
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor='#d97706',
-        alignment=1  # Center
-    )
-    
-    # Build PDF content
-    story = []
-    
-    # Title
-    story.append(Paragraph("DOSSIER BANQUE", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Project info
-    story.append(Paragraph(f"<b>Projet:</b> {project.get('label', 'N/A')}", styles['Normal']))
-    if project.get('address'):
-        story.append(Paragraph(f"<b>Localisation:</b> {project['address'].get('line1', '')}, {project['address'].get('city', '')}", styles['Normal']))
-    story.append(Paragraph(f"<b>Statut:</b> {project.get('status', 'N/A')}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Financial analysis
-    story.append(Paragraph("ANALYSE FINANCIÈRE", styles['Heading2']))
-    story.append(Spacer(1, 12))
-    
-    # Create financial table
-    financial_data = [
-        ['Poste', 'Montant TTC'],
-        ['Prix d\'achat', f"{project.get('prix_achat_ttc', 0):,.2f} €"],
-        ['Travaux estimés', f"{project.get('travaux_ttc', 0):,.2f} €"],
-        ['Frais agence', f"{project.get('frais_agence_ttc', 0):,.2f} €"],
-        ['Prix de vente cible', f"{project.get('prix_vente_ttc', 0):,.2f} €"],
-        ['Marge nette estimée', f"{project.get('marge_estimee', 0):,.2f} €"]
-    ]
-    
-    t = Table(financial_data, colWidths=[3*inch, 2*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), '#f59e0b'),
-        ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), '#fffbeb'),
-        ('GRID', (0, 0), (-1, -1), 1, '#d97706')
-    ]))
-    
-    story.append(t)
-    story.append(Spacer(1, 20))
-    
-    # Estimate details if available
-    if estimate_data:
-        story.append(Paragraph("CALCULS FISCAUX", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        fiscal_data = [
-            ['Taxe/Frais', 'Montant'],
-            ['DMTO', f"{estimate_data.get('dmto', 0):,.2f} €"],
-            ['Émoluments notaire', f"{estimate_data.get('emoluments', 0):,.2f} €"],
-            ['CSI', f"{estimate_data.get('csi', 0):,.2f} €"],
-            ['Débours', f"{estimate_data.get('debours', 0):,.2f} €"],
-            ['TVA collectée', f"{estimate_data.get('tva_collectee', 0):,.2f} €"],
-            ['TVA sur marge', f"{estimate_data.get('tva_marge', 0):,.2f} €"]
-        ]
-        
-        t2 = Table(fiscal_data, colWidths=[3*inch, 2*inch])
-        t2.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), '#10b981'),
-            ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), '#f0fdf4'),
-            ('GRID', (0, 0), (-1, -1), 1, '#10b981')
-        ]))
-        
-        story.append(t2)
-    
-    # Documents list
-    story.append(Spacer(1, 20))
-    story.append(Paragraph("DOCUMENTS FOURNIS", styles['Heading2']))
-    story.append(Spacer(1, 12))
-    
-    documents = project.get('documents', [])
-    if documents:
-        for document in documents:
-            story.append(Paragraph(f"• {document.get('filename', 'N/A')} ({document.get('category', 'N/A')})", styles['Normal']))
-    else:
-        story.append(Paragraph("Aucun document fourni", styles['Normal']))
-    
-    # Footer
-    story.append(Spacer(1, 40))
-    story.append(Paragraph("Document généré automatiquement par MarchndsBiens", styles['Normal']))
-    story.append(Paragraph(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-    
-    # Build PDF
-    doc.build(story)
-    buffer.seek(0)
+    documents = await project_documents_for_export(project_id)
+    project_input, document_input = dossier_inputs(project, documents)
+    pdf = await pdf_render_pool.render(render_bank_dossier, project_input, plain_data(estimate_data), document_input)
     
     return StreamingResponse(
-        io.BytesIO(buffer.read()),
+        io.BytesIO(pdf),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=dossier_banque_{project.get('label', 'projet').replace(' ', '_')}.pdf"}
+        headers={"Content-Disposition": content_disposition(dossier_filename('banque', project))}
     )
 
 @api_router.get("/projects/{project_id}/export/notary")
 async def export_notary_dossier(
     project_id: str,
-    current_user: User = Depends(require_auth)
+    project: dict = Depends(load_project_for_read)
 ):
-    """Generate notary dossier PDF"""
-    await check_project_access(project_id, current_user, "read")
+    """Generate notary dossier PDF (similar to bank dossier but with notary-specific content)"""
+    project_input, _ = dossier_inputs(project)
+    pdf = await pdf_render_pool.render(render_notary_dossier, project_input)
     
-    # Similar to bank dossier but with notary-specific content
-    project = await db.projects.find_one({"id": project_id})
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor='#059669',
-        alignment=1
+    return StreamingResponse(
+        io.BytesIO(pdf),
+        media_type="application/pdf",
+        headers={"Content-Disposition": content_disposition(dossier_filename('notaire', project))}
     )
-    
-    story = []
-    
-    # Title
-    story.append(Paragraph("DOSSIER NOTAIRE", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Project details
-    story.append(Paragraph(f"<b>Projet:</b> {project.get('label', 'N/A')}", styles['Normal']))
-    if project.get('address'):
-        story.append(Paragraph(f"<b>Adresse:</b> {project['address'].get('line1', '')}", styles['Normal']))
-        story.append(Paragraph(f"<b>Ville:</b> {project['address'].get('city', '')}", styles['Normal']))
-        story.append(Paragraph(f"<b>Département:</b> {project['address'].get('dept', '')}", styles['Normal']))
-    
-    story.append(Paragraph(f"<b>Régime TVA:</b> {project.get('regime_tva', 'N/A')}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Legal information
-    story.append(Paragraph("INFORMATIONS JURIDIQUES", styles['Heading2']))
-    story.append(Spacer(1, 12))
-    
-    legal_data = [
-        ['Élément', 'Valeur'],
-        ['Prix d\'acquisition TTC', f"{project.get('prix_achat_ttc', 0):,.2f} €"],
-        ['Régime fiscal', project.get('regime_tva', 'Non spécifié')],
-        ['Marchand de biens', 'Oui' if project.get('flags', {}).get('md_b_0715_ok') else 'Non'],
-        ['Date création', project.get('created_at').strftime('%Y-%m-%d') if project.get('created_at') else 'N/A']
-    ]
-    
-    t = Table(legal_data, colWidths=[3*inch, 2*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), '#059669'),
-        ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), '#f0fdfa'),
-        ('GRID', (0, 0), (-1, -1), 1, '#059669')
-    ]))
-    
-    story.append(t)
-    story.append(Spacer(1, 20))
-    
-    # Documents checklist
-    story.append(Paragraph("DOCUMENTS REQUIS", styles['Heading2']))
-    story.append(Spacer(1, 12))
-    
-    required_docs = [
-        "Compromis de vente signé",
-        "Diagnostics techniques",
-        "Plan de financement",
-        "Justificatifs d'identité",
-        "Justificatifs de domicile",
-        "Attestation d'assurance"
+
+# Dataroom archive
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+# Formats that are already compressed: stored as-is in the archive
+ARCHIVE_STORED_TYPES = {
+    'application/pdf', 'image/jpeg', 'image/png',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+class ZipStreamSink:
+    """Write-only, unseekable target for zipfile.
+
+    Without seek() zipfile writes each entry's CRC and sizes in a data descriptor after
+    its data, so entries can be emitted while they are read; drain() hands out what has
+    been written since the previous call.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def archive_entry_name(folder: str, filename: str, used: set) -> str:
+    """Safe, unique "<folder>/<filename>" path inside the archive"""
+    def clean(part):
+        return (part or "").replace("\\", "_").replace("/", "_").strip(". ") or "_"
+    folder, filename = clean(folder), clean(filename)
+    stem, dot, suffix = filename.rpartition(".")
+    if not dot:
+        stem, suffix = filename, ""
+    name, counter = f"{folder}/{filename}", 2
+    while name in used:
+        name = f"{folder}/{stem} ({counter}){dot}{suffix}"
+        counter += 1
+    used.add(name)
+    return name
+
+async def stream_project_archive(project: dict, documents: List[dict], estimate_data: Optional[dict]):
+    """ZIP of the project's documents (one folder per category) plus its bank and notary dossiers.
+
+    Built on the fly: each file is copied chunk by chunk through worker threads and every
+    chunk is sent as soon as it is written, so memory stays constant and the download
+    starts with the first document.
+    """
+    sink = ZipStreamSink()
+    archive = zipfile.ZipFile(sink, mode="w", allowZip64=True)
+    used_names = set()
+
+    for document in documents:
+        file_path = Path(document["file_path"])
+        try:
+            stat_result = await asyncio.to_thread(os.stat, file_path)
+        except FileNotFoundError:
+            logging.warning(f"Archive of project {project['id']}: missing file for document {document.get('id')}")
+            continue
+        uploaded_at = document.get("uploaded_at")
+        info = zipfile.ZipInfo(
+            archive_entry_name(document.get("category") or "Autres", document.get("filename"), used_names),
+            date_time=(uploaded_at if isinstance(uploaded_at, datetime) else datetime.now()).timetuple()[:6]
+        )
+        info.compress_type = zipfile.ZIP_STORED if document.get("content_type") in ARCHIVE_STORED_TYPES else zipfile.ZIP_DEFLATED
+        info.file_size = stat_result.st_size
+
+        source = await asyncio.to_thread(open, file_path, "rb")
+        try:
+            target = archive.open(info, mode="w", force_zip64=stat_result.st_size >= zipfile.ZIP64_LIMIT)
+
+            def copy_chunk() -> bool:
+                chunk = source.read(ARCHIVE_CHUNK_SIZE)
+                target.write(chunk)
+                return bool(chunk)
+
+            while await asyncio.to_thread(copy_chunk):
+                yield sink.drain()
+            await asyncio.to_thread(target.close)
+        finally:
+            await asyncio.to_thread(source.close)
+        yield sink.drain()
+
+    # Generated dossiers last, so the download is already under way while they render
+    project_input, document_input = dossier_inputs(project, documents)
+    dossiers = [
+        (dossier_filename("banque", project), render_bank_dossier, (project_input, plain_data(estimate_data), document_input)),
+        (dossier_filename("notaire", project), render_notary_dossier, (project_input,))
     ]
-    
-    for required_doc in required_docs:
-        story.append(Paragraph(f"☐ {required_doc}", styles['Normal']))
-    
-    story.append(Spacer(1, 40))
-    story.append(Paragraph("Document généré par MarchndsBiens", styles['Normal']))
-    story.append(Paragraph(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-    
-    doc.build(story)
-    buffer.seek(0)
+    for filename, render, args in dossiers:
+        try:
+            pdf = await pdf_render_pool.render(render, *args)
+        except (HTTPException, BrokenProcessPool) as e:
+            # Headers are already sent: leave the dossier out rather than truncate the archive
+            logging.error(f"Archive of project {project['id']}: {filename} not rendered: {e}")
+            continue
+        info = zipfile.ZipInfo(archive_entry_name("Dossiers", filename, used_names), date_time=datetime.now().timetuple()[:6])
+        archive.writestr(info, pdf, compress_type=zipfile.ZIP_STORED)
+        yield sink.drain()
+
+    archive.close()
+    yield sink.drain()
+
+@api_router.get("/projects/{project_id}/export/zip")
+async def export_project_archive(
+    project_id: str,
+    project: dict = Depends(load_project_for_read)
+):
+    """Stream the whole dataroom as a ZIP archive"""
+    estimate_data = await get_project_estimate(project)
+    documents = await project_documents_for_export(project_id)
     
     return StreamingResponse(
-        io.BytesIO(buffer.read()),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=dossier_notaire_{project.get('label', 'projet').replace(' ', '_')}.pdf"}
+        stream_project_archive(project, documents, estimate_data),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"dataroom_{project.get('label', 'projet').replace(' ', '_')}.zip")}
+    )
+
+def build_estimate_input(project: dict) -> EstimateInput:
+    """Create estimate input from project data"""
+    flags = project.get('flags') or {}
+    milestones = project.get('milestones') or {}
+    acquisition = next(
+        (d for d in (CashFlowService._parse_date(milestones.get(key)) for key in CashFlowService.ACQUISITION_MILESTONES) if d),
+        None
+    )
+    return EstimateInput(
+        dept=(project.get('address') or {}).get('dept', '75'),
+        regime_tva=RegimeTVA(project.get('regime_tva', 'MARGE')),
+        prix_achat_ttc=project.get('prix_achat_ttc', 0),
+        prix_vente_ttc=project.get('prix_vente_ttc', 0),
+        travaux_ttc=project.get('travaux_ttc', 0),
+        frais_agence_ttc=project.get('frais_agence_ttc', 0),
+        hypotheses={
+            'md_b_0715_ok': flags.get('md_b_0715_ok', False),
+            'travaux_structurants': flags.get('travaux_structurants', False)
+        },
+        date_transaction=acquisition.date().isoformat() if acquisition else None
     )
 
 async def get_project_estimate(project):
     """Get estimate data for a project"""
     try:
-        # Create estimate input from project data
-        estimate_input = EstimateInput(
-            dept=project['address'].get('dept', '75'),
-            regime_tva=RegimeTVA(project.get('regime_tva', 'MARGE')),
-            prix_achat_ttc=project.get('prix_achat_ttc', 0),
-            prix_vente_ttc=project.get('prix_vente_ttc', 0),
-            travaux_ttc=project.get('travaux_ttc', 0),
-            frais_agence_ttc=project.get('frais_agence_ttc', 0),
-            hypotheses={
-                'md_b_0715_ok': project.get('flags', {}).get('md_b_0715_ok', False),
-                'travaux_structurants': project.get('flags', {}).get('travaux_structurants', False)
-            }
-        )
+        estimate_input = build_estimate_input(project)
         
-        # Calculate estimate
-        tax_service = TaxCalculationService()
-        estimate = tax_service.calculate_estimate(estimate_input)
+        # Calculate estimate with the barème in force on the acquisition date
+        estimate = bareme_store.service_for(estimate_input.date_transaction).calculate_estimate(estimate_input)
         return estimate.dict()
     except Exception as e:
         logging.error(f"Error calculating estimate for project {project.get('id')}: {e}")
@@ -2251,6 +4690,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Custom exception handlers
@@ -2283,6 +4723,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def normalize_timestamps():
+    # Before the first request: the project list cursor relies on date-typed updated_at
+    await normalize_project_timestamps()
+
+@app.on_event("startup")
+async def start_http_clients():
+    await oauth_client.start()
+    await project_feed.start()
+
+@app.on_event("startup")
+async def migrate_project_records():
+    try:
+        await project_records.migrate_embedded()
+    except Exception as e:
+        logging.error(f"Project records migration failed: {e}")
+
+@app.on_event("startup")
+async def build_portfolio_stats():
+    # First start with materialized KPIs: seed them from the existing projects
+    try:
+        if not await db.portfolio_stats.find_one({"scope": PortfolioStatsService.GLOBAL_SCOPE}):
+            await portfolio_stats.rebuild()
+    except Exception as e:
+        logging.error(f"Portfolio stats rebuild failed: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    await oauth_client.close()
+    await project_feed.close()
+
+@app.on_event("shutdown")
+async def shutdown_pdf_render_pool():
+    pdf_render_pool.shutdown()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file
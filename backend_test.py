@@ -66,7 +66,7 @@ class TaxCalculationAPITester:
                 # Print response data for estimator tests
                 if "estimate" in endpoint and response_data:
                     print(f"   Response fields: {list(response_data.keys())}")
-                    if 'explain' in response_data:
+                    if response_data.get('explain'):
                         print(f"   Explain length: {len(response_data['explain'])} chars")
                 
                 # Additional response validation if provided
@@ -235,7 +235,7 @@ class TaxCalculationAPITester:
         return self.run_test(
             "Case A - TVA sur marge + MdB eligible",
             "POST",
-            "estimate/run",
+            "estimate/run?explain=true",
             200,
             data=data,
             validate_response=self.validate_case_a_response
@@ -256,7 +256,7 @@ class TaxCalculationAPITester:
         return self.run_test(
             "Case B - TVA normale",
             "POST",
-            "estimate/run",
+            "estimate/run?explain=true",
             200,
             data=data,
             validate_response=self.validate_case_b_response
@@ -277,12 +277,83 @@ class TaxCalculationAPITester:
         return self.run_test(
             "Case C - Exonération TVA",
             "POST",
-            "estimate/run",
+            "estimate/run?explain=true",
             200,
             data=data,
             validate_response=self.validate_case_c_response
         )
 
+    def validate_batch_response(self, response_data):
+        """Validate batch estimate: one result per row, no explain by default"""
+        try:
+            results = response_data.get('results', [])
+            if response_data.get('count') != 3 or len(results) != 3:
+                return {"valid": False, "message": f"Expected 3 results, got {len(results)}"}
+
+            if any(result.get('explain') for result in results):
+                return {"valid": False, "message": "Explain should be omitted unless include_explain is set"}
+
+            # Row 0 is Case A: DMTO MdB 0.715%
+            if abs(results[0].get('dmto', 0) - 300000 * 0.00715) > 0.01:
+                return {"valid": False, "message": f"DMTO incorrect for row 0: {results[0].get('dmto')}"}
+
+            return {"valid": True, "message": f"Batch of {len(results)} estimates valid"}
+
+        except Exception as e:
+            return {"valid": False, "message": f"Validation error: {str(e)}"}
+
+    BATCH_ROWS = [
+        {"dept": "75", "regime_tva": "MARGE", "prix_achat_ttc": 300000, "prix_vente_ttc": 520000,
+         "travaux_ttc": 80000, "frais_agence_ttc": 15000, "hypotheses": {"md_b_0715_ok": True}},
+        {"dept": "92", "regime_tva": "NORMAL", "prix_achat_ttc": 240000, "prix_vente_ttc": 360000,
+         "travaux_ttc": 30000, "frais_agence_ttc": 10000, "hypotheses": {}},
+        {"dept": "69", "regime_tva": "EXO", "prix_achat_ttc": 250000, "prix_vente_ttc": 310000,
+         "travaux_ttc": 20000, "frais_agence_ttc": 5000, "hypotheses": {}}
+    ]
+    ESTIMATE_FIELDS = ["dmto", "emoluments", "csi", "debours", "tva_collectee", "tva_marge", "marge_brute", "marge_nette", "tri"]
+
+    def test_estimate_batch(self):
+        """Test vectorized batch estimate with cases A, B and C"""
+        return self.run_test(
+            "Batch estimate - Cases A, B, C",
+            "POST",
+            "estimate/batch",
+            200,
+            data={"rows": self.BATCH_ROWS},
+            validate_response=self.validate_batch_response
+        )
+
+    def test_estimate_batch_matches_run(self):
+        """Test that every batch row equals /estimate/run for the same inputs"""
+        success, batch = self.run_test(
+            "Batch estimate - reference rows",
+            "POST",
+            "estimate/batch",
+            200,
+            data={"rows": self.BATCH_ROWS}
+        )
+        if not success:
+            return False
+
+        mismatches = []
+        for index, (row, result) in enumerate(zip(self.BATCH_ROWS, batch.get('results', []))):
+            success, single = self.run_test(f"Single estimate - row {index}", "POST", "estimate/run", 200, data=row)
+            if not success:
+                return False
+            mismatches += [
+                f"row {index} {field}: batch {result.get(field)} != run {single.get(field)}"
+                for field in self.ESTIMATE_FIELDS
+                if result.get(field) != single.get(field)
+            ]
+
+        if mismatches:
+            print("❌ Batch results differ from /estimate/run:")
+            for mismatch in mismatches:
+                print(f"   • {mismatch}")
+            return False
+        print(f"✅ {len(self.BATCH_ROWS)} batch rows match /estimate/run")
+        return True
+
     def test_projects_crud_comprehensive(self):
         """Test comprehensive Project CRUD operations as requested"""
         print("\n📋 Testing Project CRUD Operations...")
@@ -673,6 +744,82 @@ startxref
             print(f"❌ Failed to get project details")
             return False
 
+    def test_project_documents_listing(self):
+        """Test the paginated project documents endpoint"""
+        if not self.test_project_id:
+            print("❌ No test project available")
+            return False
+            
+        print(f"\n📋 Testing paginated documents listing...")
+        
+        success, response = self.run_test(
+            "List Project Documents",
+            "GET",
+            f"projects/{self.test_project_id}/documents?limit=10",
+            200
+        )
+        
+        if success and isinstance(response, list):
+            print(f"✅ {len(response)} document(s) returned")
+            if hasattr(self, 'test_document_id') and not any(doc.get('id') == self.test_document_id for doc in response):
+                print(f"❌ Uploaded document missing from listing")
+                return False
+            return True
+        else:
+            print(f"❌ Failed to list project documents")
+            return False
+
+    def test_project_events_listing(self):
+        """Test the paginated project events endpoint and the event shape"""
+        if not self.test_project_id:
+            print("❌ No test project available")
+            return False
+
+        print(f"\n📜 Testing paginated events listing...")
+
+        def validate_events(events):
+            if not isinstance(events, list) or not events:
+                return {"valid": False, "message": "No events returned"}
+            for event in events:
+                missing = {'id', 'project_id', 'event_type', 'description', 'metadata', 'timestamp'} - set(event)
+                if missing:
+                    return {"valid": False, "message": f"Event missing fields {sorted(missing)}: {event}"}
+                if 'type' in event or not isinstance(event['metadata'], dict):
+                    return {"valid": False, "message": f"Event has the legacy shape: {event}"}
+            timestamps = [event['timestamp'] for event in events]
+            if timestamps != sorted(timestamps, reverse=True):
+                return {"valid": False, "message": "Events are not ordered newest first"}
+            return {"valid": True, "message": f"{len(events)} event(s) with event_type/metadata"}
+
+        success, response = self.run_test(
+            "List Project Events",
+            "GET",
+            f"projects/{self.test_project_id}/events?limit=10",
+            200,
+            validate_response=validate_events
+        )
+
+        if not success:
+            print(f"❌ Failed to list project events")
+            return False
+
+        event_types = [event['event_type'] for event in response]
+        print(f"✅ {len(response)} event(s) returned: {', '.join(event_types)}")
+        for expected in ('project_created', 'document_upload'):
+            if expected not in event_types:
+                print(f"❌ Missing '{expected}' event")
+                return False
+
+        # The project payload still embeds the latest events, oldest first, in the same shape
+        success, project = self.run_test(
+            "Get Project Events",
+            "GET",
+            f"projects/{self.test_project_id}",
+            200,
+            validate_response=lambda data: validate_events(data.get('events', [])[::-1])
+        )
+        return success
+
     def test_document_download(self):
         """Test document download functionality"""
         if not self.test_project_id or not hasattr(self, 'test_document_id'):
@@ -839,7 +986,7 @@ startxref
         return self.run_test(
             "Comprehensive Field Validation",
             "POST",
-            "estimate/run",
+            "estimate/run?explain=true",
             200,
             data=data,
             validate_response=self.validate_all_required_fields
@@ -1151,8 +1298,20 @@ def main():
     print("\n🏗️ PHASE 3: PROJECT CREATION COMPREHENSIVE TESTING")
     creation_success = tester.test_project_creation_comprehensive()
     
+    print("\n🧮 PHASE 4: BATCH ESTIMATES")
+    batch_success, _ = tester.test_estimate_batch()
+    batch_success = tester.test_estimate_batch_matches_run() and batch_success
+
+    print("\n📂 PHASE 5: PROJECT DOCUMENTS AND EVENTS")
+    records_success = (
+        tester.create_test_project()
+        and tester.test_document_upload()
+        and tester.test_project_documents_listing()
+        and tester.test_project_events_listing()
+    )
+
     # Additional API health check
-    print("\n🌐 PHASE 4: API HEALTH VERIFICATION")
+    print("\n🌐 PHASE 6: API HEALTH VERIFICATION")
     tester.test_api_health()
     
     # Print summary
@@ -1174,7 +1333,7 @@ def main():
         print("   Check detailed results above for specific failures")
     
     # Return exit code
-    return 0 if (form_success and creation_success) else 1
+    return 0 if (form_success and creation_success and batch_success and records_success) else 1
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -56,6 +56,7 @@ import {
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const PROJECTS_PAGE_SIZE = 50;
 
 // Auth Context
 const AuthContext = createContext();
@@ -752,18 +753,28 @@ const Dashboard = ({ projects, onProjectSelect, onProjectCreate }) => {
   };
 
   const accessibleProjects = getAccessibleProjects();
-  
-  // Calculate KPIs based on accessible projects
-  const totalProjects = accessibleProjects.length;
-  const totalMargeEstimee = accessibleProjects.reduce((sum, p) => sum + (p.marge_estimee || 0), 0);
-  const avgTRI = totalProjects > 0 ? accessibleProjects.reduce((sum, p) => sum + (p.tri_estime || 0), 0) / totalProjects : 0;
-  const activeProjects = accessibleProjects.filter(p => !['CLOS', 'REVENTE'].includes(p.status)).length;
-
-  // Status distribution
-  const statusCounts = Object.keys(statusConfig).reduce((acc, status) => {
-    acc[status] = accessibleProjects.filter(p => p.status === status).length;
-    return acc;
-  }, {});
+
+  // KPIs come from the materialized portfolio stats; the loaded projects are only the fallback
+  const [portfolio, setPortfolio] = useState(null);
+
+  useEffect(() => {
+    if (!user) return;
+    axios.get(`${API}/analytics/portfolio`, { withCredentials: true })
+      .then(response => setPortfolio(response.data))
+      .catch(() => setPortfolio(null));
+  }, [user, projects]);
+
+  const totals = portfolio?.totals;
+  const statusCounts = portfolio
+    ? portfolio.by_status.reduce((acc, row) => ({ ...acc, [row.status]: row.count }), {})
+    : Object.keys(statusConfig).reduce((acc, status) => {
+        acc[status] = accessibleProjects.filter(p => p.status === status).length;
+        return acc;
+      }, {});
+  const totalProjects = totals ? totals.projects : accessibleProjects.length;
+  const totalMargeEstimee = totals ? totals.margin : accessibleProjects.reduce((sum, p) => sum + (p.marge_estimee || 0), 0);
+  const avgTRI = totals ? totals.average_tri : (totalProjects > 0 ? accessibleProjects.reduce((sum, p) => sum + (p.tri_estime || 0), 0) / totalProjects : 0);
+  const activeProjects = totalProjects - (statusCounts.CLOS || 0) - (statusCounts.REVENTE || 0);
 
   return (
     <div className="space-y-6">
@@ -1614,7 +1625,7 @@ const Estimateur = () => {
     setError(null);
     
     try {
-      const response = await axios.post(`${API}/estimate/run`, formData, { withCredentials: true });
+      const response = await axios.post(`${API}/estimate/run?explain=true`, formData, { withCredentials: true });
       setResult(response.data);
     } catch (err) {
       setError(err.response?.data?.detail || "Erreur lors du calcul");
@@ -1994,10 +2005,17 @@ const DataroomPanel = ({ project }) => {
   const [selectedCategory, setSelectedCategory] = useState('JURIDIQUE');
   const fileInputRef = React.useRef(null);
 
-  // Sync with project documents when project changes
+  // Sync with project documents when project changes (stored outside the project document)
   React.useEffect(() => {
     setFiles(project.documents || []);
-  }, [project.documents]);
+    if (!project.id) return;
+    axios.get(`${API}/projects/${project.id}/documents`, {
+      params: { limit: 500 },
+      withCredentials: true
+    })
+      .then(response => setFiles([...response.data].reverse()))
+      .catch(error => console.error('Erreur lors du chargement des documents:', error));
+  }, [project.id, project.documents]);
 
   const handleDragOver = (e) => {
     e.preventDefault();
@@ -2150,6 +2168,15 @@ const DataroomPanel = ({ project }) => {
     }
   };
 
+  const exportArchive = () => {
+    // Plain navigation: the browser streams the archive to disk instead of buffering a Blob
+    const link = document.createElement('a');
+    link.href = `${API}/projects/${project.id}/export/zip`;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+  };
+
   const getCategoryColor = (type) => {
     switch (type) {
       case 'JURIDIQUE': return 'bg-blue-100 text-blue-700 border-blue-300';
@@ -2324,9 +2351,13 @@ const DataroomPanel = ({ project }) => {
               <Download className="h-4 w-4 mr-2" />
               Dossier Notaire PDF
             </Button>
-            <Button variant="outline" disabled>
-              <Upload className="h-4 w-4 mr-2" />
-              Archive ZIP (bientôt)
+            <Button 
+              variant="outline"
+              onClick={exportArchive}
+              disabled={uploading}
+            >
+              <Download className="h-4 w-4 mr-2" />
+              Archive ZIP complète
             </Button>
           </div>
         </CardContent>
@@ -2871,22 +2902,30 @@ const MainApp = () => {
     localStorage.setItem('useModernUI', 'false');
   };
 
+  // Keyset-paginated project list: first page on mount, next pages on demand (X-Next-Cursor)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchProjectPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: String(PROJECTS_PAGE_SIZE), view: 'summary' });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects?${params}`, {
+      credentials: 'include'
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to load projects: ${response.status}`);
+    }
+    return { page: await response.json(), cursor: response.headers.get('X-Next-Cursor') };
+  };
+
   // Load projects from API on component mount
   React.useEffect(() => {
     const loadProjects = async () => {
       try {
-        const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects`, {
-          credentials: 'include'
-        });
-        
-        if (response.ok) {
-          const apiProjects = await response.json();
-          setProjects(apiProjects);
-          console.log(`✅ ${apiProjects.length} projets chargés depuis l'API`);
-        } else {
-          console.log('⚠️ Échec du chargement des projets depuis l\'API, utilisation des données mockées');
-          setProjects(mockProjects);
-        }
+        const { page, cursor } = await fetchProjectPage(null);
+        setProjects(page);
+        setNextCursor(cursor);
+        console.log(`✅ ${page.length} projets chargés depuis l'API`);
       } catch (error) {
         console.error('❌ Erreur lors du chargement des projets:', error);
         setProjects(mockProjects);  // Fallback to mock data
@@ -2898,8 +2937,36 @@ const MainApp = () => {
     loadProjects();
   }, []);
 
-  const handleProjectSelect = (project) => {
-    setSelectedProject(project);
+  const loadMoreProjects = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const { page, cursor } = await fetchProjectPage(nextCursor);
+      setProjects(prev => [...prev, ...page.filter(p => !prev.some(existing => existing.id === p.id))]);
+      setNextCursor(cursor);
+    } catch (error) {
+      console.error('❌ Erreur lors du chargement des projets suivants:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // List rows are summaries (view=summary): the full project is fetched when one is opened
+  const fetchFullProject = async (project) => {
+    if (project.documents_count === undefined) return project;
+    try {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects/${project.id}`, {
+        credentials: 'include'
+      });
+      if (response.ok) return await response.json();
+    } catch (error) {
+      console.error('❌ Erreur lors du chargement du projet:', error);
+    }
+    return project;
+  };
+
+  const handleProjectSelect = async (project) => {
+    setSelectedProject(await fetchFullProject(project));
     setActiveTab("project");
   };
 
@@ -3070,6 +3137,13 @@ const MainApp = () => {
                 onProjectCreate={handleProjectCreate}
               />
             )}
+            {activeTab === "pipeline" && nextCursor && (
+              <div className="flex justify-center mt-6">
+                <Button variant="outline" onClick={loadMoreProjects} disabled={loadingMore}>
+                  {loadingMore ? 'Chargement...' : 'Charger plus de projets'}
+                </Button>
+              </div>
+            )}
             {activeTab === "estimateur" && <Estimateur />}
           </>
         )}
@@ -1,4 +1,5 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import axios from 'axios';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from './ui/card';
 import { Badge } from './ui/badge';
 import { Progress } from './ui/progress';
@@ -12,7 +13,19 @@ import {
   Activity
 } from 'lucide-react';
 
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const MONTH_LABELS = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 'Juil', 'Août', 'Sep', 'Oct', 'Nov', 'Déc'];
+
 const AnalyticsPanel = ({ projects }) => {
+  // KPIs computed server-side over the whole visible portfolio; local figures are the fallback
+  const [portfolio, setPortfolio] = useState(null);
+
+  useEffect(() => {
+    axios.get(`${API}/analytics/portfolio`, { withCredentials: true })
+      .then(response => setPortfolio(response.data))
+      .catch(() => setPortfolio(null));
+  }, [projects]);
+
   const formatCurrency = (amount) => {
     return new Intl.NumberFormat('fr-FR', {
       style: 'currency',
@@ -30,11 +43,12 @@ const AnalyticsPanel = ({ projects }) => {
   };
 
   // Calculs des métriques
-  const totalProjects = projects.length;
-  const totalInvestment = projects.reduce((sum, p) => sum + (p.prix_achat_ttc || 0), 0);
-  const totalRevenue = projects.reduce((sum, p) => sum + (p.prix_vente_ttc || 0), 0);
-  const totalMargin = projects.reduce((sum, p) => sum + (p.marge_estimee || 0), 0);
-  const avgTRI = totalProjects > 0 ? projects.reduce((sum, p) => sum + (p.tri_estime || 0), 0) / totalProjects : 0;
+  const totals = portfolio?.totals;
+  const totalProjects = totals ? totals.projects : projects.length;
+  const totalInvestment = totals ? totals.investment : projects.reduce((sum, p) => sum + (p.prix_achat_ttc || 0), 0);
+  const totalRevenue = totals ? totals.revenue : projects.reduce((sum, p) => sum + (p.prix_vente_ttc || 0), 0);
+  const totalMargin = totals ? totals.margin : projects.reduce((sum, p) => sum + (p.marge_estimee || 0), 0);
+  const avgTRI = totals ? totals.average_tri : (totalProjects > 0 ? projects.reduce((sum, p) => sum + (p.tri_estime || 0), 0) / totalProjects : 0);
 
   // Répartition par statut
   const statusConfig = {
@@ -48,21 +62,30 @@ const AnalyticsPanel = ({ projects }) => {
     CLOS: { label: "Clos", color: "bg-emerald-600" }
   };
 
+  const statusCounts = portfolio
+    ? Object.fromEntries(portfolio.by_status.map(row => [row.status, row.count]))
+    : null;
   const statusDistribution = Object.keys(statusConfig).map(status => ({
     status,
-    count: projects.filter(p => p.status === status).length,
+    count: statusCounts ? (statusCounts[status] || 0) : projects.filter(p => p.status === status).length,
     ...statusConfig[status]
   }));
 
   // Répartition par département
-  const deptDistribution = projects.reduce((acc, project) => {
-    const dept = project.address?.dept || 'Inconnu';
-    acc[dept] = (acc[dept] || 0) + 1;
-    return acc;
-  }, {});
-
-  // Évolution temporelle (simulation)
-  const monthlyData = [
+  const deptDistribution = portfolio
+    ? Object.fromEntries(portfolio.by_dept.map(row => [row.dept, row.count]))
+    : projects.reduce((acc, project) => {
+        const dept = project.address?.dept || 'Inconnu';
+        acc[dept] = (acc[dept] || 0) + 1;
+        return acc;
+      }, {});
+
+  // Évolution temporelle (6 derniers mois renvoyés par l'API, simulation sinon)
+  const monthlyData = portfolio?.by_month?.length ? portfolio.by_month.slice(-6).map(row => ({
+    month: row.month.length === 7 ? MONTH_LABELS[parseInt(row.month.slice(5), 10) - 1] : row.month,
+    projects: row.count,
+    margin: row.margin
+  })) : [
     { month: 'Jan', projects: 2, margin: 180000 },
     { month: 'Fév', projects: 1, margin: 95000 },
     { month: 'Mar', projects: 3, margin: 275000 },
@@ -10,32 +10,45 @@ import ModernEstimator from './ModernEstimator';
 import ModernProjectEdit from './ModernProjectEdit';
 import { Palette, ArrowLeft, LayoutGrid, Kanban } from 'lucide-react';
 
+const PROJECTS_PAGE_SIZE = 50;
+
 const ModernApp = ({ onSwitchToClassic, user, logout }) => {
   const [activeTab, setActiveTab] = useState("dashboard");
   const [projectsView, setProjectsView] = useState("grid"); // "grid" or "kanban"
   const [projects, setProjects] = useState([]);
   const [selectedProject, setSelectedProject] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [reloadKey, setReloadKey] = useState(0);
+
+  // Keyset-paginated project list: only the first page is loaded up front, the next
+  // pages on demand through the X-Next-Cursor header
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchProjectPage = async (cursor) => {
+    const params = new URLSearchParams({ limit: String(PROJECTS_PAGE_SIZE), view: 'summary' });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects?${params}`, {
+      credentials: 'include'
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to load projects: ${response.status}`);
+    }
+    return { page: await response.json(), cursor: response.headers.get('X-Next-Cursor') };
+  };
 
-  // Load projects from API on component mount
+  // Load the first page of projects on mount (and on resync)
   useEffect(() => {
     const loadProjects = async () => {
       try {
-        const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects`, {
-          credentials: 'include'
-        });
-        
-        if (response.ok) {
-          const apiProjects = await response.json();
-          setProjects(apiProjects);
-          console.log(`✅ ${apiProjects.length} projets chargés depuis l'API`);
-        } else {
-          console.log('⚠️ Échec du chargement des projets depuis l\'API');
-          setProjects([]);
-        }
+        const { page, cursor } = await fetchProjectPage(null);
+        setProjects(page);
+        setNextCursor(cursor);
+        console.log(`✅ ${page.length} projets chargés depuis l'API`);
       } catch (error) {
         console.error('❌ Erreur lors du chargement des projets:', error);
         setProjects([]);
+        setNextCursor(null);
       } finally {
         setLoading(false);
       }
@@ -44,10 +57,78 @@ const ModernApp = ({ onSwitchToClassic, user, logout }) => {
     if (user) {
       loadProjects();
     }
+  }, [user, reloadKey]);
+
+  const loadMoreProjects = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const { page, cursor } = await fetchProjectPage(nextCursor);
+      // A project created live may already be in the list
+      setProjects(prev => [...prev, ...page.filter(p => !prev.some(existing => existing.id === p.id))]);
+      setNextCursor(cursor);
+    } catch (error) {
+      console.error('❌ Erreur lors du chargement des projets suivants:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Live project diffs pushed by the server (edits from other users included)
+  useEffect(() => {
+    if (!user) return undefined;
+
+    const source = new EventSource(`${process.env.REACT_APP_BACKEND_URL}/api/projects/live`, {
+      withCredentials: true
+    });
+    const applyToProject = (projectId, update) => {
+      setProjects(prev => prev.map(p => p.id === projectId ? { ...p, ...update } : p));
+      setSelectedProject(prev => prev?.id === projectId ? { ...prev, ...update } : prev);
+    };
+
+    source.onmessage = (message) => {
+      const change = JSON.parse(message.data);
+      switch (change.type) {
+        case 'project_created':
+          setProjects(prev => prev.some(p => p.id === change.project_id) ? prev : [...prev, change.project]);
+          break;
+        case 'project_updated':
+        case 'status_change':
+          applyToProject(change.project_id, change.changes);
+          break;
+        case 'project_deleted':
+          setProjects(prev => prev.filter(p => p.id !== change.project_id));
+          setSelectedProject(prev => prev?.id === change.project_id ? null : prev);
+          break;
+        case 'resync':
+          // Too many changes missed: reload the whole list
+          setReloadKey(key => key + 1);
+          break;
+        default:
+          // Document and task changes are fetched by the project detail view
+          break;
+      }
+    };
+
+    return () => source.close();
   }, [user]);
 
-  const handleProjectSelect = (project) => {
-    setSelectedProject(project);
+  // List rows are summaries (view=summary): the full project is fetched when one is opened
+  const fetchFullProject = async (project) => {
+    if (project.documents_count === undefined) return project;
+    try {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/projects/${project.id}`, {
+        credentials: 'include'
+      });
+      if (response.ok) return await response.json();
+    } catch (error) {
+      console.error('❌ Erreur lors du chargement du projet:', error);
+    }
+    return project;
+  };
+
+  const handleProjectSelect = async (project) => {
+    setSelectedProject(await fetchFullProject(project));
     setActiveTab("project-detail");
   };
 
@@ -206,8 +287,8 @@ const ModernApp = ({ onSwitchToClassic, user, logout }) => {
     }
   };
 
-  const handleProjectEdit = (project) => {
-    setSelectedProject(project);
+  const handleProjectEdit = async (project) => {
+    setSelectedProject(await fetchFullProject(project));
     setActiveTab("project-edit");
   };
 
@@ -313,6 +394,18 @@ const ModernApp = ({ onSwitchToClassic, user, logout }) => {
                 onProjectDelete={handleProjectDelete}
               />
             )}
+
+            {nextCursor && (
+              <div className="flex justify-center pb-8">
+                <button
+                  onClick={loadMoreProjects}
+                  disabled={loadingMore}
+                  className="px-6 py-2 bg-white border border-slate-200 rounded-xl text-sm font-medium text-slate-700 hover:bg-slate-50 shadow-sm disabled:opacity-50"
+                >
+                  {loadingMore ? 'Chargement...' : 'Charger plus de projets'}
+                </button>
+              </div>
+            )}
           </div>
         )}
 
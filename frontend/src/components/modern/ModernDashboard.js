@@ -1,4 +1,4 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { 
   TrendingUp, 
   TrendingDown, 
@@ -15,31 +15,44 @@ import {
 } from 'lucide-react';
 
 const ModernDashboard = ({ projects, onProjectSelect }) => {
-  // Calculate metrics
-  const totalProjects = projects.length;
-  const activeProjects = projects.filter(p => 
-    !['VENDU', 'ABANDONNE', 'CLOS'].includes(p.status)
-  ).length;
-  
-  const soldProjects = projects.filter(p => 
-    ['VENDU', 'CLOS'].includes(p.status)
-  ).length;
-  
-  const totalMargin = projects.reduce((sum, p) => {
-    const margin = (p.prix_vente_ttc || 0) - (p.prix_achat_ttc || 0) - (p.travaux_ttc || 0) - (p.frais_agence_ttc || 0);
-    return sum + margin;
-  }, 0);
+  // Only the first page of projects is loaded: portfolio KPIs come from the server,
+  // the loaded projects are the fallback
+  const [portfolio, setPortfolio] = useState(null);
 
-  const avgTRI = projects.length > 0 
-    ? projects.reduce((sum, p) => sum + (p.tri_estimated || 12), 0) / projects.length 
-    : 0;
+  useEffect(() => {
+    fetch(`${process.env.REACT_APP_BACKEND_URL}/api/analytics/portfolio`, { credentials: 'include' })
+      .then(response => (response.ok ? response.json() : null))
+      .then(setPortfolio)
+      .catch(() => setPortfolio(null));
+  }, [projects]);
 
   // Status distribution for donut chart
-  const statusCounts = projects.reduce((acc, project) => {
-    const status = project.status || 'DETECTE';
-    acc[status] = (acc[status] || 0) + 1;
-    return acc;
-  }, {});
+  const statusCounts = portfolio
+    ? portfolio.by_status.reduce((acc, row) => ({ ...acc, [row.status || 'DETECTE']: (acc[row.status || 'DETECTE'] || 0) + row.count }), {})
+    : projects.reduce((acc, project) => {
+        const status = project.status || 'DETECTE';
+        acc[status] = (acc[status] || 0) + 1;
+        return acc;
+      }, {});
+
+  // Calculate metrics
+  const countOf = (statuses) => statuses.reduce((sum, status) => sum + (statusCounts[status] || 0), 0);
+  const totalProjects = portfolio ? portfolio.totals.projects : projects.length;
+  const activeProjects = totalProjects - countOf(['VENDU', 'ABANDONNE', 'CLOS']);
+  const soldProjects = countOf(['VENDU', 'CLOS']);
+  
+  const totalMargin = portfolio
+    ? portfolio.totals.margin
+    : projects.reduce((sum, p) => {
+        const margin = (p.prix_vente_ttc || 0) - (p.prix_achat_ttc || 0) - (p.travaux_ttc || 0) - (p.frais_agence_ttc || 0);
+        return sum + margin;
+      }, 0);
+
+  const avgTRI = portfolio
+    ? portfolio.totals.average_tri * 100
+    : (projects.length > 0 
+      ? projects.reduce((sum, p) => sum + (p.tri_estimated || 12), 0) / projects.length 
+      : 0);
 
   const statusConfig = {
     DETECTE: { label: 'Détecté', color: 'bg-slate-500', percentage: 0 },
@@ -52,7 +52,7 @@ const ModernEstimator = () => {
     setLoading(true);
 
     try {
-      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/estimate/run`, {
+      const response = await fetch(`${process.env.REACT_APP_BACKEND_URL}/api/estimate/run?explain=true`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -0,0 +1,96 @@
+"""
+In-memory stand-in for the few Motor collection calls the unit tests go through
+Supports equality and $gt/$gte/$lt/$lte filters, and $set/$inc/$setOnInsert updates
+"""
+
+import copy
+from types import SimpleNamespace
+
+OPERATORS = {
+    "$gt": lambda value, bound: value is not None and value > bound,
+    "$gte": lambda value, bound: value is not None and value >= bound,
+    "$lt": lambda value, bound: value is not None and value < bound,
+    "$lte": lambda value, bound: value is not None and value <= bound,
+}
+
+def matches(document: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict) and condition and all(key in OPERATORS for key in condition):
+            if not all(OPERATORS[op](value, bound) for op, bound in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+def apply_update(document: dict, update: dict, inserting: bool = False):
+    document.update(update.get("$set", {}))
+    for field, amount in update.get("$inc", {}).items():
+        document[field] = document.get(field, 0) + amount
+    if inserting:
+        document.update(update.get("$setOnInsert", {}))
+
+class FakeCursor:
+    def __init__(self, documents):
+        self._documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def _first(self, query):
+        return next((document for document in self.documents if matches(document, query)), None)
+
+    async def insert_one(self, document: dict):
+        self.documents.append(copy.deepcopy(document))
+
+    async def find_one(self, query: dict, projection: dict = None):
+        document = self._first(query)
+        return copy.deepcopy(document) if document is not None else None
+
+    def find(self, query: dict = None, projection: dict = None):
+        return FakeCursor([copy.deepcopy(d) for d in self.documents if matches(d, query or {})])
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        document = self._first(query)
+        if document is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None)
+            document = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            apply_update(document, update, inserting=True)
+            self.documents.append(document)
+            return SimpleNamespace(matched_count=0, upserted_id=len(self.documents))
+        apply_update(document, update)
+        return SimpleNamespace(matched_count=1, upserted_id=None)
+
+    async def find_one_and_update(self, query: dict, update: dict, return_document=False, upsert: bool = False):
+        document = self._first(query)
+        if document is None:
+            return None
+        before = copy.deepcopy(document)
+        apply_update(document, update)
+        return copy.deepcopy(document) if return_document else before
+
+    async def delete_one(self, query: dict):
+        document = self._first(query)
+        if document is not None:
+            self.documents.remove(document)
+        return SimpleNamespace(deleted_count=int(document is not None))
+
+class FakeDB:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._collections.setdefault(name, FakeCollection())
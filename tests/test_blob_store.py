@@ -0,0 +1,111 @@
+"""
+Offline checks of the content-addressed blob store: deduplication, reference counts and release
+Runs without MongoDB or a server: python -m pytest tests/test_blob_store.py
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from tests.fake_db import FakeDB
+from tests.test_estimate_batch import load_server
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="document.pdf")
+
+def make_store(server, monkeypatch, tmp_path):
+    fake = FakeDB()
+    monkeypatch.setattr(server, "db", fake)
+    return fake, server.BlobStore(tmp_path / "blobs")
+
+def stored_files(store):
+    return sorted(path.name for path in store.root.rglob("*") if path.is_file())
+
+def test_identical_uploads_share_one_file(monkeypatch, tmp_path):
+    server = load_server()
+    fake, store = make_store(server, monkeypatch, tmp_path)
+    data = b"%PDF-1.4 same content"
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    first = asyncio.run(store.put(upload(data), "application/pdf"))
+    second = asyncio.run(store.put(upload(data), "application/pdf"))
+
+    assert (first["sha256"], first["deduplicated"]) == (sha256, False)
+    assert (second["sha256"], second["deduplicated"]) == (sha256, True)
+    assert first["path"] == second["path"] == str(store.path_for(sha256))
+    assert store.owns(first["path"])
+    assert stored_files(store) == [sha256]
+    assert [(blob["sha256"], blob["refcount"], blob["size"]) for blob in fake.blobs.documents] == [(sha256, 2, len(data))]
+
+def test_last_release_deletes_the_file(monkeypatch, tmp_path):
+    server = load_server()
+    fake, store = make_store(server, monkeypatch, tmp_path)
+    kept = asyncio.run(store.put(upload(b"kept")))
+    shared = asyncio.run(store.put(upload(b"shared")))
+    asyncio.run(store.put(upload(b"shared")))
+
+    asyncio.run(store.release(shared["sha256"]))
+    assert os.path.exists(shared["path"])
+    assert fake.blobs.documents[1]["refcount"] == 1
+
+    asyncio.run(store.release(shared["sha256"]))
+    assert not os.path.exists(shared["path"])
+    assert [blob["sha256"] for blob in fake.blobs.documents] == [kept["sha256"]]
+    assert stored_files(store) == [kept["sha256"]]
+
+def test_release_of_unknown_content_is_a_no_op(monkeypatch, tmp_path):
+    server = load_server()
+    fake, store = make_store(server, monkeypatch, tmp_path)
+    kept = asyncio.run(store.put(upload(b"kept")))
+
+    asyncio.run(store.release("0" * 64))
+
+    assert stored_files(store) == [kept["sha256"]]
+    assert fake.blobs.documents[0]["refcount"] == 1
+
+def test_missing_file_still_drops_the_blob(monkeypatch, tmp_path):
+    server = load_server()
+    fake, store = make_store(server, monkeypatch, tmp_path)
+    blob = asyncio.run(store.put(upload(b"lost")))
+    os.remove(blob["path"])
+
+    asyncio.run(store.release(blob["sha256"]))
+
+    assert fake.blobs.documents == []
+
+def test_re_upload_after_release_recreates_the_file(monkeypatch, tmp_path):
+    server = load_server()
+    fake, store = make_store(server, monkeypatch, tmp_path)
+    data = b"comes back"
+    blob = asyncio.run(store.put(upload(data)))
+    asyncio.run(store.release(blob["sha256"]))
+
+    again = asyncio.run(store.put(upload(data)))
+
+    assert again["deduplicated"] is False
+    assert open(again["path"], "rb").read() == data
+    assert fake.blobs.documents[0]["refcount"] == 1
+
+def test_rejected_upload_leaves_nothing_behind(monkeypatch, tmp_path):
+    server = load_server()
+    fake, store = make_store(server, monkeypatch, tmp_path)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(store.put(upload(b"x" * 2000), max_size=1000))
+
+    assert error.value.status_code == 413
+    assert stored_files(store) == []
+    assert fake.blobs.documents == []
+
+def test_owns_blob_paths_recorded_relative_to_the_backend():
+    server = load_server()
+    store = server.BlobStore(server.ROOT_DIR / "uploads" / "blobs")
+    sha256 = "ab" + "0" * 62
+
+    assert store.owns(str(store.path_for(sha256)))
+    assert store.owns(f"uploads/blobs/ab/{sha256}")
+    assert not store.owns("uploads/project-1/report.pdf")
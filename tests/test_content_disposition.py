@@ -0,0 +1,68 @@
+"""
+Offline checks of the export download names: Content-Disposition for non-ASCII labels and archive entries
+Runs without MongoDB or a server: python -m pytest tests/test_content_disposition.py
+"""
+
+import re
+from urllib.parse import unquote
+
+import pytest
+
+from tests.test_estimate_batch import load_server
+
+def parse(header):
+    match = re.fullmatch(r'(\w+); filename="([^"]*)"; filename\*=utf-8\'\'(\S+)', header)
+    assert match, header
+    return match.group(1), match.group(2), unquote(match.group(3), encoding="utf-8", errors="strict")
+
+@pytest.mark.parametrize("filename, ascii_name", [
+    ("dossier_banque_Maison.pdf", "dossier_banque_Maison.pdf"),
+    ("dossier_banque_Rénovation_Château_d'Été.pdf", "dossier_banque_Renovation_Chateau_d'Ete.pdf"),
+    ("dataroom_Œuvre_№5.zip", "dataroom__uvre_No5.zip"),
+    ("dataroom_東京.zip", "dataroom___.zip"),
+    ('dossier_notaire_"A;B/C\\D".pdf', "dossier_notaire__A_B_C_D_.pdf"),
+    ("dossier\r\nSet-Cookie: x.pdf", "dossier__Set-Cookie: x.pdf"),
+])
+def test_ascii_fallback_and_utf8_name(filename, ascii_name):
+    server = load_server()
+    header = server.content_disposition(filename)
+
+    disposition, fallback, utf8_name = parse(header)
+
+    assert header.isascii()
+    assert (disposition, fallback, utf8_name) == ("attachment", ascii_name, filename)
+
+def test_inline_disposition():
+    server = load_server()
+    assert parse(server.content_disposition("aperçu.pdf", "inline"))[0] == "inline"
+
+def test_dossier_filename_keeps_the_label():
+    server = load_server()
+    name = server.dossier_filename("banque", {"label": "Hôtel particulier"})
+
+    assert name == "dossier_banque_Hôtel_particulier.pdf"
+    assert parse(server.content_disposition(name))[2] == name
+
+def test_archive_entries_are_safe_and_unique():
+    server = load_server()
+    used = set()
+
+    names = [
+        server.archive_entry_name("Contrats", "compromis.pdf", used),
+        server.archive_entry_name("Contrats", "compromis.pdf", used),
+        server.archive_entry_name("Contrats", "compromis.pdf", used),
+        server.archive_entry_name("../Photos", "..\\façade/nord.jpg", used),
+        server.archive_entry_name("", "", used),
+        server.archive_entry_name("Plans", "README", used),
+        server.archive_entry_name("Plans", "README", used),
+    ]
+
+    assert names == [
+        "Contrats/compromis.pdf",
+        "Contrats/compromis (2).pdf",
+        "Contrats/compromis (3).pdf",
+        "_Photos/_façade_nord.jpg",
+        "_/_",
+        "Plans/README",
+        "Plans/README (2)",
+    ]
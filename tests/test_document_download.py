@@ -0,0 +1,108 @@
+"""
+Offline checks of Range and conditional GET handling for document downloads
+Runs without MongoDB or a server: python -m pytest tests/test_document_download.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from tests.fake_db import FakeDB
+from tests.test_estimate_batch import load_server
+
+CONTENT = bytes(range(256)) * 40
+SHA256 = "c" * 64
+URL = "/api/projects/p1/documents/d1/download"
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("BYTES = 10-19", (10, 19)),
+    ("bytes=0-1,5-9", None),
+    ("items=0-10", None),
+    ("bytes=a-b", None),
+])
+def test_parse_byte_range(header, expected):
+    server = load_server()
+    assert server.parse_byte_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-2000", "bytes=50-10"])
+def test_unsatisfiable_range_is_416(header):
+    server = load_server()
+
+    with pytest.raises(HTTPException) as error:
+        server.parse_byte_range(header, 1000)
+
+    assert error.value.status_code == 416
+    assert error.value.headers == {"Content-Range": "bytes */1000"}
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, matches):
+    server = load_server()
+    assert server.etag_matches(header, '"abc"') is matches
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    server = load_server()
+    fake = FakeDB()
+    cache = server.SessionCache()
+    cache.set("token", server.User(id="u1", email="u1@example.com", name="U1", role=server.UserRole.OWNER))
+    monkeypatch.setattr(server, "db", fake)
+    monkeypatch.setattr(server, "session_cache", cache)
+    path = tmp_path / "plan.pdf"
+    path.write_bytes(CONTENT)
+    asyncio.run(fake.projects.insert_one({"id": "p1", "owner_id": "u1", "label": "Projet"}))
+    asyncio.run(fake.project_documents.insert_one({
+        "id": "d1", "project_id": "p1", "filename": "plan.pdf", "content_type": "application/pdf",
+        "file_path": str(path), "sha256": SHA256
+    }))
+    test_client = TestClient(server.app)
+    test_client.cookies.set("session_token", "token")
+    return test_client
+
+def test_full_download(client):
+    response = client.get(URL)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == f'"{SHA256}"'
+    assert response.headers["accept-ranges"] == "bytes"
+
+def test_range_download(client):
+    response = client.get(URL, headers={"Range": "bytes=100-355"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:356]
+    assert response.headers["content-range"] == f"bytes 100-355/{len(CONTENT)}"
+    assert response.headers["content-length"] == "256"
+
+def test_matching_etag_is_304(client):
+    response = client.get(URL, headers={"If-None-Match": f'W/"{SHA256}"', "Range": "bytes=0-9"})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == f'"{SHA256}"'
+
+def test_stale_if_range_sends_the_whole_file(client):
+    response = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_unsatisfiable_range_response(client):
+    response = client.get(URL, headers={"Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
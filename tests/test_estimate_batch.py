@@ -0,0 +1,86 @@
+"""
+Offline check that the vectorized batch estimator matches the scalar one row for row
+Runs without MongoDB or a server: python -m pytest tests/test_estimate_batch.py
+"""
+
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+# Add the backend directory to the path
+sys.path.append(str(Path(__file__).resolve().parents[1] / "backend"))
+
+FIELDS = ("dmto", "emoluments", "csi", "debours", "tva_collectee", "tva_marge", "marge_brute", "marge_nette", "tri")
+
+def load_server():
+    """server schedules its startup tasks at import time, so import it inside a running loop"""
+    async def _import():
+        import server
+        return server
+    return asyncio.run(_import())
+
+def random_rows(server, count, seed=7):
+    rng = random.Random(seed)
+    dates = [None] + [version["effective_date"] for version in server.bareme_store.versions()] + ["2019-06-30", "2031-01-01"]
+    rows = []
+    for _ in range(count):
+        prix_achat = rng.choice([rng.uniform(20000, 2000000), rng.randint(1, 400) * 5000])
+        rows.append(server.EstimateInput(
+            dept=rng.choice(["75", "92", "69", "13", "33", "2A", "971"]),
+            regime_tva=rng.choice(list(server.RegimeTVA)),
+            prix_achat_ttc=round(prix_achat, 2),
+            prix_vente_ttc=round(prix_achat * rng.uniform(0.8, 1.8), 2),
+            travaux_ttc=round(rng.uniform(0, 300000), 2),
+            frais_agence_ttc=round(rng.uniform(0, 30000), 2),
+            hypotheses={"md_b_0715_ok": rng.random() < 0.5, "travaux_structurants": rng.random() < 0.3},
+            date_transaction=rng.choice(dates)
+        ))
+    return rows
+
+def test_batch_matches_scalar_estimates():
+    server = load_server()
+    rows = random_rows(server, 2000)
+
+    batch = server.bareme_store.calculate_estimate_batch(rows)
+
+    assert len(batch) == len(rows)
+    for row, result in zip(rows, batch):
+        expected = server.bareme_store.service_for(row.date_transaction).calculate_estimate(row)
+        for field in FIELDS:
+            assert getattr(result, field) == getattr(expected, field), (field, row.dict())
+
+class FlippingRegistry:
+    """Registry that reloads between every read, alternating two barème versions"""
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+        self.reads = 0
+
+    def current(self):
+        self.reads += 1
+        return self.snapshots[self.reads % len(self.snapshots)]
+
+    def add_listener(self, callback):
+        pass
+
+def test_calculation_reads_one_snapshot():
+    server = load_server()
+    current = server.bareme_registry.current()
+    dmto = server.BaremeRegistry._read_json(server.bareme_registry.dmto_path)
+    notary = server.BaremeRegistry._restructure_notary(server.BaremeRegistry._read_json(server.bareme_registry.notary_path))
+    dmto["defaults"]["dmto_mdb_rate"] *= 2
+    notary["csi_rate"] *= 2
+    notary["debours_forfait"] *= 2
+    reloaded = server.BaremeSnapshot(dmto, notary, generation=current.generation + 1, mtimes=current.mtimes)
+
+    service = server.TaxCalculationService(FlippingRegistry([current, reloaded]))
+    pinned = [server.TaxCalculationService(server.PinnedBaremes(snapshot)) for snapshot in (current, reloaded)]
+    rows = [row.copy(update={"hypotheses": {"md_b_0715_ok": True}}) for row in random_rows(server, 50, seed=11)]
+
+    for row in rows:
+        result = service.calculate_estimate(row)
+        candidates = [p.calculate_estimate(row) for p in pinned]
+        assert any(all(getattr(result, f) == getattr(c, f) for f in FIELDS) for c in candidates), row.dict()
+    batch = service.calculate_estimate_batch(rows)
+    candidates = [p.calculate_estimate_batch(rows) for p in pinned]
+    assert any(all(getattr(r, f) == getattr(c, f) for r, c in zip(batch, results) for f in FIELDS) for results in candidates)
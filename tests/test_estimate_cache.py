@@ -0,0 +1,95 @@
+"""
+Offline checks of the estimate memoization: key stability and invalidation on barème reload
+Runs without MongoDB or a server: python -m pytest tests/test_estimate_cache.py
+"""
+
+import json
+import os
+import shutil
+
+from tests.test_estimate_batch import load_server, random_rows
+
+def make_registry(server, tmp_path):
+    """Registry over a private copy of the barème files so the test can edit them"""
+    for name in ("dmto.json", "notary_fees.json"):
+        shutil.copy(server.ROOT_DIR / "data" / name, tmp_path / name)
+    return server.BaremeRegistry(tmp_path, check_interval=0)
+
+def bump_dmto(path):
+    """Rewrite dmto.json with another version and a newer mtime"""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["version"] = f"{data.get('version', 'test')}-bis"
+    data["defaults"]["dmto_mdb_rate"] *= 2
+    path.write_text(json.dumps(data), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_key_is_canonical_and_version_scoped(tmp_path):
+    server = load_server()
+    cache = server.EstimateCache(make_registry(server, tmp_path))
+    row, other = random_rows(server, 2, seed=3)
+
+    key = cache.make_key(row)
+    assert key == cache.make_key(server.EstimateInput(**row.dict()))
+    assert key != cache.make_key(other)
+    assert key != cache.make_key(row.copy(update={"prix_achat_ttc": row.prix_achat_ttc + 1}))
+
+    snapshot = cache.registry.current()
+    later = server.BaremeSnapshot(
+        dict(snapshot.dmto_rates), dict(snapshot.notaire_baremes),
+        generation=snapshot.generation + 1, mtimes=snapshot.mtimes
+    )
+    assert cache.make_key(row, snapshot) == key
+    assert cache.make_key(row, later) != key
+
+def test_hits_and_misses_are_counted(tmp_path):
+    server = load_server()
+    cache = server.EstimateCache(make_registry(server, tmp_path))
+    row = random_rows(server, 1)[0]
+    key = cache.make_key(row)
+
+    assert cache.get(key) is None
+    result = server.TaxCalculationService(cache.registry).calculate_estimate(row)
+    cache.set(key, result)
+    assert cache.get(key) is result
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+def test_reload_clears_results_and_records(tmp_path):
+    server = load_server()
+    registry = make_registry(server, tmp_path)
+    cache = server.EstimateCache(registry)
+    row = random_rows(server, 1)[0]
+    key = cache.make_key(row)
+    cache.set(key, server.TaxCalculationService(registry).calculate_estimate(row))
+    cache.set_record_id(key, "user-1", "estimate-1")
+    assert cache.get_record_id(key, "user-1") == "estimate-1"
+    assert cache.get_record_id(key, "user-2") is None
+
+    bump_dmto(tmp_path / "dmto.json")
+    snapshot = registry.current()
+
+    assert snapshot.generation == 2
+    assert cache.get(key) is None
+    assert cache.get_record_id(key, "user-1") is None
+    assert cache.make_key(row) != key
+    assert cache.stats()["bareme_version"] == snapshot.version
+
+def test_failed_reload_keeps_cache(tmp_path):
+    server = load_server()
+    registry = make_registry(server, tmp_path)
+    cache = server.EstimateCache(registry)
+    row = random_rows(server, 1)[0]
+    key = cache.make_key(row)
+    result = server.TaxCalculationService(registry).calculate_estimate(row)
+    cache.set(key, result)
+
+    path = tmp_path / "dmto.json"
+    path.write_text("{not json", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert registry.current().generation == 1
+    assert cache.get(key) is result
@@ -0,0 +1,75 @@
+"""
+Offline round trip of the goal seek: the maximum purchase price meets the target, one cent more does not
+Runs without MongoDB or a server: python -m pytest tests/test_goal_seek.py
+"""
+
+import pytest
+
+from tests.test_estimate_batch import load_server
+
+CASES = [
+    ("75", "MARGE", 560000, 60000, 12000, {"md_b_0715_ok": True}),
+    ("69", "NORMAL", 900000, 150000, 0, {}),
+    ("13", "EXO", 300000, 0, 9000, {"md_b_0715_ok": True}),
+    ("92", "MARGE", 2500000, 200000, 50000, {}),
+]
+
+def make_params(server, case, target, target_value, duree_mois=None):
+    dept, regime, prix_vente, travaux, frais, hypotheses = case
+    return server.GoalSeekInput(
+        dept=dept, regime_tva=regime, prix_vente_ttc=prix_vente, travaux_ttc=travaux,
+        frais_agence_ttc=frais, hypotheses=hypotheses, target=target, target_value=target_value,
+        duree_mois=duree_mois
+    )
+
+def estimate_at(server, params, prix_achat):
+    return server.tax_service.calculate_estimate(server.EstimateInput(
+        dept=params.dept, regime_tva=params.regime_tva, prix_achat_ttc=prix_achat,
+        prix_vente_ttc=params.prix_vente_ttc, travaux_ttc=params.travaux_ttc,
+        frais_agence_ttc=params.frais_agence_ttc, hypotheses=params.hypotheses
+    ))
+
+def simple_tri(params, estimate):
+    return estimate.marge_nette / (params.prix_vente_ttc - estimate.marge_brute)
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("fraction", [0.05, 0.15])
+def test_marge_target_round_trip(case, fraction):
+    server = load_server()
+    params = make_params(server, case, "marge_nette", case[2] * fraction)
+
+    result = server.GoalSeekService().max_purchase_price(params)
+    prix_achat = result["prix_achat_max"]
+
+    assert estimate_at(server, params, prix_achat).marge_nette >= params.target_value
+    assert estimate_at(server, params, round(prix_achat + 0.01, 2)).marge_nette < params.target_value
+    assert result["estimate"]["marge_nette"] == estimate_at(server, params, prix_achat).marge_nette
+    assert result["tri_simple_cible"] is None
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("target_value, duree_mois", [(0.10, None), (0.20, 18)])
+def test_tri_target_round_trip(case, target_value, duree_mois):
+    server = load_server()
+    params = make_params(server, case, "tri", target_value, duree_mois)
+
+    result = server.GoalSeekService().max_purchase_price(params)
+    ratio = (1 + target_value) ** (duree_mois / 12) - 1 if duree_mois else target_value
+    prix_achat = result["prix_achat_max"]
+
+    assert result["tri_simple_cible"] == pytest.approx(ratio, abs=1e-6)
+    assert simple_tri(params, estimate_at(server, params, prix_achat)) >= ratio - 1e-9
+    assert simple_tri(params, estimate_at(server, params, round(prix_achat + 0.01, 2))) < ratio - 1e-9
+
+def test_unreachable_target_is_reported():
+    server = load_server()
+    params = make_params(server, CASES[0], "marge_nette", 10 * CASES[0][2])
+
+    with pytest.raises(server.BusinessLogicError):
+        server.GoalSeekService().max_purchase_price(params)
+
+def test_tri_at_or_below_minus_100_percent_is_rejected():
+    server = load_server()
+    params = make_params(server, CASES[0], "tri", -1)
+
+    with pytest.raises(server.ValidationError):
+        server.GoalSeekService().max_purchase_price(params)
@@ -0,0 +1,78 @@
+"""
+Offline checks that Monte Carlo simulations are reproducible from their seed
+Runs without MongoDB or a server: python -m pytest tests/test_monte_carlo.py
+"""
+
+import pytest
+
+from tests.test_estimate_batch import load_server
+
+PROJECT = {
+    "id": "project-1",
+    "address": {"dept": "75"},
+    "regime_tva": "MARGE",
+    "prix_achat_ttc": 400000,
+    "prix_vente_ttc": 560000,
+    "travaux_ttc": 60000,
+    "frais_agence_ttc": 12000,
+    "flags": {"md_b_0715_ok": True},
+    "financing": {"montant_pret": 300000, "taux_pret": 0.045},
+}
+
+def without_timing(result):
+    return {key: value for key, value in result.items() if key != "elapsed_ms"}
+
+def test_same_seed_same_results():
+    server = load_server()
+    service = server.MonteCarloService()
+    params = server.SimulationInput(draws=5000, seed=42)
+
+    first = service.simulate(PROJECT, params)
+    second = service.simulate(PROJECT, params)
+
+    assert first["seed"] == 42
+    assert without_timing(first) == without_timing(second)
+
+def test_other_seed_other_draws():
+    server = load_server()
+    service = server.MonteCarloService()
+
+    first = service.simulate(PROJECT, server.SimulationInput(draws=5000, seed=1))
+    second = service.simulate(PROJECT, server.SimulationInput(draws=5000, seed=2))
+
+    assert first["marge_nette"] != second["marge_nette"]
+
+def test_generated_seed_is_returned_and_replayable():
+    server = load_server()
+    service = server.MonteCarloService()
+
+    first = service.simulate(PROJECT, server.SimulationInput(draws=5000))
+    replay = service.simulate(PROJECT, server.SimulationInput(draws=5000, seed=first["seed"]))
+
+    assert without_timing(first) == without_timing(replay)
+
+def test_fixed_distributions_match_the_estimate():
+    server = load_server()
+    fixed = server.DistributionSpec(distribution=server.DistributionType.FIXED, mean=1.0)
+    params = server.SimulationInput(
+        draws=1000, seed=0, prix_vente_factor=fixed, travaux_factor=fixed,
+        duree_mois=server.DistributionSpec(distribution=server.DistributionType.FIXED, mean=12)
+    )
+    project = dict(PROJECT, financing={})
+
+    result = server.MonteCarloService().simulate(project, params)
+    estimate = server.tax_service.calculate_estimate(server.build_estimate_input(project))
+
+    assert result["marge_nette"]["std"] == 0
+    assert result["marge_nette"]["p50"] == pytest.approx(estimate.marge_nette, abs=0.01)
+    assert result["probability_of_loss"] == (1.0 if estimate.marge_nette < 0 else 0.0)
+
+def test_missing_distribution_parameters_are_rejected():
+    server = load_server()
+    params = server.SimulationInput(
+        draws=1000, seed=0,
+        travaux_factor=server.DistributionSpec(distribution=server.DistributionType.TRIANGULAR, low=1, high=2)
+    )
+
+    with pytest.raises(server.ValidationError):
+        server.MonteCarloService().simulate(PROJECT, params)
@@ -0,0 +1,114 @@
+"""
+Offline checks of the portfolio rollup deltas applied on project create, update and delete
+Runs without MongoDB or a server: python -m pytest tests/test_portfolio_stats.py
+"""
+
+from datetime import datetime, timezone
+
+from tests.test_estimate_batch import load_server
+
+PROJECT = {
+    "id": "p1",
+    "owner_id": "owner",
+    "team_members": ["analyst"],
+    "status": "ACQUIS",
+    "address": {"dept": "75"},
+    "prix_achat_ttc": 400000,
+    "prix_vente_ttc": 560000,
+    "marge_estimee": 52000.5,
+    "tri_estime": 0.12,
+    "created_at": datetime(2025, 3, 14, tzinfo=timezone.utc),
+}
+
+SCOPES = {"all", "member:owner", "member:analyst", "team:analyst"}
+
+def test_create_adds_the_full_contribution_to_every_scope():
+    server = load_server()
+    deltas = server.PortfolioStatsService()._deltas(None, PROJECT)
+
+    assert set(deltas) == SCOPES
+    for fields in deltas.values():
+        assert fields == {
+            "projects": 1,
+            "investment": 400000,
+            "revenue": 560000,
+            "margin": 52000.5,
+            "tri_sum": 0.12,
+            "by_status.ACQUIS.count": 1,
+            "by_status.ACQUIS.margin": 52000.5,
+            "by_dept.75.count": 1,
+            "by_dept.75.investment": 400000,
+            "by_dept.75.margin": 52000.5,
+            "by_month.2025-03.count": 1,
+            "by_month.2025-03.margin": 52000.5,
+        }
+        assert isinstance(fields["projects"], int)
+        assert isinstance(fields["by_status.ACQUIS.count"], int)
+
+def test_delete_removes_it():
+    server = load_server()
+    service = server.PortfolioStatsService()
+    created = service._deltas(None, PROJECT)
+    deleted = service._deltas(PROJECT, None)
+
+    assert set(deleted) == SCOPES
+    for scope, fields in deleted.items():
+        assert fields == {path: -amount for path, amount in created[scope].items()}
+
+def test_update_only_moves_changed_fields():
+    server = load_server()
+    service = server.PortfolioStatsService()
+    after = dict(PROJECT, prix_achat_ttc=410000, status="TRAVAUX")
+
+    deltas = service._deltas(PROJECT, after)
+
+    assert set(deltas) == SCOPES
+    for fields in deltas.values():
+        assert fields == {
+            "investment": 10000,
+            "by_dept.75.investment": 10000,
+            "by_status.ACQUIS.count": -1,
+            "by_status.ACQUIS.margin": -52000.5,
+            "by_status.TRAVAUX.count": 1,
+            "by_status.TRAVAUX.margin": 52000.5,
+        }
+
+def test_unchanged_project_gives_no_delta():
+    server = load_server()
+    assert server.PortfolioStatsService()._deltas(PROJECT, dict(PROJECT, label="renamed")) == {}
+
+def test_team_change_moves_the_project_between_scopes():
+    server = load_server()
+    service = server.PortfolioStatsService()
+    after = dict(PROJECT, team_members=["guest"])
+
+    deltas = service._deltas(PROJECT, after)
+
+    assert set(deltas) == {"member:analyst", "team:analyst", "member:guest", "team:guest"}
+    assert deltas["member:analyst"]["projects"] == -1
+    assert deltas["team:guest"]["projects"] == 1
+    assert deltas["team:guest"]["margin"] == 52000.5
+
+def test_missing_fields_fall_into_default_buckets():
+    server = load_server()
+    deltas = server.PortfolioStatsService()._deltas(None, {"owner_id": "owner", "created_at": "not a date"})
+
+    assert set(deltas) == {"all", "member:owner"}
+    assert deltas["all"] == {
+        "projects": 1,
+        "by_status.DETECTE.count": 1,
+        "by_dept.Inconnu.count": 1,
+        "by_month.Inconnu.count": 1,
+    }
+
+def test_scope_follows_the_role():
+    server = load_server()
+    service = server.PortfolioStatsService()
+
+    def user(role):
+        return server.User(id="u1", email="u1@example.com", name="U1", role=role)
+
+    assert service.scope_for(user(server.UserRole.OWNER)) == "all"
+    assert service.scope_for(user(server.UserRole.PM)) == "member:u1"
+    assert service.scope_for(user(server.UserRole.ANALYSTE)) == "member:u1"
+    assert service.scope_for(user(server.UserRole.INVITE)) == "team:u1"
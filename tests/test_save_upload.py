@@ -0,0 +1,77 @@
+"""
+Offline checks of the chunked upload writer: hashing, the size limit and temp-file cleanup
+Runs without MongoDB or a server: python -m pytest tests/test_save_upload.py
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from tests.test_estimate_batch import load_server
+
+class FailingUpload:
+    """Upload whose stream breaks after the first chunk"""
+    def __init__(self, chunk: bytes):
+        self.chunks = [chunk]
+
+    async def read(self, size: int = -1) -> bytes:
+        if self.chunks:
+            return self.chunks.pop()
+        raise ConnectionResetError("client went away")
+
+def upload(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="report.pdf")
+
+def test_writes_the_file_and_returns_size_and_hash(tmp_path):
+    server = load_server()
+    data = os.urandom(2 * server.UPLOAD_CHUNK_SIZE + 123)
+    destination = tmp_path / "nested" / "dir" / "report.pdf"
+
+    size, sha256 = asyncio.run(server.save_upload(upload(data), destination))
+
+    assert (size, sha256) == (len(data), hashlib.sha256(data).hexdigest())
+    assert destination.read_bytes() == data
+    assert os.listdir(destination.parent) == ["report.pdf"]
+
+def test_limit_is_inclusive(tmp_path):
+    server = load_server()
+    data = b"x" * 1000
+
+    size, _ = asyncio.run(server.save_upload(upload(data), tmp_path / "exact", max_size=1000))
+
+    assert size == 1000
+
+def test_oversized_upload_is_rejected_and_cleaned_up(tmp_path):
+    server = load_server()
+    data = b"x" * (server.UPLOAD_CHUNK_SIZE + 1)
+    destination = tmp_path / "too-big.pdf"
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.save_upload(upload(data), destination, max_size=server.UPLOAD_CHUNK_SIZE))
+
+    assert error.value.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+def test_failed_stream_leaves_no_partial_file(tmp_path):
+    server = load_server()
+    destination = tmp_path / "broken.pdf"
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(server.save_upload(FailingUpload(b"partial"), destination))
+
+    assert os.listdir(tmp_path) == []
+
+def test_existing_file_is_kept_until_the_new_one_is_complete(tmp_path):
+    server = load_server()
+    destination = tmp_path / "report.pdf"
+    destination.write_bytes(b"previous version")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(server.save_upload(upload(b"y" * 2000), destination, max_size=1000))
+
+    assert destination.read_bytes() == b"previous version"
+    assert os.listdir(tmp_path) == ["report.pdf"]
@@ -0,0 +1,87 @@
+"""
+Offline checks of the sensitivity grid against the scalar estimate and of the tornado ranking
+Runs without MongoDB or a server: python -m pytest tests/test_sensitivity.py
+"""
+
+import pytest
+
+from tests.test_estimate_batch import load_server
+
+BASE = {
+    "dept": "75",
+    "regime_tva": "MARGE",
+    "prix_achat_ttc": 400000,
+    "prix_vente_ttc": 560000,
+    "travaux_ttc": 60000,
+    "frais_agence_ttc": 12000,
+    "hypotheses": {"md_b_0715_ok": True},
+}
+
+def make_params(server, **fields):
+    return server.SensitivityInput(base=server.EstimateInput(**BASE), **fields)
+
+def test_grid_cells_match_scalar_estimates():
+    server = load_server()
+    params = make_params(
+        server,
+        x_axis=server.SensitivityAxis(variable="prix_achat_ttc", min=300000, max=450000, steps=4),
+        y_axis=server.SensitivityAxis(variable="prix_vente_ttc", values=[500000, 600000])
+    )
+
+    grid = server.SensitivityService().grid(params)
+
+    assert grid["x_axis"]["values"] == [300000, 350000, 400000, 450000]
+    assert grid["y_axis"]["values"] == [500000, 600000]
+    assert len(grid["marge_nette"]) == 2 and all(len(row) == 4 for row in grid["marge_nette"])
+    for i, prix_vente in enumerate(grid["y_axis"]["values"]):
+        for j, prix_achat in enumerate(grid["x_axis"]["values"]):
+            expected = server.tax_service.calculate_estimate(
+                params.base.copy(update={"prix_achat_ttc": prix_achat, "prix_vente_ttc": prix_vente})
+            )
+            assert grid["marge_nette"][i][j] == pytest.approx(expected.marge_nette, abs=0.01)
+
+def test_one_axis_grid_is_a_single_row():
+    server = load_server()
+    params = make_params(server, x_axis=server.SensitivityAxis(variable="duree_mois", values=[6, 12, 24]))
+
+    grid = server.SensitivityService().grid(params)
+
+    assert grid["y_axis"] is None
+    assert len(grid["marge_nette"]) == 1
+    # Holding period moves the TRI, not the margin
+    assert len(set(grid["marge_nette"][0])) == 1
+    assert grid["tri"][0][0] > grid["tri"][0][1] > grid["tri"][0][2]
+
+@pytest.mark.parametrize("fields, field", [
+    ({"x_axis": {"variable": "travaux_ttc"}}, "travaux_ttc"),
+    ({"x_axis": {"variable": "travaux_ttc", "values": [1.0]},
+      "y_axis": {"variable": "travaux_ttc", "values": [2.0]}}, "y_axis"),
+])
+def test_invalid_grids_are_rejected(fields, field):
+    server = load_server()
+    params = make_params(server, **fields)
+
+    with pytest.raises(server.ValidationError) as error:
+        server.SensitivityService().grid(params)
+    assert error.value.field == field
+
+def test_tornado_is_ranked_by_swing():
+    server = load_server()
+    params = make_params(
+        server, x_axis=server.SensitivityAxis(variable="prix_achat_ttc", values=[1.0]), tornado_variation=0.1
+    )
+
+    tornado = server.SensitivityService().tornado(params)
+    bars = {bar["variable"]: bar for bar in tornado["bars"]}
+    swings = [bar["swing"] for bar in tornado["bars"]]
+
+    assert swings == sorted(swings, reverse=True)
+    assert set(bars) == {variable.value for variable in server.SensitivityVariable}
+    assert tornado["bars"][0]["variable"] == "prix_vente_ttc"
+    assert bars["duree_mois"]["swing"] == 0
+    assert bars["prix_vente_ttc"]["low_value"] == pytest.approx(504000)
+    assert bars["prix_vente_ttc"]["marge_nette_low"] < tornado["base_marge_nette"] < bars["prix_vente_ttc"]["marge_nette_high"]
+    assert bars["prix_achat_ttc"]["marge_nette_low"] > tornado["base_marge_nette"] > bars["prix_achat_ttc"]["marge_nette_high"]
+    assert tornado["base_marge_nette"] == pytest.approx(
+        server.tax_service.calculate_estimate(params.base).marge_nette, abs=0.01
+    )
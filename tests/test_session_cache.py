@@ -0,0 +1,70 @@
+"""
+Offline checks of the session-to-user cache: expiry, token and user invalidation
+Runs without MongoDB or a server: python -m pytest tests/test_session_cache.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from tests.test_estimate_batch import load_server
+
+def make_user(server, user_id):
+    return server.User(id=user_id, email=f"{user_id}@example.com", name=user_id)
+
+def test_hit_until_invalidated():
+    server = load_server()
+    cache = server.SessionCache(maxsize=10, ttl=60)
+    user = make_user(server, "u1")
+
+    assert cache.get("token-1") is None
+    cache.set("token-1", user, datetime.now(timezone.utc) + timedelta(hours=1))
+    assert cache.get("token-1") is user
+
+    cache.invalidate_token("token-1")
+    cache.invalidate_token("token-1")
+    assert cache.get("token-1") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"], stats["size"]) == (1, 2, 1, 0)
+
+def test_invalidate_user_drops_all_their_sessions():
+    server = load_server()
+    cache = server.SessionCache(maxsize=10, ttl=60)
+    alice, bob = make_user(server, "alice"), make_user(server, "bob")
+    cache.set("alice-laptop", alice)
+    cache.set("alice-phone", alice)
+    cache.set("bob-laptop", bob)
+
+    cache.invalidate_user("alice")
+
+    assert cache.get("alice-laptop") is None
+    assert cache.get("alice-phone") is None
+    assert cache.get("bob-laptop") is bob
+    assert cache.stats()["invalidations"] == 2
+
+def test_entries_never_outlive_the_session():
+    server = load_server()
+    cache = server.SessionCache(maxsize=10, ttl=60)
+    user = make_user(server, "u1")
+    past = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    cache.set("expired", user, past)
+    cache.set("naive", user, datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1))
+    cache.set("iso", user, (past - timedelta(days=1)).isoformat())
+
+    assert cache.get("expired") is None
+    assert cache.stats()["size"] == 2
+    assert cache.get("naive") is user
+    assert cache.get("iso") is None
+
+def test_ttl_bounds_entries_without_expiry():
+    server = load_server()
+    cache = server.SessionCache(maxsize=10, ttl=60)
+    user = make_user(server, "u1")
+    clock = [1000.0]
+    cache._cache = server.TTLCache(maxsize=10, ttl=60, timer=lambda: clock[0])
+
+    cache.set("token-1", user)
+    clock[0] += 59
+    assert cache.get("token-1") is user
+    clock[0] += 2
+    assert cache.get("token-1") is None
@@ -0,0 +1,100 @@
+"""
+Offline checks of the signed session tokens: verification, expiry renewal and revocation
+Runs without MongoDB or a server: python -m pytest tests/test_session_signer.py
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from starlette.responses import Response
+
+from tests.fake_db import FakeDB
+from tests.test_estimate_batch import load_server
+
+SECRET = "test-signing-key-with-at-least-32-bytes"
+
+def setup(server, monkeypatch):
+    """Signer over an in-memory db holding one user and their session"""
+    fake = FakeDB()
+    monkeypatch.setattr(server, "db", fake)
+    user = server.User(id="u1", email="u1@example.com", name="U1", role=server.UserRole.PM)
+    session_expires = datetime.now(timezone.utc) + timedelta(days=7)
+    asyncio.run(fake.users.insert_one(user.dict()))
+    asyncio.run(fake.user_sessions.insert_one({"session_token": "sid-1", "user_id": "u1", "expires_at": session_expires}))
+    signer = server.SessionTokenSigner(SECRET, ttl=900)
+    signer.revocations.sync_interval = 0
+    return fake, signer, user, session_expires
+
+def test_valid_token_authenticates_without_a_lookup(monkeypatch):
+    server = load_server()
+    fake, signer, user, session_expires = setup(server, monkeypatch)
+    token = signer.issue(user, "sid-1", session_expires)
+    fake.user_sessions.documents.clear()
+
+    authenticated = asyncio.run(signer.authenticate(token))
+
+    assert server.SessionTokenSigner.is_signed(token)
+    assert (authenticated.id, authenticated.role) == ("u1", server.UserRole.PM)
+    assert signer.decode(token)["sid"] == "sid-1"
+
+def test_tampered_or_foreign_tokens_are_rejected(monkeypatch):
+    server = load_server()
+    _, signer, user, session_expires = setup(server, monkeypatch)
+    token = signer.issue(user, "sid-1", session_expires)
+    foreign = server.SessionTokenSigner("another-signing-key-with-32-bytes!!", ttl=900)
+
+    header, payload, signature = token.split(".")
+    tampered = ".".join([header, payload, signature[::-1]])
+
+    assert asyncio.run(signer.authenticate(tampered)) is None
+    assert asyncio.run(signer.authenticate(foreign.issue(user, "sid-1", session_expires))) is None
+
+def test_expiry_is_capped_by_the_session(monkeypatch):
+    server = load_server()
+    _, signer, user, _ = setup(server, monkeypatch)
+    session_expires = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+    claims = signer.decode(signer.issue(user, "sid-1", session_expires))
+
+    assert claims["exp"] == int(session_expires.timestamp())
+
+def test_expired_token_is_renewed_from_the_session_store(monkeypatch):
+    server = load_server()
+    _, _, user, session_expires = setup(server, monkeypatch)
+    expired = server.SessionTokenSigner(SECRET, ttl=-10).issue(user, "sid-1", session_expires)
+    signer = server.SessionTokenSigner(SECRET, ttl=900)
+    response = Response()
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        signer.decode(expired)
+    authenticated = asyncio.run(signer.authenticate(expired, response))
+
+    assert authenticated.id == "u1"
+    cookie = response.headers["set-cookie"]
+    renewed = cookie.split("session_token=", 1)[1].split(";", 1)[0]
+    assert signer.decode(renewed)["sid"] == "sid-1"
+
+def test_expired_token_without_a_live_session_is_rejected(monkeypatch):
+    server = load_server()
+    fake, _, user, session_expires = setup(server, monkeypatch)
+    expired = server.SessionTokenSigner(SECRET, ttl=-10).issue(user, "sid-1", session_expires)
+    fake.user_sessions.documents[0]["expires_at"] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    assert asyncio.run(server.SessionTokenSigner(SECRET).authenticate(expired)) is None
+
+def test_revocation_reaches_other_workers(monkeypatch):
+    server = load_server()
+    fake, signer, user, session_expires = setup(server, monkeypatch)
+    token = signer.issue(user, "sid-1", session_expires)
+    other_worker = server.SessionTokenSigner(SECRET, ttl=900)
+    other_worker.revocations.sync_interval = 0
+    assert asyncio.run(other_worker.authenticate(token)).id == "u1"
+
+    assert asyncio.run(signer.revoke(token)) == "sid-1"
+
+    assert asyncio.run(signer.authenticate(token)) is None
+    assert asyncio.run(other_worker.authenticate(token)) is None
+    assert [entry["sid"] for entry in fake.revoked_sessions.documents] == ["sid-1"]
+    assert asyncio.run(signer.revoke("not-a-token")) is None
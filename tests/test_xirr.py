@@ -0,0 +1,66 @@
+"""
+Offline checks of the vectorized XIRR solver against cash flows with a known rate
+Runs without MongoDB or a server: python -m pytest tests/test_xirr.py
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from tests.test_estimate_batch import load_server
+
+START = datetime(2024, 1, 1)
+
+def flows(*pairs):
+    """Schedule from (days after START, amount) pairs"""
+    return [{"date": START + timedelta(days=days), "amount": amount} for days, amount in pairs]
+
+KNOWN = [
+    (flows((0, -1000), (365, 1100)), 0.10),
+    (flows((0, -1000), (730, 1210)), 0.10),
+    (flows((0, -1000), (365, 900)), -0.10),
+    (flows((0, -100), (365, -100), (730, 231)), 0.10),
+    (flows((0, -1000), (365, 0), (730, 0), (1095, 1331)), 0.10),
+    (flows((0, -500000), (182, -50000), (365, 700000)), None),
+]
+
+def npv(schedule, rate):
+    return sum(flow["amount"] * (1 + rate) ** -((flow["date"] - START).days / 365.0) for flow in schedule)
+
+def test_batch_matches_known_rates():
+    server = load_server()
+    rates = server.CashFlowService.xirr_batch([schedule for schedule, _ in KNOWN])
+
+    assert rates.shape == (len(KNOWN),)
+    for (schedule, expected), rate in zip(KNOWN, rates):
+        assert np.isfinite(rate)
+        assert abs(npv(schedule, rate)) < 1e-6
+        if expected is not None:
+            assert abs(rate - expected) < 1e-9, (schedule, rate)
+
+def test_batch_matches_one_by_one():
+    server = load_server()
+    schedules = [schedule for schedule, _ in KNOWN]
+    batch = server.CashFlowService.xirr_batch(schedules)
+    for schedule, rate in zip(schedules, batch):
+        assert abs(server.CashFlowService.xirr_batch([schedule])[0] - rate) < 1e-9
+
+def test_schedules_without_sign_change_are_nan():
+    server = load_server()
+    rates = server.CashFlowService.xirr_batch([
+        flows((0, 1000), (365, 1100)),
+        flows((0, -1000), (365, -100)),
+        [],
+        flows((0, -1000), (365, 1100)),
+    ])
+
+    assert np.isnan(rates[:3]).all()
+    assert abs(rates[3] - 0.10) < 1e-9
+    assert server.CashFlowService.xirr_batch([]).shape == (0,)
+
+def test_xirr_rounds_and_maps_nan_to_none():
+    server = load_server()
+    service = server.CashFlowService()
+
+    assert service.xirr(flows((0, -1000), (365, 1234))) == 0.234
+    assert service.xirr(flows((0, 1000), (365, 1100))) is None